@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark the Swiss draw at growing league sizes, random and seeded-pot modes."""
+
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from generate_swiss_draw import generate_swiss_fixtures
+from swiss_pairing import generate_pot_pairings
+
+# (teams, rounds)
+CASES = [(20, 10), (20, 19), (200, 10), (200, 199), (2000, 10), (2000, 100)]
+# (teams, rounds, pots)
+POT_CASES = [(20, 10, 5), (20, 10, 2), (40, 8, 4), (200, 10, 5)]
+SEED = 2526
+
+
+def is_valid(fixtures, n_teams, rounds):
+    """Every team plays once per round and never meets an opponent twice."""
+    per_round = defaultdict(set)
+    opponents = defaultdict(set)
+    for f in fixtures:
+        seen = per_round[f['round']]
+        if f['home'] in seen or f['away'] in seen:
+            return False
+        seen.update((f['home'], f['away']))
+        if f['away'] in opponents[f['home']]:
+            return False
+        opponents[f['home']].add(f['away'])
+        opponents[f['away']].add(f['home'])
+    return (len(per_round) == rounds
+            and all(len(teams) == n_teams for teams in per_round.values()))
+
+
+def opponent_strength_spread(fixtures):
+    """Standard deviation of each team's summed opponent seed (teams are their seed)."""
+    totals = defaultdict(int)
+    for f in fixtures:
+        totals[f['home']] += f['away']
+        totals[f['away']] += f['home']
+    mean = sum(totals.values()) / len(totals)
+    return (sum((t - mean) ** 2 for t in totals.values()) / len(totals)) ** 0.5
+
+
+def main():
+    print("=== SWISS DRAW ===")
+    for n_teams, rounds in CASES:
+        teams = list(range(1, n_teams + 1))
+        start = time.perf_counter()
+        fixtures = generate_swiss_fixtures(teams, rounds=rounds, seed=SEED)
+        elapsed = time.perf_counter() - start
+
+        reproducible = fixtures == generate_swiss_fixtures(teams, rounds=rounds, seed=SEED)
+        valid = is_valid(fixtures, n_teams, rounds)
+        print(f"N={n_teams:<5} rounds={rounds:<4} {elapsed * 1000:9.2f} ms  "
+              f"valid: {'✓' if valid else '✗'}  reproducible: {'✓' if reproducible else '✗'}")
+
+    print("\n=== SEEDED POT DRAW ===")
+    for n_teams, rounds, pots in POT_CASES:
+        teams = list(range(1, n_teams + 1))
+        start = time.perf_counter()
+        _, stats = generate_pot_pairings(teams, rounds, pots, random.Random(SEED))
+        elapsed = time.perf_counter() - start
+        fixtures = generate_swiss_fixtures(teams, rounds=rounds, seed=SEED, pots=pots)
+
+        valid = is_valid(fixtures, n_teams, rounds)
+        random_spread = opponent_strength_spread(generate_swiss_fixtures(teams, rounds=rounds, seed=SEED))
+        print(f"N={n_teams:<5} rounds={rounds:<3} pots={pots}  {elapsed * 1000:8.1f} ms  "
+              f"{stats['evaluations'] / elapsed:8,.0f} schedules/s  valid: {'✓' if valid else '✗'}  "
+              f"strength spread {opponent_strength_spread(fixtures):6.2f} (random draw {random_spread:6.2f})")
+
+
+if __name__ == "__main__":
+    main()
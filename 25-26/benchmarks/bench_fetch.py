@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark fetch + ingest throughput against replayed synthetic leagues (no network)."""
+
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import db_utils
+import fetch_gameweek_scores
+import fetch_league_managers
+import init_db
+from fpl_replay import SyntheticLeague, replay_client
+
+LEAGUE_SIZES = [20, 2_000, 50_000]
+BACKFILL = range(1, 21)         # H2H gameweeks fetched per league
+MAX_HISTORIES = 2_000           # Entry histories fetched per league (one request each)
+LATENCY = 0.01                  # Simulated round trip for the concurrency comparison
+SEED = 21
+
+
+def timed(label, func, stats):
+    before = dict(stats)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - start
+    requests = stats["requests"] - before.get("requests", 0)
+    kb = (stats["bytes"] - before.get("bytes", 0)) / 1024
+    print(f"  {label:<34} {elapsed * 1000:9.1f} ms  {requests:6,} requests  {kb:9,.0f} KB  "
+          f"{requests / elapsed:7,.0f} req/s")
+    return result
+
+
+def run(league, tmp, latency=0.0, workers=(fetch_league_managers.BACKFILL_WORKERS,)):
+    client, adapter = replay_client(league, latency=latency, cache_dir=Path(tmp) / "http")
+    db_utils.set_db_path(Path(tmp) / "bench.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db.init_database()
+
+    entries, info = timed("standings", lambda: fetch_league_managers.fetch_league_standings(client),
+                          adapter.stats)
+    timed("store_managers", lambda: fetch_league_managers.store_managers(entries, info), adapter.stats)
+
+    for n in workers:
+        client.clear()
+        timed(f"H2H backfill GW{BACKFILL[0]}-{BACKFILL[-1]} ({n} workers)",
+              lambda: fetch_league_managers.backfill_h2h_matches(client, BACKFILL, max_workers=n),
+              adapter.stats)
+
+    ids = [entry['entry'] for entry in entries[:MAX_HISTORIES]]
+    histories = timed(f"{len(ids):,} entry histories", lambda: fetch_gameweek_scores.fetch_histories(ids, client),
+                      adapter.stats)
+    managers = {m['fpl_id']: m['id'] for m in db_utils.get_all_managers()}
+    scores = [row for fpl_id, history in histories.items()
+              for row in fetch_gameweek_scores.history_scores(managers[fpl_id], history)]
+    timed(f"record {len(scores):,} gameweek scores", lambda: db_utils.record_gameweek_scores(scores),
+          adapter.stats)
+    db_utils.close_connections()
+
+
+def main():
+    for n in LEAGUE_SIZES:
+        print(f"=== FETCH + INGEST ({n:,} entries, replayed) ===")
+        with tempfile.TemporaryDirectory() as tmp:
+            run(SyntheticLeague(n, seed=SEED).prepare(), tmp)
+        print()
+
+    n = LEAGUE_SIZES[1]
+    print(f"=== {LATENCY * 1000:.0f} ms LATENCY ({n:,} entries) ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        run(SyntheticLeague(n, seed=SEED).prepare(), tmp, latency=LATENCY,
+            workers=(1, fetch_league_managers.BACKFILL_WORKERS))
+
+
+if __name__ == "__main__":
+    main()
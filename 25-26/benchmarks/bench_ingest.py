@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark bulk ingestion against per-row writes on a synthetic 10k-manager league."""
+
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import db_utils
+import fetch_fpl_gameweeks
+import fetch_league_managers
+import init_db
+
+N_MANAGERS = 10_000
+GAMEWEEKS = range(1, 39)
+SEED = 20
+
+
+def synthetic_league(n=N_MANAGERS, seed=SEED):
+    """FPL-shaped standings entries and one gameweek of H2H matches."""
+    rng = random.Random(seed)
+    entries = [{
+        'entry': 1_000_000 + i,
+        'player_name': f"Manager {i}",
+        'entry_name': f"Team {i}",
+    } for i in range(n)]
+
+    ids = [e['entry'] for e in entries]
+    rng.shuffle(ids)
+    matches = [{
+        'id': 5_000_000 + i // 2,
+        'event': 21,
+        'entry_1_entry': ids[i], 'entry_1_name': f"Team {ids[i]}",
+        'entry_1_player_name': f"Manager {ids[i]}", 'entry_1_points': rng.randint(20, 100),
+        'entry_2_entry': ids[i + 1], 'entry_2_name': f"Team {ids[i + 1]}",
+        'entry_2_player_name': f"Manager {ids[i + 1]}", 'entry_2_points': rng.randint(20, 100),
+        'is_knockout': False, 'winner': None,
+    } for i in range(0, n - 1, 2)]
+
+    gameweeks = [{
+        'id': gw, 'name': f"Gameweek {gw}",
+        'deadline_time': f"2026-01-{(gw % 28) + 1:02d}T11:00:00Z",
+        'deadline_time_epoch': 1767000000 + gw * 604800,
+        'is_previous': False, 'is_current': False, 'is_next': False,
+        'finished': False, 'data_checked': False,
+    } for gw in GAMEWEEKS]
+
+    scores = [(i + 1, 21, rng.randint(20, 100), rng.choice([0, 0, 4, 8])) for i in range(n)]
+    return entries, matches, gameweeks, scores
+
+
+# ---------- Per-row baselines (the previous implementation) ----------
+
+def legacy_store_managers(entries, db_path):
+    conn = sqlite3.connect(db_path)
+    for m in entries:
+        conn.execute("""
+            INSERT OR REPLACE INTO managers (fpl_id, name, team_name, fpl_entry_name)
+            VALUES (?, ?, ?, ?)
+        """, (m['entry'], m['player_name'], m['entry_name'], m['entry_name']))
+    conn.commit()
+    conn.close()
+
+
+def legacy_record_gameweek_scores(scores, db_path):
+    for manager_id, gameweek, points, cost in scores:
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            INSERT OR REPLACE INTO gameweek_scores
+            (manager_id, gameweek, points, transfers_cost, net_points)
+            VALUES (?, ?, ?, ?, ?)
+        """, (manager_id, gameweek, points, cost, points - cost))
+        conn.commit()
+        conn.close()
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main():
+    entries, matches, gameweeks, scores = synthetic_league()
+    print(f"=== INGEST ({len(entries):,} managers, {len(matches):,} matches) ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        db_utils.set_db_path(db_path)
+        init_db.init_database()
+
+        print("\nPer-row baseline:")
+        t_legacy_managers = timed("managers (INSERT OR REPLACE)", lambda: legacy_store_managers(entries, db_path))
+        t_legacy_scores = timed("scores (connection per row)", lambda: legacy_record_gameweek_scores(scores, db_path))
+
+        print("\nBulk upserts:")
+        t_managers = timed("store_managers", lambda: fetch_league_managers.store_managers(entries, {'id': 1, 'name': 'Bench'}))
+        t_rerun = timed("store_managers (re-run, updates)", lambda: fetch_league_managers.store_managers(entries, {'id': 1, 'name': 'Bench'}))
+        t_scores = timed("record_gameweek_scores", lambda: db_utils.record_gameweek_scores(scores))
+        timed("store_h2h_results", lambda: fetch_league_managers.store_h2h_results(matches, 21))
+        timed("store_gameweeks", lambda: fetch_fpl_gameweeks.store_gameweeks(gameweeks))
+
+        max_id = db_utils.get_connection().execute("SELECT MAX(id) FROM managers").fetchone()[0]
+        db_utils.close_connections()
+
+    print(f"\nmanagers speedup: {t_legacy_managers / t_managers:,.1f}x")
+    print(f"scores speedup:   {t_legacy_scores / t_scores:,.1f}x")
+    print(f"re-run kept manager ids stable: {'✓' if max_id == len(entries) else '✗'} (max id {max_id})")
+    print(f"re-run cost vs first run: {t_rerun / t_managers:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Benchmark cup standings and head-to-head reads on a synthetic 100k-fixture database."""
+
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import cup_queries
+import db_utils
+import init_db
+
+N_MANAGERS = 20_000
+ROUNDS = range(1, 11)           # 10 rounds x 10k fixtures = 100k fixtures
+H2H_LOOKUPS = 10_000
+SEED = 18
+
+
+def synthetic_fixtures(n=N_MANAGERS, seed=SEED):
+    """(round, gameweek, home, away, home_score, away_score) for every manager in every round."""
+    rng = random.Random(seed)
+    ids = [1_000_000 + i for i in range(n)]
+    fixtures = []
+    for round_num in ROUNDS:
+        rng.shuffle(ids)
+        fixtures.extend(
+            (round_num, 20 + round_num, ids[i], ids[i + 1], rng.randint(20, 100), rng.randint(20, 100))
+            for i in range(0, n - 1, 2)
+        )
+    return fixtures
+
+
+# ---------- Baseline (the previous implementation) ----------
+
+def legacy_standings(conn, through_round=None):
+    """Round filter formatted into the SQL text, totals accumulated in Python."""
+    query = """
+        SELECT * FROM cup_fixtures
+        WHERE round <= 10 AND home_score IS NOT NULL AND away_score IS NOT NULL
+    """
+    if through_round:
+        query += f" AND round <= {through_round}"
+
+    standings = defaultdict(lambda: {'played': 0, 'won': 0, 'drawn': 0, 'lost': 0, 'points': 0, 'fpl_total': 0})
+    for match in conn.execute(query).fetchall():
+        home, away = standings[match['home_manager_id']], standings[match['away_manager_id']]
+        home['played'] += 1
+        away['played'] += 1
+        home['fpl_total'] += match['home_score']
+        away['fpl_total'] += match['away_score']
+        if match['home_score'] > match['away_score']:
+            home['won'] += 1
+            home['points'] += 3
+            away['lost'] += 1
+        elif match['away_score'] > match['home_score']:
+            away['won'] += 1
+            away['points'] += 3
+            home['lost'] += 1
+        else:
+            home['drawn'] += 1
+            away['drawn'] += 1
+            home['points'] += 1
+            away['points'] += 1
+    return standings
+
+
+def legacy_head_to_head(conn, a, b):
+    """Manager ids formatted into the SQL text, so every pair is a new statement."""
+    return conn.execute(f"""
+        SELECT * FROM cup_fixtures
+        WHERE (home_manager_id = {a} AND away_manager_id = {b})
+           OR (home_manager_id = {b} AND away_manager_id = {a})
+    """).fetchall()
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"  {label:<34} {elapsed * 1000:9.1f} ms{speedup}")
+    return elapsed
+
+
+def main():
+    fixtures = synthetic_fixtures()
+    rng = random.Random(SEED)
+    pairs = [tuple(f[2:4]) for f in rng.sample(fixtures, H2H_LOOKUPS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_utils.set_db_path(Path(tmp) / "bench.db")
+        init_db.init_database()
+        conn = db_utils.get_connection()
+
+        start = time.perf_counter()
+        with db_utils.transaction(conn):
+            conn.executemany("""
+                INSERT INTO cup_fixtures (round, gameweek, home_manager_id, away_manager_id, home_score, away_score)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, fixtures)
+        print(f"=== QUERIES ({len(fixtures):,} fixtures, {N_MANAGERS:,} managers) ===")
+        print(f"  loaded in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"Standings after every round ({len(ROUNDS)} tables):")
+        t_legacy = timed("f-string SQL + Python totals",
+                         lambda: [legacy_standings(conn, r) for r in ROUNDS])
+        timed("bound SQL + Python totals",
+              lambda: [cup_queries.group_standings(r, in_sql=False, conn=conn) for r in ROUNDS], t_legacy)
+        timed("bound SQL + GROUP BY totals",
+              lambda: [cup_queries.group_standings(r, conn=conn) for r in ROUNDS], t_legacy)
+
+        print(f"\nHead-to-head lookups ({H2H_LOOKUPS:,} pairs):")
+        t_legacy = timed("f-string SQL (re-prepared)", lambda: [legacy_head_to_head(conn, a, b) for a, b in pairs])
+        timed("bound SQL (cached statement)",
+              lambda: [cup_queries.head_to_head(a, b, conn) for a, b in pairs], t_legacy)
+
+        identical = all(
+            {m: dict(row) for m, row in legacy_standings(conn, r).items()}
+            == cup_queries.group_standings(r, conn=conn)
+            == cup_queries.group_standings(r, in_sql=False, conn=conn)
+            for r in (1, 5, 10)
+        )
+        print(f"\nSQL and Python totals match the baseline: {'✓' if identical else '✗'}")
+        db_utils.close_connections()
+
+
+if __name__ == "__main__":
+    main()
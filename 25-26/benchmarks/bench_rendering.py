@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Benchmark gradient backgrounds, full image renders, layout base caching and batch text caching."""
+
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from PIL import Image
+
+import generate_results_image
+import generate_standings_image
+import rendering
+
+TOP = generate_standings_image.COLORS["bg_gradient_top"]
+BOTTOM = generate_standings_image.COLORS["bg_gradient_bottom"]
+
+# Images rendered in the batch benchmark
+BATCH = 100
+
+# (label, width, height) matching the 20-manager images
+IMAGE_SIZES = [
+    ("standings", 900, 120 + 40 + 20 * 45 + 50),
+    ("results", 800, 120 + 10 * 80 + 50),
+]
+
+
+def legacy_gradient(width, height, color1, color2):
+    """The original per-pixel implementation, kept as the baseline."""
+    img = Image.new('RGB', (width, height))
+    for y in range(height):
+        ratio = y / height
+        r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
+        g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
+        b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
+        for x in range(width):
+            img.putpixel((x, y), (r, g, b))
+    return img
+
+
+def best_of(func, repeat=5):
+    """Return the fastest wall-clock time of `repeat` calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def sample_standings(n=20):
+    """Synthetic standings rows for render benchmarks."""
+    return [{
+        'name': f"Manager {i}", 'team_name': f"Team {i}",
+        'played': 10, 'won': i % 7, 'drawn': i % 3, 'lost': 10 - i % 7 - i % 3,
+        'points': 3 * (i % 7) + i % 3, 'fpl_total': 500 + i * 7,
+    } for i in range(n)]
+
+
+def sample_matches(n=10):
+    """Synthetic H2H matches for render benchmarks."""
+    return [{
+        'entry_1_player_name': f"Home {i}", 'entry_1_name': f"Home Team {i}",
+        'entry_1_points': 40 + i, 'entry_2_player_name': f"Away {i}",
+        'entry_2_name': f"Away Team {i}", 'entry_2_points': 60 - i,
+    } for i in range(n)]
+
+
+def clear_text_caches():
+    rendering.get_font.cache_clear()
+    rendering.text_bbox.cache_clear()
+    rendering.glyph_run.cache_clear()
+    generate_standings_image.STANDINGS_LAYOUT.cache_clear()
+    generate_results_image.RESULTS_LAYOUT.cache_clear()
+
+
+def encode_png(img):
+    img.save(io.BytesIO(), "PNG")
+
+
+def render_batch(n, cold):
+    """Render n images (alternating standings/results); `cold` drops font, text and layout caches before each."""
+    for i in range(n):
+        if cold:
+            clear_text_caches()
+        if i % 2:
+            generate_results_image.generate_results_image(21 + i % 18, sample_matches())
+        else:
+            generate_standings_image.generate_standings_image(sample_standings())
+
+
+def main():
+    print("=== GRADIENT ===")
+    for label, width, height in IMAGE_SIZES:
+        legacy = legacy_gradient(width, height, TOP, BOTTOM)
+        fast = rendering.create_gradient(width, height, TOP, BOTTOM)
+        identical = legacy.tobytes() == fast.tobytes()
+
+        t_legacy = best_of(lambda: legacy_gradient(width, height, TOP, BOTTOM), repeat=3)
+        rendering._cached_gradient.cache_clear()
+        t_cold = best_of(lambda: (rendering._cached_gradient.cache_clear(),
+                                  rendering.create_gradient(width, height, TOP, BOTTOM)))
+        t_warm = best_of(lambda: rendering.create_gradient(width, height, TOP, BOTTOM))
+
+        print(f"{label:<10} {width}x{height}  identical: {'✓' if identical else '✗'}")
+        print(f"  putpixel: {t_legacy * 1000:9.2f} ms")
+        print(f"  column:   {t_cold * 1000:9.2f} ms  ({t_legacy / t_cold:,.0f}x)")
+        print(f"  cached:   {t_warm * 1000:9.2f} ms  ({t_legacy / t_warm:,.0f}x)")
+
+    print("\n=== FULL RENDER ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_standings_image.OUTPUT_DIR = Path(tmp)
+        generate_results_image.OUTPUT_DIR = Path(tmp)
+        t_standings = best_of(lambda: generate_standings_image.generate_standings_image(sample_standings()))
+        t_results = best_of(lambda: generate_results_image.generate_results_image(21, sample_matches()))
+        print(f"standings: {t_standings * 1000:9.2f} ms")
+        print(f"results:   {t_results * 1000:9.2f} ms")
+
+        print("\n=== LAYOUT ===")
+        standings, matches = sample_standings(), sample_matches()
+        layouts = [
+            ("standings", generate_standings_image.STANDINGS_LAYOUT,
+             lambda: generate_standings_image.render_standings_image(standings)),
+            ("results", generate_results_image.RESULTS_LAYOUT,
+             lambda: generate_results_image.render_results_image(21, matches)),
+        ]
+        for label, layout, render in layouts:
+            t_base = best_of(lambda: (layout.cache_clear(), render()))
+            t_cells = best_of(render)
+            img = render()
+            t_encode = best_of(lambda: encode_png(img))
+            print(f"{label:<10} base + cells: {t_base * 1000:7.2f} ms  cells only: {t_cells * 1000:7.2f} ms"
+                  f"  ({t_base / t_cells:.1f}x)  PNG encode: {t_encode * 1000:7.2f} ms")
+
+        print(f"\n=== BATCH OF {BATCH} ===")
+        t_cold = best_of(lambda: render_batch(BATCH, cold=True), repeat=1)
+        clear_text_caches()
+        t_warm = best_of(lambda: render_batch(BATCH, cold=False), repeat=1)
+        info = rendering.glyph_run.cache_info()
+        print(f"no caches:      {t_cold * 1000:9.1f} ms  ({t_cold / BATCH * 1000:.1f} ms/image)")
+        print(f"cached:         {t_warm * 1000:9.1f} ms  ({t_warm / BATCH * 1000:.1f} ms/image, {t_cold / t_warm:.1f}x)")
+        print(f"glyph runs: {info.currsize} rasterized, {info.hits / (info.hits + info.misses):.0%} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Benchmark full-tiebreaker ranking for leagues of 20 to 5000 entrants."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import tiebreakers
+
+LEAGUE_SIZES = [20, 200, 2000, 5000]
+ROUNDS = 10
+SEED = 19
+
+
+def synthetic_league(n, seed=SEED):
+    """Ten rounds of random pairings with low, tie-prone scores, plus the resulting table."""
+    rng = random.Random(seed)
+    ids = list(range(1, n + 1))
+    fixtures = []
+    for round_num in range(1, ROUNDS + 1):
+        rng.shuffle(ids)
+        fixtures.extend({
+            'round': round_num, 'home_manager_id': ids[i], 'away_manager_id': ids[i + 1],
+            'home_score': rng.randint(0, 4), 'away_score': rng.randint(0, 4),
+        } for i in range(0, n - 1, 2))
+
+    table = {fpl_id: {'fpl_id': fpl_id, 'points': 0, 'fpl_total': 0} for fpl_id in range(1, n + 1)}
+    for f in fixtures:
+        for us, them, side in ((f['home_score'], f['away_score'], f['home_manager_id']),
+                               (f['away_score'], f['home_score'], f['away_manager_id'])):
+            table[side]['points'] += 3 if us > them else int(us == them)
+            table[side]['fpl_total'] += us
+    return fixtures, list(table.values())
+
+
+def rescan_mini_table(fixtures, group):
+    """Baseline: build each tied group's mini-league by scanning every fixture."""
+    members = set(group)
+    table = {m: [0, 0] for m in group}
+    for f in fixtures:
+        home, away = f['home_manager_id'], f['away_manager_id']
+        if home in members and away in members:
+            hs, as_ = f['home_score'], f['away_score']
+            table[home][0] += 3 if hs > as_ else int(hs == as_)
+            table[away][0] += 3 if as_ > hs else int(hs == as_)
+            table[home][1] += hs - as_
+            table[away][1] += as_ - hs
+    return {m: tuple(v) for m, v in table.items()}
+
+
+class RescanIndex(tiebreakers.H2HIndex):
+    def __init__(self, fixtures):
+        super().__init__()
+        self.fixtures = fixtures
+
+    def mini_table(self, group):
+        return rescan_mini_table(self.fixtures, group)
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    print("=== TIEBREAKER RANKING ===")
+    for n in LEAGUE_SIZES:
+        fixtures, standings = synthetic_league(n)
+        t_index, index = best_of(lambda: tiebreakers.H2HIndex(fixtures))
+        t_rank, ranked = best_of(lambda: tiebreakers.rank_standings([dict(r) for r in standings], index))
+        t_rescan, rescanned = best_of(
+            lambda: tiebreakers.rank_standings([dict(r) for r in standings], RescanIndex(fixtures)), repeat=1)
+
+        groups = tiebreakers._split(sorted(standings, key=lambda r: (-r['points'], -r['fpl_total'])),
+                                    lambda r: (r['points'], r['fpl_total']))
+        tied_groups = sum(1 for g in groups if len(g) > 1)
+        same = [r['fpl_id'] for r in ranked] == [r['fpl_id'] for r in rescanned]
+        playoff = tiebreakers.playoff_contenders(ranked)
+
+        print(f"N={n:<5} {len(fixtures):6,} fixtures  {tied_groups:4d} tied groups  "
+              f"index {t_index * 1000:7.2f} ms  rank {t_rank * 1000:7.2f} ms  "
+              f"rescan baseline {t_rescan * 1000:9.1f} ms  same order: {'✓' if same else '✗'}  "
+              f"playoff: {f'{len(playoff[0])} for {playoff[1]}' if playoff else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Check the cold-start cost of the text-only cup.py commands.
+
+Each command runs in a fresh interpreter under `python3 -X importtime`. Its
+import time is the sum of the top-level imports it triggers, leaving out
+what the bare interpreter imports anyway (site, encodings, ...). Exits 1 if a
+command is over budget or loads a heavy dependency it doesn't need.
+
+Usage: check_startup.py [--budget MS]
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent.parent
+CUP = PROJECT_DIR / "scripts" / "cup.py"
+
+BUDGET_MS = 100
+RUNS = 5
+
+# Text-only commands and what they must never import
+COMMANDS = [["notcup", "26"], ["pre", "21"]]
+HEAVY = ("requests", "urllib3", "PIL", "numpy", "dotenv")
+
+
+def importtime(argv, env):
+    """{top-level module: cumulative microseconds}, and every module imported."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env,
+                            capture_output=True, text=True, check=True)
+    top, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip().split(".")[0])
+        if not name[1:].startswith(" "):
+            top[name.strip()] = int(cumulative)
+    return top, modules
+
+
+def wall(argv, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *argv], env=env, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main(budget_ms=BUDGET_MS):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        database = PROJECT_DIR / "db" / "fantasy_cup.db"
+        if database.exists():
+            # Commands may migrate the database they open; never touch the real one
+            env["FANTASY_CUP_DB"] = shutil.copy(database, Path(tmp) / "fantasy_cup.db")
+
+        interpreter, _ = importtime(["-c", "pass"], env)
+        baseline = statistics.median(wall(["-c", "pass"], env) for _ in range(RUNS))
+
+        print(f"=== STARTUP (budget {budget_ms} ms of imports) ===")
+        failed = False
+        for command in COMMANDS:
+            samples = [importtime([str(CUP), *command], env) for _ in range(RUNS)]
+            ms = statistics.median(sum(us for name, us in top.items() if name not in interpreter)
+                                   for top, _ in samples) / 1000
+            heavy = sorted(set(HEAVY) & samples[0][1])
+            run_ms = (statistics.median(wall([str(CUP), *command], env) for _ in range(RUNS)) - baseline) * 1000
+            ok = ms <= budget_ms and not heavy
+            failed |= not ok
+            note = f"  imports {', '.join(heavy)}" if heavy else ""
+            print(f"  {'✓' if ok else '✗'} cup.py {' '.join(command):<12} {ms:7.1f} ms imports  "
+                  f"{run_ms:7.1f} ms over a bare interpreter{note}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        main()
+    elif len(args) == 2 and args[0] == "--budget" and args[1].isdigit():
+        main(int(args[1]))
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
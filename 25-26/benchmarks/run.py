@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the hot paths: draw, ingest, standings, images and messages.
+
+Every case runs against a synthetic league (fpl_replay.SyntheticLeague) and
+a throwaway database built from it, with fixed seeds, at several league
+sizes. Images and build-cache entries are written to the same temporary
+directory, never to images/ or cache/build/.
+
+`run` times every case (best of several runs, after a warm-up) and saves the
+results to cache/bench/<time>-<commit>.json. `compare` checks one saved run
+against another (default: the latest against the one before) and exits 1 if
+any case is more than --threshold times slower. Compare runs from the same
+machine, ideally a quiet one.
+
+--quick runs only the two smallest sizes; --only keeps cases whose name
+contains the given text.
+
+Usage: run.py run [--quick] [--only TEXT] | compare [BASE] [HEAD] [--threshold X] | history
+"""
+
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import build_cache
+import cup_standings
+import db_utils
+import fetch_fpl_gameweeks
+import fetch_league_managers
+import generate_results_image
+import generate_standings_image
+import generate_whatsapp_message
+import init_db
+from fpl_replay import SyntheticLeague
+from generate_swiss_draw import ROUND_TO_GAMEWEEK, generate_swiss_fixtures
+
+HISTORY_DIR = Path(__file__).parent.parent / "cache" / "bench"
+
+SEED = 22
+GAMEWEEK = 21               # Cup round 1; synthetic leagues are played through it
+
+SIZES = (20, 200, 2_000, 20_000)
+DRAW_SIZES = (20, 200, 2_000)
+IMAGE_SIZES = (20, 200)     # Images grow one row per manager
+
+MIN_RUNS = 3
+MAX_RUNS = 25
+TARGET_SECONDS = 0.5        # Stop repeating a case once this much time is spent
+
+THRESHOLD = 1.25            # compare: slower than this ratio is a regression
+NOISE_FLOOR = 0.001         # ...unless the difference is under a millisecond
+
+
+# ============ SYNTHETIC DATABASES ============
+
+class League:
+    """A synthetic league of `n` managers and a database holding its cup group stage."""
+
+    def __init__(self, n, root):
+        self.n = n
+        self.source = SyntheticLeague(n, seed=SEED, finished_through=GAMEWEEK).prepare()
+        table = self.source.standings()
+        self.entries = table['standings']['results']
+        self.info = table['league']
+        self.matches = self.source.matches(GAMEWEEK)
+        self.gameweeks = self.source.bootstrap()['events']
+
+        db_utils.set_db_path(Path(root) / f"league{n}.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_db.init_database()
+            fetch_league_managers.store_managers(self.entries, self.info)
+            fetch_fpl_gameweeks.store_gameweeks(self.gameweeks)
+
+        conn = db_utils.get_connection()
+        self.managers = dict(conn.execute("SELECT fpl_id, id FROM managers").fetchall())
+        self.scores = [(self.managers[entry], GAMEWEEK, *self.source.score(entry, GAMEWEEK))
+                       for entry in self.source.ids]
+        with db_utils.transaction(conn):
+            conn.executemany("""
+                INSERT INTO cup_fixtures (round, gameweek, home_manager_id, away_manager_id, home_score, away_score)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, self.cup_fixtures())
+
+    def cup_fixtures(self):
+        """Ten scored group-stage rounds of random pairings."""
+        rng = random.Random(SEED)
+        ids = list(self.source.ids)
+        fixtures = []
+        for round_num in range(1, 11):
+            rng.shuffle(ids)
+            fixtures.extend((round_num, ROUND_TO_GAMEWEEK[round_num], ids[i], ids[i + 1],
+                             rng.randint(20, 100), rng.randint(20, 100))
+                            for i in range(0, len(ids) - 1, 2))
+        return fixtures
+
+
+# ============ CASES ============
+# Each case takes a League and returns the zero-argument call to time.
+
+def case_draw(league):
+    return lambda: generate_swiss_fixtures(list(league.source.ids), rounds=10, seed=SEED)
+
+
+def case_store_managers(league):
+    return lambda: fetch_league_managers.store_managers(league.entries, league.info)
+
+
+def case_store_h2h_results(league):
+    return lambda: fetch_league_managers.store_h2h_results(league.matches, GAMEWEEK)
+
+
+def case_store_gameweeks(league):
+    return lambda: fetch_fpl_gameweeks.store_gameweeks(league.gameweeks)
+
+
+def case_record_gameweek_scores(league):
+    return lambda: db_utils.record_gameweek_scores(league.scores)
+
+
+def case_standings_python(league):
+    return lambda: cup_standings.calculate_standings_from_db(in_sql=False)
+
+
+def case_standings_sql(league):
+    return lambda: cup_standings.calculate_standings_from_db(in_sql=True)
+
+
+def case_standings_materialized(league):
+    return lambda: cup_standings.get_standings()
+
+
+def case_standings_image(league):
+    rows = cup_standings.get_standings()
+    return lambda: generate_standings_image.generate_standings_image(rows, round_num=10, force=True)
+
+
+def case_standings_image_cached(league):
+    rows = cup_standings.get_standings()
+    return lambda: generate_standings_image.generate_standings_image(rows, round_num=10)
+
+
+def case_results_image(league):
+    return lambda: generate_results_image.generate_results_image(GAMEWEEK, league.matches, force=True)
+
+
+def case_results_image_cached(league):
+    return lambda: generate_results_image.generate_results_image(GAMEWEEK, league.matches)
+
+
+def case_pre_gameweek_message(league):
+    return lambda: generate_whatsapp_message.generate_pre_gameweek_message(GAMEWEEK)
+
+
+def case_post_gameweek_message(league):
+    return lambda: generate_whatsapp_message.generate_post_gameweek_message(
+        GAMEWEEK, results=league.matches, standings=league.entries, force=True)
+
+
+def case_draw_message(league):
+    fixtures = generate_whatsapp_message.get_fixtures_for_round(1)
+    return lambda: generate_whatsapp_message.generate_draw_message(fixtures)
+
+
+# (name, setup, sizes)
+CASES = [
+    ("draw", case_draw, DRAW_SIZES),
+    ("ingest.store_managers", case_store_managers, SIZES),
+    ("ingest.store_h2h_results", case_store_h2h_results, SIZES),
+    ("ingest.store_gameweeks", case_store_gameweeks, SIZES[:1]),
+    ("ingest.record_gameweek_scores", case_record_gameweek_scores, SIZES),
+    ("standings.python", case_standings_python, SIZES),
+    ("standings.sql", case_standings_sql, SIZES),
+    ("standings.materialized", case_standings_materialized, SIZES),
+    ("image.standings", case_standings_image, IMAGE_SIZES),
+    ("image.standings_cached", case_standings_image_cached, IMAGE_SIZES),
+    ("image.results", case_results_image, IMAGE_SIZES),
+    ("image.results_cached", case_results_image_cached, IMAGE_SIZES),
+    ("message.pre_gameweek", case_pre_gameweek_message, SIZES),
+    ("message.post_gameweek", case_post_gameweek_message, SIZES),
+    ("message.draw", case_draw_message, SIZES),
+]
+
+
+def measure(func):
+    """Warm up once, then time `func` until TARGET_SECONDS or MAX_RUNS. Returns timings in seconds."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        timings = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            while len(timings) < MIN_RUNS or (sum(timings) < TARGET_SECONDS and len(timings) < MAX_RUNS):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    return timings
+
+
+@contextlib.contextmanager
+def isolated_outputs(root):
+    """Point image output and the build cache at `root` for the duration."""
+    saved = (generate_standings_image.OUTPUT_DIR, generate_results_image.OUTPUT_DIR, build_cache._cache)
+    generate_standings_image.OUTPUT_DIR = generate_results_image.OUTPUT_DIR = Path(root) / "images"
+    build_cache._cache = build_cache.BuildCache(Path(root) / "build")
+    try:
+        yield
+    finally:
+        generate_standings_image.OUTPUT_DIR, generate_results_image.OUTPUT_DIR, build_cache._cache = saved
+
+
+def run(quick=False, only=None):
+    """Time every selected case at each of its sizes. Returns {case/size: stats}."""
+    sizes = SIZES[:2] if quick else SIZES
+    cases = [(name, setup, case_sizes) for name, setup, case_sizes in CASES if not only or only in name]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp, isolated_outputs(tmp):
+        for n in sizes:
+            selected = [(name, setup) for name, setup, case_sizes in cases if n in case_sizes]
+            if not selected:
+                continue
+            start = time.perf_counter()
+            league = League(n, tmp)
+            print(f"=== {n:,} managers (built in {time.perf_counter() - start:.1f}s) ===")
+            for name, setup in selected:
+                timings = measure(setup(league))
+                key = f"{name}/{n}"
+                results[key] = {
+                    'min': min(timings),
+                    'median': statistics.median(timings),
+                    'runs': len(timings),
+                }
+                print(f"  {name:<32} {min(timings) * 1000:10.2f} ms  "
+                      f"(median {statistics.median(timings) * 1000:.2f}, {len(timings)} runs)")
+        db_utils.close_connections()
+    return results
+
+
+# ============ HISTORY ============
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(results):
+    commit = git_commit()
+    now = datetime.now()
+    path = HISTORY_DIR / f"{now.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'created': now.isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results,
+    }, indent=2))
+    return path
+
+
+def saved_runs():
+    return sorted(HISTORY_DIR.glob("*.json")) if HISTORY_DIR.exists() else []
+
+
+def resolve_run(name):
+    """A saved run by path or file name (with or without .json)."""
+    for candidate in (Path(name), HISTORY_DIR / name, HISTORY_DIR / f"{name}.json"):
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(name)
+
+
+def compare(base_path, head_path, threshold=THRESHOLD):
+    """Print case-by-case ratios of two saved runs. Returns the regressed case names."""
+    base = json.loads(Path(base_path).read_text())['results']
+    head = json.loads(Path(head_path).read_text())['results']
+    print(f"=== {Path(head_path).stem} vs {Path(base_path).stem} (threshold {threshold:.2f}x) ===")
+
+    regressions = []
+    for key in sorted(set(base) | set(head)):
+        if key not in base or key not in head:
+            print(f"  {key:<40} {'only in ' + ('head' if key in head else 'base'):>28}")
+            continue
+        before, after = base[key]['min'], head[key]['min']
+        ratio = after / before if before else float('inf')
+        slower = ratio > threshold and after - before > NOISE_FLOOR
+        if slower:
+            regressions.append(key)
+        print(f"  {key:<40} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  {ratio:5.2f}x  "
+              f"{'✗' if slower else '✓'}")
+
+    print(f"\n{len(regressions)} regressions" if regressions else "\n✓ No regressions")
+    return regressions
+
+
+def history():
+    runs = saved_runs()
+    if not runs:
+        print(f"No saved runs in {HISTORY_DIR}")
+    for path in runs:
+        data = json.loads(path.read_text())
+        print(f"  {path.stem:<28} {data['commit']:<10} {len(data['results']):3d} cases  python {data['python']}")
+
+
+def usage():
+    print(__doc__.strip().splitlines()[-1])
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "run"
+
+    if command == "run":
+        quick = "--quick" in args
+        if quick:
+            args.remove("--quick")
+        only = None
+        if args[:1] == ["--only"] and len(args) == 2:
+            only = args[1]
+        elif args:
+            usage()
+        path = save(run(quick=quick, only=only))
+        print(f"\n✓ Saved {path}")
+    elif command == "compare":
+        threshold = THRESHOLD
+        if "--threshold" in args:
+            i = args.index("--threshold")
+            try:
+                threshold = float(args[i + 1])
+            except (IndexError, ValueError):
+                usage()
+            del args[i:i + 2]
+        if len(args) > 2:
+            usage()
+        runs = saved_runs()
+        try:
+            paths = [resolve_run(name) for name in args]
+        except FileNotFoundError as e:
+            print(f"✗ No saved run {e}")
+            sys.exit(1)
+        if not paths:
+            paths = runs[-2:]
+        elif len(paths) == 1 and runs:
+            paths.append(runs[-1])
+        if len(paths) < 2 or paths[0] == paths[1]:
+            print("✗ Need two saved runs to compare")
+            sys.exit(1)
+        sys.exit(1 if compare(*paths, threshold=threshold) else 0)
+    elif command == "history":
+        history()
+    else:
+        usage()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for generated images and messages.
+
+Every output is keyed by a hash of its inputs (the data it is drawn from,
+plus layout version and fonts for images). Artifacts are stored once under
+cache/build/objects/<hash>; on a hit the stored artifact is reused and the
+output file is only rewritten if it doesn't already hold it. Footer
+timestamps are not part of the key, so a cached image keeps the time it was
+first rendered.
+
+cache/build/manifest.json records each output's key and whether its last
+request was a hit or a miss.
+
+Usage: build_cache.py [show|clear]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from instrument import count
+
+CACHE_DIR = Path(__file__).parent.parent / "cache" / "build"
+
+
+def digest(*parts):
+    """Stable hash of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def table_digest(conn, *tables):
+    """Hash of the full contents of small tables (inputs that aren't passed in explicitly)."""
+    h = hashlib.sha256()
+    for table in tables:
+        h.update(table.encode())
+        for row in conn.execute(f"SELECT * FROM {table} ORDER BY rowid"):
+            h.update(repr(tuple(row)).encode())
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Object store plus manifest. Safe to share between threads."""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifest_path = self.root / "manifest.json"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    # ============ FILES ============
+
+    def lookup(self, path, key):
+        """
+        If an artifact for `key` exists, make sure `path` holds it and return
+        True (a hit); otherwise return False.
+        """
+        path = Path(path)
+        obj = self._object(key, path.suffix)
+        if not obj.exists():
+            return False
+        if self.manifest().get(path.name, {}).get('key') != key or not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(obj, path)
+        self._record(path.name, key, hit=True)
+        return True
+
+    def store(self, path, key, data):
+        """Save `data` (bytes) as the artifact for `key` and write it to `path`."""
+        path = Path(path)
+        self._write(self._object(key, path.suffix), data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, data)
+        self._record(path.name, key, hit=False)
+
+    def file(self, path, inputs, build, force=False):
+        """
+        Bring `path` up to date for `inputs`, calling `build()` (which returns
+        bytes) only when no artifact exists for them, or `force` is set.
+        Returns True on a cache hit.
+        """
+        key = digest(Path(path).name, inputs)
+        if not force and self.lookup(path, key):
+            return True
+        self.store(path, key, build())
+        return False
+
+    # ============ VALUES ============
+
+    def value(self, name, inputs, build, force=False):
+        """Return the cached JSON-serializable value for (name, inputs), computing it on a miss."""
+        key = digest(name, inputs)
+        obj = self._object(key, ".json")
+        if not force and obj.exists():
+            self._record(name, key, hit=True)
+            return json.loads(obj.read_text())
+        value = build()
+        self._write(obj, json.dumps(value).encode())
+        self._record(name, key, hit=False)
+        return value
+
+    # ============ MANIFEST ============
+
+    def manifest(self):
+        with self._lock:
+            if self._manifest is None:
+                try:
+                    self._manifest = json.loads(self.manifest_path.read_text())
+                except FileNotFoundError:
+                    self._manifest = {}
+            return self._manifest
+
+    def report(self):
+        total = self.hits + self.misses
+        return f"build cache: {self.hits}/{total} hits, {self.misses} rebuilt"
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._lock:
+            self._manifest = None
+
+    def _record(self, name, key, hit):
+        count("build_cache.hits" if hit else "build_cache.misses")
+        manifest = self.manifest()
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            manifest[name] = {
+                'key': key,
+                'status': 'hit' if hit else 'miss',
+                'at': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._write(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    def _object(self, key, suffix):
+        return self.objects / key[:2] / f"{key}{suffix}"
+
+    @staticmethod
+    def _write(path, data):
+        """Atomically replace `path` with `data`."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+_cache = None
+
+
+def get_build_cache():
+    """Return the process-wide build cache."""
+    global _cache
+    if _cache is None:
+        _cache = BuildCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+    cache = get_build_cache()
+
+    if command == "clear":
+        cache.clear()
+        print(f"Cleared {CACHE_DIR}")
+    elif command == "show":
+        manifest = cache.manifest()
+        objects = list(cache.objects.rglob("*.*")) if cache.objects.exists() else []
+        size = sum(f.stat().st_size for f in objects)
+        print(f"Cache: {CACHE_DIR}")
+        print(f"Artifacts: {len(objects)} ({size / 1024:.1f} KB)")
+        for name, entry in sorted(manifest.items()):
+            mark = '✓' if entry['status'] == 'hit' else '✗'
+            print(f"  {mark} {name:<28} {entry['status']:<4} {entry['at']}  {entry['key'][:12]}")
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Rundisliga Cup command line.
+
+One entry point for the weekly jobs:
+
+    draw        Swiss draw for the group stage (generate_swiss_draw.py)
+    fetch       record every manager's scores and the cup results (fetch_gameweek_scores.py)
+    pre         pre-gameweek reminder message
+    post        results image, standings image and message in one pass
+    notcup      break-week message
+    standings   standings image (after a round, or the current table)
+    results     results image for a gameweek
+
+Each command imports only what it uses, so the text-only ones start without
+loading requests or Pillow; benchmarks/check_startup.py holds them to an
+import-time budget.
+
+post <gw> runs the whole post-gameweek step in one process: the gameweek's
+H2H results, the H2H table and the cup table are loaded once, then the
+results image, standings image and WhatsApp message are produced in
+parallel from that shared data. A per-stage timing breakdown is printed and
+the run's trace (stages, HTTP/cache/row counters) is written to logs/ (see
+instrument.py). Outputs whose inputs are unchanged come from the build cache
+(see build_cache.py) unless --force is given. --profile adds a cProfile and
+tracemalloc capture to the trace; outputs are then produced one at a time so
+the profiler sees all of them.
+
+Usage: cup.py draw [--seed N] [--rounds N] [--pots N] | fetch [gameweek] [--fixtures-dir DIR] [--workers N] | pre <gameweek> | post <gameweek> [--odds] [--force] [--profile] | notcup <gameweek> | standings [round] [--force] | results <gameweek> [--force]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+# One worker per independent output
+POST_WORKERS = 3
+
+
+def load_post_dataset(gw):
+    """
+    Everything the post-gameweek outputs need, fetched once.
+
+    The H2H matches and H2H table are independent requests, so they are
+    fetched side by side.
+    """
+    from cup_standings import get_standings
+    from fpl_client import fetch_h2h_matches, fetch_h2h_standings
+    from generate_whatsapp_message import GAMEWEEK_TO_ROUND, LEAGUE_ID
+
+    round_num = GAMEWEEK_TO_ROUND.get(gw)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        matches = pool.submit(fetch_h2h_matches, LEAGUE_ID, gw)
+        table = pool.submit(fetch_h2h_standings, LEAGUE_ID)
+        h2h_entries, _ = table.result()
+        matches = matches.result()
+
+    return {
+        'gameweek': gw,
+        'round': round_num,
+        'matches': matches,
+        'h2h_entries': h2h_entries,
+        'cup_standings': get_standings() if isinstance(round_num, int) else [],
+    }
+
+
+def post_outputs(dataset, odds=False, force=False):
+    """Map output name -> callable producing it from the shared dataset."""
+    from generate_results_image import generate_results_image
+    from generate_standings_image import calculate_standings_from_h2h, generate_standings_image
+    from generate_whatsapp_message import generate_post_gameweek_message
+
+    gw = dataset['gameweek']
+    outputs = {
+        'results_image': lambda: generate_results_image(gw, matches=dataset['matches'], force=force),
+        'message': lambda: generate_post_gameweek_message(
+            gw, odds=odds, results=dataset['matches'], standings=dataset['h2h_entries'],
+            cup_standings=dataset['cup_standings'], force=force),
+    }
+    if isinstance(dataset['round'], int):
+        # Cup table; the H2H table stands in before any cup results exist
+        standings = [dict(row) for row in dataset['cup_standings']] or \
+            calculate_standings_from_h2h(entries=dataset['h2h_entries'])
+        outputs['standings_image'] = lambda: generate_standings_image(standings_data=standings, force=force)
+    return outputs
+
+
+def run_post(gw, odds=False, dataset=None, force=False):
+    """
+    Produce every post-gameweek output for `gw`. Returns {output: result}.
+
+    Each stage ('load' and one per output) is timed as a span in the
+    process trace. Pass `dataset` to skip loading (e.g. data already in memory).
+    """
+    if dataset is None:
+        with instrument.span('load'):
+            dataset = load_post_dataset(gw)
+
+    outputs = post_outputs(dataset, odds, force)
+
+    def produce(name):
+        with instrument.span(name):
+            return outputs[name]()
+
+    # cProfile only sees the thread it was started on, so profile runs stay on it
+    if instrument.profiling_active():
+        return {name: produce(name) for name in outputs}
+    with ThreadPoolExecutor(max_workers=POST_WORKERS) as pool:
+        futures = {name: pool.submit(produce, name) for name in outputs}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def post(gw, odds=False, force=False, profile=False):
+    """CLI: run the post-gameweek step and report what was produced."""
+    from build_cache import get_build_cache
+    from generate_whatsapp_message import GAMEWEEK_TO_ROUND, NON_CUP_WEEKS
+
+    if gw in NON_CUP_WEEKS or gw not in GAMEWEEK_TO_ROUND:
+        print(f"No cup results for GW{gw}")
+        return
+
+    if profile:
+        instrument.start_profiling(instrument.PROFILE_KINDS)
+    start = time.perf_counter()
+    with instrument.span('post'):
+        results = run_post(gw, odds, force=force)
+    wall = time.perf_counter() - start
+
+    if results.get('message'):
+        print()
+        print(results['message'])
+
+    print("\n=== TIMINGS ===")
+    stages = instrument.get_trace().stage_totals()
+    for name in ['load', *results]:
+        if name in stages:
+            print(f"  {name:<16} {stages[name] * 1000:8.1f} ms")
+    print(f"  {'total (wall)':<16} {wall * 1000:8.1f} ms")
+    print(get_build_cache().report())
+    path = instrument.write_trace('post', gameweek=gw, odds=odds, force=force, profile=profile)
+    print(f"Trace saved: {path}")
+
+
+# ============ COMMANDS ============
+
+def parse_args(args, positional=0, flags=(), options=()):
+    """
+    Split `args` into up to `positional` integers, boolean `flags` and
+    `options` that take a value. Returns (numbers, {name: value}), or None
+    if anything else is present.
+    """
+    numbers, parsed = [], {}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in flags:
+            parsed[arg[2:].replace("-", "_")] = True
+        elif arg in options and args:
+            parsed[arg[2:].replace("-", "_")] = args.pop(0)
+        elif arg.isdigit() and len(numbers) < positional:
+            numbers.append(int(arg))
+        else:
+            return None
+    return numbers, parsed
+
+
+def draw(args):
+    parsed = parse_args(args, options=("--seed", "--rounds", "--pots"))
+    if parsed is None:
+        return False
+    if not all(value.isdigit() for value in parsed[1].values()):
+        return False
+    options = {name: int(value) for name, value in parsed[1].items()}
+    # Later rounds in cup_fixtures are the knockouts
+    if options.get("rounds", 10) > 10:
+        print("The group stage has at most 10 rounds")
+        sys.exit(1)
+
+    from generate_swiss_draw import main
+    try:
+        main(**options)
+    except ValueError as e:
+        # Impossible pot/round combination for this league size
+        print(f"✗ {e}")
+        sys.exit(1)
+    return True
+
+
+def fetch(args):
+    parsed = parse_args(args, positional=1, options=("--fixtures-dir", "--workers"))
+    if parsed is None:
+        return False
+    numbers, options = parsed
+    if "workers" in options:
+        if not options["workers"].isdigit():
+            return False
+        options["workers"] = int(options["workers"])
+
+    from fetch_gameweek_scores import main
+    main(numbers[0] if numbers else None, **options)
+    return True
+
+
+def message(kind):
+    def command(args):
+        parsed = parse_args(args, positional=1)
+        if not parsed or not parsed[0]:
+            return False
+        import generate_whatsapp_message
+        generate = {
+            "pre": generate_whatsapp_message.generate_pre_gameweek_message,
+            "notcup": generate_whatsapp_message.generate_not_cup_week_message,
+        }[kind]
+        print(generate(parsed[0][0]))
+        return True
+    return command
+
+
+def post_command(args):
+    parsed = parse_args(args, positional=1, flags=("--odds", "--force", "--profile"))
+    if not parsed or not parsed[0]:
+        return False
+    post(parsed[0][0], **parsed[1])
+    return True
+
+
+def standings(args):
+    parsed = parse_args(args, positional=1, flags=("--force",))
+    if parsed is None:
+        return False
+    numbers, flags = parsed
+    from generate_standings_image import generate_standings_image
+    generate_standings_image(round_num=numbers[0] if numbers else None, **flags)
+    return True
+
+
+def results(args):
+    parsed = parse_args(args, positional=1, flags=("--force",))
+    if not parsed or not parsed[0]:
+        return False
+    from generate_results_image import generate_results_image
+    generate_results_image(parsed[0][0], **parsed[1])
+    return True
+
+
+COMMANDS = {
+    "draw": draw,
+    "fetch": fetch,
+    "pre": message("pre"),
+    "post": post_command,
+    "notcup": message("notcup"),
+    "standings": standings,
+    "results": results,
+}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = COMMANDS.get(args[0]) if args else None
+    if command is None or not command(args[1:]):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Read queries for cup fixtures and standings.
+
+Every statement is a fixed string with bound parameters, so the connection's
+statement cache (db_utils.STATEMENT_CACHE_SIZE) prepares each one once per
+connection however many rounds or managers it is asked about. Optional
+filters become a bound value (no `through_round` binds the last group-stage
+round) rather than extra SQL text.
+
+Standings can be aggregated in SQL (GROUP BY with CASE) or, for
+cross-checking, accumulated in Python from the scored fixtures.
+Per-manager reads (aggregation, head-to-head) are served by the
+idx_cup_fixtures_home/away indexes.
+"""
+
+from collections import defaultdict
+
+from db_utils import get_connection
+from instrument import timed
+from migrations import GROUP_STAGE_ROUNDS
+
+FIXTURES_BY_ROUND = "SELECT * FROM cup_fixtures WHERE round = ? ORDER BY id"
+
+FIXTURES_BY_GAMEWEEK = "SELECT * FROM cup_fixtures WHERE gameweek = ? ORDER BY id"
+
+# Group-stage fixtures with both scores, up to and including a round
+SCORED_GROUP_FIXTURES = """
+    SELECT id, round, home_manager_id, away_manager_id, home_score, away_score
+    FROM cup_fixtures
+    WHERE round <= ? AND home_score IS NOT NULL AND away_score IS NOT NULL
+    ORDER BY round, id
+"""
+
+# Every meeting of two managers, either way round
+HEAD_TO_HEAD = """
+    SELECT * FROM cup_fixtures WHERE home_manager_id = ?1 AND away_manager_id = ?2
+    UNION ALL
+    SELECT * FROM cup_fixtures WHERE home_manager_id = ?2 AND away_manager_id = ?1
+    ORDER BY round, id
+"""
+
+# Totals per manager for each side of the scored fixtures, home games then
+# away games. Each half streams in manager order off its covering index
+# (idx_cup_fixtures_home/away), so grouping needs no temporary sort; a
+# manager's two rows are added together in Python.
+STANDINGS_AGGREGATE = """
+    SELECT home_manager_id AS manager_id,
+           COUNT(*) AS played,
+           SUM(CASE WHEN home_score > away_score THEN 1 ELSE 0 END) AS won,
+           SUM(CASE WHEN home_score = away_score THEN 1 ELSE 0 END) AS drawn,
+           SUM(CASE WHEN home_score < away_score THEN 1 ELSE 0 END) AS lost,
+           SUM(CASE WHEN home_score > away_score THEN 3 WHEN home_score = away_score THEN 1 ELSE 0 END) AS points,
+           SUM(home_score) AS fpl_total
+    FROM cup_fixtures
+    WHERE round <= ?1 AND home_score IS NOT NULL AND away_score IS NOT NULL
+    GROUP BY home_manager_id
+    UNION ALL
+    SELECT away_manager_id,
+           COUNT(*),
+           SUM(CASE WHEN away_score > home_score THEN 1 ELSE 0 END),
+           SUM(CASE WHEN away_score = home_score THEN 1 ELSE 0 END),
+           SUM(CASE WHEN away_score < home_score THEN 1 ELSE 0 END),
+           SUM(CASE WHEN away_score > home_score THEN 3 WHEN away_score = home_score THEN 1 ELSE 0 END),
+           SUM(away_score)
+    FROM cup_fixtures
+    WHERE round <= ?1 AND home_score IS NOT NULL AND away_score IS NOT NULL
+    GROUP BY away_manager_id
+"""
+
+STANDINGS_FIELDS = ('played', 'won', 'drawn', 'lost', 'points', 'fpl_total')
+
+
+def last_round(through_round=None):
+    """The last group-stage round a `through_round` filter covers."""
+    return min(through_round, GROUP_STAGE_ROUNDS) if through_round else GROUP_STAGE_ROUNDS
+
+
+@timed("db.fixtures_by_round")
+def fixtures_by_round(round_num, conn=None):
+    """All fixtures of a cup round, as dicts."""
+    conn = conn or get_connection()
+    return [dict(row) for row in conn.execute(FIXTURES_BY_ROUND, (round_num,))]
+
+
+@timed("db.fixtures_by_gameweek")
+def fixtures_by_gameweek(gameweek, conn=None):
+    """All cup fixtures played in a gameweek, as dicts."""
+    conn = conn or get_connection()
+    return [dict(row) for row in conn.execute(FIXTURES_BY_GAMEWEEK, (gameweek,))]
+
+
+@timed("db.scored_group_fixtures")
+def scored_group_fixtures(through_round=None, conn=None):
+    """Group-stage fixtures with a result, through a round (default: all), in round order."""
+    conn = conn or get_connection()
+    return conn.execute(SCORED_GROUP_FIXTURES, (last_round(through_round),)).fetchall()
+
+
+@timed("db.head_to_head")
+def head_to_head(manager_a, manager_b, conn=None):
+    """Every cup fixture between two managers (FPL ids), in round order."""
+    conn = conn or get_connection()
+    return [dict(row) for row in conn.execute(HEAD_TO_HEAD, (manager_a, manager_b))]
+
+
+@timed("db.group_standings")
+def group_standings(through_round=None, in_sql=True, conn=None):
+    """
+    Group-stage totals per manager through a round (default: all).
+
+    Returns {fpl_id: {played, won, drawn, lost, points, fpl_total}}. With
+    `in_sql` the aggregation runs in SQLite; otherwise the scored fixtures
+    are read and accumulated in Python.
+    """
+    conn = conn or get_connection()
+    if in_sql:
+        standings = {}
+        for manager_id, *totals in conn.execute(STANDINGS_AGGREGATE, (last_round(through_round),)):
+            if manager_id in standings:
+                row = standings[manager_id]
+                for field, value in zip(STANDINGS_FIELDS, totals):
+                    row[field] += value
+            else:
+                standings[manager_id] = dict(zip(STANDINGS_FIELDS, totals))
+        return standings
+
+    standings = defaultdict(lambda: dict.fromkeys(STANDINGS_FIELDS, 0))
+    for match in scored_group_fixtures(through_round, conn):
+        for manager_id, us, them in ((match['home_manager_id'], match['home_score'], match['away_score']),
+                                     (match['away_manager_id'], match['away_score'], match['home_score'])):
+            row = standings[manager_id]
+            row['played'] += 1
+            row['fpl_total'] += us
+            if us > them:
+                row['won'] += 1
+                row['points'] += 3
+            elif us < them:
+                row['lost'] += 1
+            else:
+                row['drawn'] += 1
+                row['points'] += 1
+    return dict(standings)
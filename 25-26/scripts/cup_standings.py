@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Read and verify the materialized Rundisliga Cup group-stage standings.
+
+cup_standings (current table) and cup_standings_rounds (table after each
+round) are maintained by triggers on cup_fixtures, so recording a score
+updates them incrementally. Reading standings is a single indexed query.
+"""
+
+import sys
+from collections import defaultdict
+
+from cup_queries import group_standings, scored_group_fixtures
+from db_utils import get_connection, transaction
+from migrations import GROUP_STAGE_ROUNDS, rebuild_standings
+from tiebreakers import H2HIndex, playoff_contenders, rank_standings
+
+
+def get_standings(through_round=None):
+    """
+    Get the group-stage table, optionally as it stood after a round.
+
+    Returns dicts shaped like the standings image expects (fpl_id, name,
+    team_name, played, won, drawn, lost, points, fpl_total). Managers without
+    a recorded result are omitted.
+    """
+    if through_round is None:
+        table, where, params = "cup_standings", "", ()
+    else:
+        table, where, params = "cup_standings_rounds", "WHERE s.round = ?", (through_round,)
+
+    cursor = get_connection().execute(f"""
+        SELECT s.manager_id AS fpl_id, m.name, m.team_name,
+               s.played, s.wins AS won, s.draws AS drawn, s.losses AS lost,
+               s.points, s.fpl_total
+        FROM {table} s
+        LEFT JOIN managers m ON m.fpl_id = s.manager_id
+        {where}
+    """, params)
+    return [dict(row) for row in cursor.fetchall() if row['played']]
+
+
+def calculate_standings_from_db(through_round=None, in_sql=False):
+    """
+    Calculate standings from cup_fixtures table.
+
+    A full recompute, independent of the materialized tables; see
+    cup_queries.group_standings for the options.
+    """
+    return group_standings(through_round, in_sql=in_sql)
+
+
+def standings_by_round(through_round=GROUP_STAGE_ROUNDS, ranked=False):
+    """
+    Table after every group-stage round up to `through_round`, from one
+    ordered pass over cup_fixtures.
+
+    Returns {round: [rows]} with rows shaped like get_standings(). Rounds
+    without a recorded score are omitted. With `ranked`, each round's rows
+    are sorted by the full tiebreakers, head-to-head taken from a single
+    index built up in the same pass.
+    """
+    conn = get_connection()
+    managers = {row['fpl_id']: row for row in conn.execute("SELECT fpl_id, name, team_name FROM managers")}
+    fixtures = scored_group_fixtures(through_round, conn)
+
+    fields = ('played', 'won', 'drawn', 'lost', 'points', 'fpl_total')
+    table = defaultdict(lambda: [0] * len(fields))
+    snapshots = {}
+    index = H2HIndex() if ranked else None
+
+    def snapshot():
+        rows = [{
+            'fpl_id': fpl_id,
+            'name': managers[fpl_id]['name'] if fpl_id in managers else None,
+            'team_name': managers[fpl_id]['team_name'] if fpl_id in managers else None,
+            **dict(zip(fields, row)),
+        } for fpl_id, row in table.items()]
+        return rank_standings(rows, index) if ranked else rows
+
+    current = None
+    for match in fixtures:
+        if match['round'] != current:
+            if current is not None:
+                snapshots[current] = snapshot()
+            current = match['round']
+        if ranked:
+            index.add(match['home_manager_id'], match['away_manager_id'], match['home_score'], match['away_score'])
+
+        for us, them, fpl_id in ((match['home_score'], match['away_score'], match['home_manager_id']),
+                                 (match['away_score'], match['home_score'], match['away_manager_id'])):
+            row = table[fpl_id]
+            row[0] += 1
+            row[1 if us > them else 3 if us < them else 2] += 1
+            row[4] += 3 if us > them else int(us == them)
+            row[5] += us
+
+    if current is not None:
+        snapshots[current] = snapshot()
+    return snapshots
+
+
+def rebuild():
+    """Recompute the materialized tables from cup_fixtures."""
+    with transaction(get_connection()) as conn:
+        rebuild_standings(conn)
+
+
+def check_consistency():
+    """Compare the materialized tables with a full recompute. Returns True if they match."""
+    fields = ('played', 'won', 'drawn', 'lost', 'points', 'fpl_total')
+    all_ok = True
+
+    print("=== STANDINGS CONSISTENCY CHECK ===")
+    for through_round in [None, *range(1, GROUP_STAGE_ROUNDS + 1)]:
+        expected = {
+            manager_id: tuple(row[f] for f in fields)
+            for manager_id, row in calculate_standings_from_db(through_round).items()
+        }
+        actual = {
+            row['fpl_id']: tuple(row[f] for f in fields)
+            for row in get_standings(through_round)
+        }
+
+        mismatched = {m for m in expected.keys() | actual.keys() if expected.get(m) != actual.get(m)}
+        ok = not mismatched
+        all_ok = all_ok and ok
+        label = "current" if through_round is None else f"after round {through_round}"
+        print(f"{label:<16} {'✓' if ok else '✗'}  ({len(actual)} managers)")
+        for manager_id in sorted(mismatched):
+            print(f"  Manager {manager_id}: expected {expected.get(manager_id)}, got {actual.get(manager_id)}")
+
+    return all_ok
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+
+    if command == "show":
+        through_round = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        rows = rank_standings(get_standings(through_round), H2HIndex.from_db(through_round))
+        for row in rows:
+            print(f"{row['position']:2d}.{'=' if row['tied'] else ' '}{row['name'] or row['fpl_id']:<25} "
+                  f"{row['played']}P {row['won']}W {row['drawn']}D {row['lost']}L "
+                  f"{row['points']:3d} PTS ({row['fpl_total']} FPL)")
+        playoff = playoff_contenders(rows)
+        if playoff:
+            contenders, spots = playoff
+            print(f"\nPlayoff: {len(contenders)} teams on {contenders[0]['points']} PTS for {spots} spot(s)")
+    elif command == "check":
+        sys.exit(0 if check_consistency() else 1)
+    elif command == "rebuild":
+        rebuild()
+        print("Rebuilt cup standings")
+    else:
+        print("Usage: cup_standings.py [show [round]|check|rebuild]")
+        sys.exit(1)
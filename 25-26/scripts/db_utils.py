@@ -1,67 +1,201 @@
 #!/usr/bin/env python3
 """Utility functions for interacting with the Fantasy Cup database."""
 
+import atexit
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
+from instrument import count, span
 
+DB_PATH = Path(os.getenv("FANTASY_CUP_DB", Path(__file__).parent.parent / "db" / "fantasy_cup.db"))
 
-def get_connection():
-    """Get a database connection with row factory enabled."""
-    conn = sqlite3.connect(DB_PATH)
+# Applied to every connection. WAL lets readers (image generation) run while
+# the fetcher writes; NORMAL sync is durable enough in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",       # ~16 MB page cache
+    "PRAGMA mmap_size = 67108864",      # 64 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Prepared statements kept per connection, so repeated queries skip re-parsing
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_all_connections = []
+_registry_lock = threading.Lock()
+_generation = 0     # Bumped whenever shared connections are closed
+_migrated = set()   # Database paths already brought up to the latest schema
+
+MANAGER_UPSERT = """
+    INSERT INTO managers (fpl_id, name, team_name, fpl_entry_name)
+    VALUES (:fpl_id, :name, :team_name, :fpl_entry_name)
+    ON CONFLICT(fpl_id) DO UPDATE SET
+        name = excluded.name,
+        team_name = excluded.team_name,
+        fpl_entry_name = excluded.fpl_entry_name
+"""
+
+GAMEWEEK_SCORE_UPSERT = """
+    INSERT INTO gameweek_scores (manager_id, gameweek, points, transfers_cost, net_points)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(manager_id, gameweek) DO UPDATE SET
+        points = excluded.points,
+        transfers_cost = excluded.transfers_cost,
+        net_points = excluded.net_points
+"""
+
+
+def connect(path=None):
+    """Open a new, pragma-tuned connection with row factory enabled."""
+    conn = sqlite3.connect(path or DB_PATH, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+def get_connection():
+    """
+    Get this thread's shared database connection.
+
+    The connection is opened once per thread and reused for the life of the
+    process, so callers should not close it.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = connect()
+        with _registry_lock:
+            _all_connections.append(conn)
+            _local.conn = conn
+            _local.generation = _generation
+            needs_migration = DB_PATH not in _migrated
+            _migrated.add(DB_PATH)
+        if needs_migration:
+            from migrations import migrate
+            migrate(conn)
+    return conn
+
+
+def close_connections():
+    """Close every shared connection opened by this process (all threads)."""
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        while _all_connections:
+            _all_connections.pop().close()
+
+
+def set_db_path(path):
+    """Point the data-access layer at another database file."""
+    global DB_PATH
+    close_connections()
+    DB_PATH = Path(path)
+
+
+atexit.register(close_connections)
+
+
+@contextmanager
+def transaction(conn):
+    """
+    Run a block inside one explicit transaction, rolling back on error.
+
+    Nested use joins the transaction that is already open.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def add_managers(managers, conn=None):
+    """
+    Upsert many managers in one transaction.
+
+    `managers` is an iterable of dicts with fpl_id, name, team_name and
+    optionally fpl_entry_name. Existing rows (matched on fpl_id) keep their id.
+    """
+    rows = (
+        {
+            'fpl_id': m.get('fpl_id'),
+            'name': m['name'],
+            'team_name': m.get('team_name'),
+            'fpl_entry_name': m.get('fpl_entry_name', m.get('team_name')),
+        }
+        for m in managers
+    )
+    with span("db.add_managers"), transaction(conn or get_connection()) as conn:
+        cursor = conn.executemany(MANAGER_UPSERT, rows)
+        count("db.rows_written", cursor.rowcount)
+        return cursor.rowcount
+
+
 def add_manager(name, team_name=None, fpl_id=None):
     """Add a new manager to the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO managers (name, team_name, fpl_id) VALUES (?, ?, ?)",
-        (name, team_name, fpl_id)
-    )
-    conn.commit()
-    manager_id = cursor.lastrowid
-    conn.close()
-    return manager_id
+    with transaction(get_connection()) as conn:
+        cursor = conn.execute(MANAGER_UPSERT + " RETURNING id", {
+            'fpl_id': fpl_id,
+            'name': name,
+            'team_name': team_name,
+            'fpl_entry_name': team_name,
+        })
+        return cursor.fetchone()[0]
+
+
+def add_notes(notes, conn=None):
+    """Add many notes in one transaction. `notes` yields (content, category) pairs."""
+    with transaction(conn or get_connection()) as conn:
+        cursor = conn.executemany(
+            "INSERT INTO notes (content, category) VALUES (?, ?)",
+            notes
+        )
+        return cursor.rowcount
 
 
 def add_note(content, category=None):
     """Add a note/log entry."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO notes (content, category) VALUES (?, ?)",
-        (content, category)
-    )
-    conn.commit()
-    conn.close()
+    add_notes([(content, category)])
 
 
 def get_all_managers():
     """Get all managers."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM managers")
+    cursor = get_connection().execute("SELECT * FROM managers")
     managers = cursor.fetchall()
-    conn.close()
     return [dict(m) for m in managers]
 
 
+def record_gameweek_scores(scores, conn=None):
+    """
+    Upsert many gameweek scores in one transaction.
+
+    `scores` yields (manager_id, gameweek, points, transfers_cost) tuples.
+    """
+    rows = (
+        (manager_id, gameweek, points, transfers_cost, points - transfers_cost)
+        for manager_id, gameweek, points, transfers_cost in scores
+    )
+    with span("db.record_gameweek_scores"), transaction(conn or get_connection()) as conn:
+        cursor = conn.executemany(GAMEWEEK_SCORE_UPSERT, rows)
+        count("db.rows_written", cursor.rowcount)
+        return cursor.rowcount
+
+
 def record_gameweek_score(manager_id, gameweek, points, transfers_cost=0):
     """Record a manager's gameweek score."""
-    net_points = points - transfers_cost
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO gameweek_scores
-        (manager_id, gameweek, points, transfers_cost, net_points)
-        VALUES (?, ?, ?, ?, ?)
-    """, (manager_id, gameweek, points, transfers_cost, net_points))
-    conn.commit()
-    conn.close()
+    record_gameweek_scores([(manager_id, gameweek, points, transfers_cost)])
 
 
 if __name__ == "__main__":
@@ -1,99 +1,83 @@
 #!/usr/bin/env python3
 """Fetch gameweek schedule from the official FPL API."""
 
-import requests
-import sqlite3
-from pathlib import Path
 from datetime import datetime
 
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
-FPL_API_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+from db_utils import get_connection, transaction
+from fpl_client import fetch_bootstrap
+from instrument import count, timed
 
 
 def fetch_gameweeks():
     """Fetch gameweek data from FPL API."""
     print("Fetching gameweek data from FPL API...")
-    response = requests.get(FPL_API_URL)
-    response.raise_for_status()
-    data = response.json()
+    data = fetch_bootstrap()
     return data.get('events', [])
 
 
-def init_gameweeks_table():
-    """Create gameweeks table if it doesn't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS gameweeks (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            deadline_time DATETIME,
-            deadline_time_epoch INTEGER,
-            is_previous BOOLEAN,
-            is_current BOOLEAN,
-            is_next BOOLEAN,
-            finished BOOLEAN,
-            data_checked BOOLEAN,
-            highest_score INTEGER,
-            average_score INTEGER,
-            most_selected INTEGER,
-            most_transferred_in INTEGER,
-            most_captained INTEGER,
-            most_vice_captained INTEGER,
-            chip_plays TEXT,
-            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-
-
+@timed("db.store_gameweeks")
 def store_gameweeks(gameweeks):
     """Store gameweeks in the database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
-    for gw in gameweeks:
-        cursor.execute("""
-            INSERT OR REPLACE INTO gameweeks (
+    now = datetime.now().isoformat()
+    with transaction(conn):
+        cursor.executemany("""
+            INSERT INTO gameweeks (
                 id, name, deadline_time, deadline_time_epoch,
                 is_previous, is_current, is_next, finished, data_checked,
                 highest_score, average_score,
                 most_selected, most_transferred_in, most_captained, most_vice_captained,
                 chip_plays, last_updated
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            gw['id'],
-            gw['name'],
-            gw['deadline_time'],
-            gw['deadline_time_epoch'],
-            gw['is_previous'],
-            gw['is_current'],
-            gw['is_next'],
-            gw['finished'],
-            gw['data_checked'],
-            gw.get('highest_score'),
-            gw.get('average_entry_score'),
-            gw.get('most_selected'),
-            gw.get('most_transferred_in'),
-            gw.get('most_captained'),
-            gw.get('most_vice_captained'),
-            str(gw.get('chip_plays', [])),
-            datetime.now().isoformat()
-        ))
-
-    conn.commit()
-    conn.close()
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                deadline_time = excluded.deadline_time,
+                deadline_time_epoch = excluded.deadline_time_epoch,
+                is_previous = excluded.is_previous,
+                is_current = excluded.is_current,
+                is_next = excluded.is_next,
+                finished = excluded.finished,
+                data_checked = excluded.data_checked,
+                highest_score = excluded.highest_score,
+                average_score = excluded.average_score,
+                most_selected = excluded.most_selected,
+                most_transferred_in = excluded.most_transferred_in,
+                most_captained = excluded.most_captained,
+                most_vice_captained = excluded.most_vice_captained,
+                chip_plays = excluded.chip_plays,
+                last_updated = excluded.last_updated
+        """, [
+            (
+                gw['id'],
+                gw['name'],
+                gw['deadline_time'],
+                gw['deadline_time_epoch'],
+                gw['is_previous'],
+                gw['is_current'],
+                gw['is_next'],
+                gw['finished'],
+                gw['data_checked'],
+                gw.get('highest_score'),
+                gw.get('average_entry_score'),
+                gw.get('most_selected'),
+                gw.get('most_transferred_in'),
+                gw.get('most_captained'),
+                gw.get('most_vice_captained'),
+                str(gw.get('chip_plays', [])),
+                now
+            )
+            for gw in gameweeks
+        ])
+        count("db.rows_written", cursor.rowcount)
+
     print(f"Stored {len(gameweeks)} gameweeks in database")
 
 
 def get_gameweek_summary():
     """Get a summary of gameweeks from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT id, name, deadline_time, finished, is_current, is_next
@@ -102,13 +86,11 @@ def get_gameweek_summary():
     """)
 
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
 def main():
     """Main entry point."""
-    init_gameweeks_table()
     gameweeks = fetch_gameweeks()
     store_gameweeks(gameweeks)
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Fetch every manager's gameweek scores and record cup results.
+
+Pulls each manager's season history (`entry/{id}/history/`) concurrently,
+upserts all gameweeks into gameweek_scores in one transaction, then fills in
+the cup_fixtures scores and results for the gameweek with a single UPDATE.
+The cup_standings triggers pick the new results up from there.
+
+Scores are net of transfer hits, matching what FPL H2H uses.
+
+--fixtures-dir reads histories from local JSON files named <fpl_id>.json
+(the raw endpoint payload) instead of the API.
+
+Usage: fetch_gameweek_scores.py [gameweek] [--fixtures-dir DIR] [--workers N]
+"""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from db_utils import get_all_managers, get_connection, record_gameweek_scores, transaction
+from fpl_client import fetch_entry_history, get_client
+from instrument import count, timed
+from knockout_bracket import update_bracket
+
+# Concurrent history fetches (requests are still rate limited by the client)
+FETCH_WORKERS = 8
+
+# Copy each fixture's net scores from gameweek_scores and derive W/D/L.
+# Only rows whose scores actually change are touched, so re-runs don't churn
+# the standings triggers.
+RESOLVE_FIXTURES = """
+    UPDATE cup_fixtures
+    SET home_score = home.net_points,
+        away_score = away.net_points,
+        home_cup_result = CASE
+            WHEN home.net_points > away.net_points THEN 'W'
+            WHEN home.net_points < away.net_points THEN 'L'
+            ELSE 'D' END,
+        away_cup_result = CASE
+            WHEN away.net_points > home.net_points THEN 'W'
+            WHEN away.net_points < home.net_points THEN 'L'
+            ELSE 'D' END
+    FROM (
+        SELECT m.fpl_id, gs.gameweek, gs.net_points
+        FROM gameweek_scores gs JOIN managers m ON m.id = gs.manager_id
+    ) AS home, (
+        SELECT m.fpl_id, gs.gameweek, gs.net_points
+        FROM gameweek_scores gs JOIN managers m ON m.id = gs.manager_id
+    ) AS away
+    WHERE cup_fixtures.gameweek = ?
+      AND home.fpl_id = cup_fixtures.home_manager_id AND home.gameweek = cup_fixtures.gameweek
+      AND away.fpl_id = cup_fixtures.away_manager_id AND away.gameweek = cup_fixtures.gameweek
+      AND (cup_fixtures.home_score IS NOT home.net_points
+           OR cup_fixtures.away_score IS NOT away.net_points)
+"""
+
+
+def load_history(fpl_id, client=None, fixtures_dir=None):
+    """Season history for one manager, from the API or a local fixture file."""
+    if fixtures_dir is not None:
+        path = Path(fixtures_dir) / f"{fpl_id}.json"
+        return json.loads(path.read_text()) if path.exists() else None
+    try:
+        return fetch_entry_history(fpl_id, client=client)
+    except requests.HTTPError as e:
+        print(f"Error fetching history for {fpl_id}: {e.response.status_code}")
+        return None
+
+
+def fetch_histories(fpl_ids, client=None, fixtures_dir=None, max_workers=FETCH_WORKERS):
+    """Fetch many managers' histories concurrently. Returns {fpl_id: history}."""
+    client = client or (get_client() if fixtures_dir is None else None)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        histories = pool.map(lambda fpl_id: load_history(fpl_id, client, fixtures_dir), fpl_ids)
+        return {fpl_id: history for fpl_id, history in zip(fpl_ids, histories) if history}
+
+
+def history_scores(manager_id, history):
+    """(manager_id, gameweek, points, transfers_cost) rows from a history payload."""
+    return [
+        (manager_id, gw['event'], gw['points'], gw.get('event_transfers_cost') or 0)
+        for gw in history.get('current', [])
+    ]
+
+
+@timed("db.resolve_cup_fixtures")
+def resolve_cup_fixtures(gameweek, conn=None):
+    """Fill in cup fixture scores for a gameweek from gameweek_scores. Returns rows updated."""
+    with transaction(conn or get_connection()) as conn:
+        updated = conn.execute(RESOLVE_FIXTURES, (gameweek,)).rowcount
+    count("db.rows_written", updated)
+    return updated
+
+
+def main(gameweek=None, fixtures_dir=None, workers=FETCH_WORKERS):
+    """Fetch all managers' scores, then resolve cup fixtures for `gameweek` (or every scored one)."""
+    managers = get_all_managers()
+    print(f"Fetching gameweek history for {len(managers)} managers...")
+    histories = fetch_histories([m['fpl_id'] for m in managers],
+                                fixtures_dir=fixtures_dir, max_workers=workers)
+
+    scores = []
+    for m in managers:
+        if m['fpl_id'] in histories:
+            scores.extend(history_scores(m['id'], histories[m['fpl_id']]))
+    missing = len(managers) - len(histories)
+
+    conn = get_connection()
+    with transaction(conn):
+        record_gameweek_scores(scores, conn)
+        if gameweek is None:
+            gameweeks = [row[0] for row in conn.execute(
+                "SELECT DISTINCT gameweek FROM cup_fixtures WHERE gameweek IS NOT NULL ORDER BY gameweek")]
+        else:
+            gameweeks = [gameweek]
+        resolved = {gw: resolve_cup_fixtures(gw, conn) for gw in gameweeks}
+        decided = update_bracket(conn)
+
+    print(f"✓ Stored {len(scores)} gameweek scores")
+    if missing:
+        print(f"✗ No history for {missing} managers")
+    for gw, updated in resolved.items():
+        if updated or gameweek is not None:
+            print(f"✓ GW{gw}: {updated} cup fixtures updated")
+    if decided:
+        print(f"✓ {len(decided)} knockout ties decided")
+
+
+if __name__ == "__main__":
+    options = {}
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg in ("--fixtures-dir", "--workers") and args:
+            value = args.pop(0)
+            options[arg[2:].replace("-", "_")] = int(value) if arg == "--workers" else value
+        elif arg.isdigit() and "gameweek" not in options:
+            options["gameweek"] = int(arg)
+        else:
+            print(__doc__.strip().splitlines()[-1])
+            sys.exit(1)
+
+    main(**options)
@@ -2,223 +2,178 @@
 """Fetch league managers and match results from FPL."""
 
 import os
+import time
 import requests
-import sqlite3
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from db_utils import add_managers, get_connection, transaction
+from fpl_client import get_client, fetch_h2h_matches, fetch_h2h_standings
+from instrument import count, timed
+
 # Load environment variables
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
-FPL_BASE_URL = "https://fantasy.premierleague.com/api"
-
 # League ID from env or default
 LEAGUE_ID = os.getenv("FPL_LEAGUE_ID", "156772")
 
+# Concurrent gameweek fetches during a backfill (requests are still rate limited)
+BACKFILL_WORKERS = 8
 
-def get_session():
-    """Create a requests session (no auth needed for public league data)."""
-    session = requests.Session()
-
-    # Set headers to look like a browser
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-        "Accept": "application/json",
-        "Referer": "https://fantasy.premierleague.com/",
-    })
-
-    return session
 
-
-def fetch_league_h2h_matches(session, gameweek=1):
+def fetch_league_h2h_matches(client, gameweek=1):
     """Fetch head-to-head matches for a specific gameweek."""
-    url = f"{FPL_BASE_URL}/leagues-h2h-matches/league/{LEAGUE_ID}/?event={gameweek}&page=1"
-
-    all_matches = []
-    page = 1
-
-    while True:
-        page_url = f"{FPL_BASE_URL}/leagues-h2h-matches/league/{LEAGUE_ID}/?event={gameweek}&page={page}"
-        response = session.get(page_url)
-
-        if response.status_code != 200:
-            print(f"Error fetching page {page}: {response.status_code}")
-            break
+    try:
+        return fetch_h2h_matches(LEAGUE_ID, gameweek, client=client)
+    except requests.HTTPError as e:
+        print(f"Error fetching GW{gameweek} matches: {e.response.status_code}")
+        return []
 
-        data = response.json()
-        matches = data.get("results", [])
 
-        if not matches:
-            break
-
-        all_matches.extend(matches)
-
-        if not data.get("has_next"):
-            break
-
-        page += 1
-
-    return all_matches
-
-
-def fetch_league_standings(session):
+def fetch_league_standings(client):
     """Fetch league standings to get all managers."""
-    url = f"{FPL_BASE_URL}/leagues-h2h/{LEAGUE_ID}/standings/"
-
-    all_entries = []
-    page = 1
-
-    while True:
-        page_url = f"{url}?page_standings={page}"
-        response = session.get(page_url)
-
-        if response.status_code != 200:
-            print(f"Error fetching standings page {page}: {response.status_code}")
-            break
-
-        data = response.json()
-        standings = data.get("standings", {})
-        entries = standings.get("results", [])
-
-        if not entries:
-            break
-
-        all_entries.extend(entries)
-
-        if not standings.get("has_next"):
-            break
-
-        page += 1
-
-    return all_entries, data.get("league", {})
+    try:
+        return fetch_h2h_standings(LEAGUE_ID, client=client)
+    except requests.HTTPError as e:
+        print(f"Error fetching standings: {e.response.status_code}")
+        return [], {}
 
 
 def store_managers(managers, league_info):
     """Store managers in the database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
-    # Add league_name column if not exists
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS league_info (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            created DATETIME,
-            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Store league info
-    cursor.execute("""
-        INSERT OR REPLACE INTO league_info (id, name, last_updated)
-        VALUES (?, ?, ?)
-    """, (league_info.get("id"), league_info.get("name"), datetime.now().isoformat()))
-
-    # Update managers table to include FPL-specific fields
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS managers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            team_name TEXT,
-            fpl_id INTEGER UNIQUE,
-            fpl_entry_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    for manager in managers:
+    with transaction(conn):
+        # Store league info
         cursor.execute("""
-            INSERT OR REPLACE INTO managers (fpl_id, name, team_name, fpl_entry_name)
-            VALUES (?, ?, ?, ?)
-        """, (
-            manager.get("entry"),
-            manager.get("player_name"),
-            manager.get("entry_name"),
-            manager.get("entry_name")
-        ))
-
-    conn.commit()
-    conn.close()
+            INSERT INTO league_info (id, name, last_updated)
+            VALUES (?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                last_updated = excluded.last_updated
+        """, (league_info.get("id"), league_info.get("name"), datetime.now().isoformat()))
+
+        add_managers((
+            {
+                'fpl_id': manager.get("entry"),
+                'name': manager.get("player_name"),
+                'team_name': manager.get("entry_name"),
+                'fpl_entry_name': manager.get("entry_name"),
+            }
+            for manager in managers
+        ), conn=conn)
+
     print(f"Stored {len(managers)} managers in database")
 
 
+@timed("db.store_h2h_results")
 def store_h2h_results(matches, gameweek):
     """Store H2H match results in the database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
-    # Create h2h_matches table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS h2h_matches (
-            id INTEGER PRIMARY KEY,
-            gameweek INTEGER,
-            entry_1_id INTEGER,
-            entry_1_name TEXT,
-            entry_1_player_name TEXT,
-            entry_1_points INTEGER,
-            entry_2_id INTEGER,
-            entry_2_name TEXT,
-            entry_2_player_name TEXT,
-            entry_2_points INTEGER,
-            is_knockout BOOLEAN,
-            winner INTEGER,
-            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(gameweek, entry_1_id, entry_2_id)
-        )
-    """)
-
-    for match in matches:
-        cursor.execute("""
-            INSERT OR REPLACE INTO h2h_matches (
+    now = datetime.now().isoformat()
+    with transaction(conn):
+        cursor.executemany("""
+            INSERT INTO h2h_matches (
                 id, gameweek,
                 entry_1_id, entry_1_name, entry_1_player_name, entry_1_points,
                 entry_2_id, entry_2_name, entry_2_player_name, entry_2_points,
                 is_knockout, winner, last_updated
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            match.get("id"),
-            match.get("event"),
-            match.get("entry_1_entry"),
-            match.get("entry_1_name"),
-            match.get("entry_1_player_name"),
-            match.get("entry_1_points"),
-            match.get("entry_2_entry"),
-            match.get("entry_2_name"),
-            match.get("entry_2_player_name"),
-            match.get("entry_2_points"),
-            match.get("is_knockout"),
-            match.get("winner"),
-            datetime.now().isoformat()
-        ))
-
-    conn.commit()
-    conn.close()
+            ON CONFLICT(id) DO UPDATE SET
+                gameweek = excluded.gameweek,
+                entry_1_id = excluded.entry_1_id,
+                entry_1_name = excluded.entry_1_name,
+                entry_1_player_name = excluded.entry_1_player_name,
+                entry_1_points = excluded.entry_1_points,
+                entry_2_id = excluded.entry_2_id,
+                entry_2_name = excluded.entry_2_name,
+                entry_2_player_name = excluded.entry_2_player_name,
+                entry_2_points = excluded.entry_2_points,
+                is_knockout = excluded.is_knockout,
+                winner = excluded.winner,
+                last_updated = excluded.last_updated
+        """, [
+            (
+                match.get("id"),
+                match.get("event"),
+                match.get("entry_1_entry"),
+                match.get("entry_1_name"),
+                match.get("entry_1_player_name"),
+                match.get("entry_1_points"),
+                match.get("entry_2_entry"),
+                match.get("entry_2_name"),
+                match.get("entry_2_player_name"),
+                match.get("entry_2_points"),
+                match.get("is_knockout"),
+                match.get("winner"),
+                now
+            )
+            for match in matches
+        ])
+        count("db.rows_written", cursor.rowcount)
+
     print(f"Stored {len(matches)} H2H matches for GW{gameweek}")
 
 
 def get_managers_from_db():
     """Get all managers from database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT * FROM managers ORDER BY name")
     managers = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return managers
 
 
-def main():
+def backfill_h2h_matches(client, gameweeks, max_workers=BACKFILL_WORKERS):
+    """
+    Fetch H2H matches for many gameweeks concurrently.
+
+    Gameweeks are fetched in a bounded thread pool (the client handles rate
+    limiting and retries); each gameweek is stored in its own transaction as
+    soon as it arrives. A gameweek whose request fails counts as no matches
+    instead of stopping the rest. Returns ({gameweek: match_count}, [failed
+    gameweeks]).
+    """
+    counts, failed = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_h2h_matches, LEAGUE_ID, gw, client=client): gw for gw in gameweeks}
+        for future in as_completed(futures):
+            gw = futures[future]
+            try:
+                matches = future.result()
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else type(e).__name__
+                print(f"Error fetching GW{gw} matches: {status}")
+                matches = []
+                failed.append(gw)
+            if matches:
+                store_h2h_results(matches, gameweek=gw)
+            counts[gw] = len(matches)
+    return counts, sorted(failed)
+
+
+def parse_gameweek_range(text):
+    """Parse '1-38' or '21' into a list of gameweeks."""
+    if "-" in text:
+        start, end = text.split("-", 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(text)]
+
+
+def main(backfill=None):
     """Main entry point."""
     print("Fetching league data from FPL...")
 
-    session = get_session()
+    client = get_client()
 
     # Fetch league standings (gets all managers)
     print(f"\nFetching league {LEAGUE_ID} standings...")
-    managers, league_info = fetch_league_standings(session)
+    managers, league_info = fetch_league_standings(client)
 
     if managers:
         print(f"\nLeague: {league_info.get('name')}")
@@ -232,9 +187,19 @@ def main():
         print("No managers found. Check your session cookie.")
         return
 
+    if backfill:
+        print(f"\nBackfilling H2H matches for GW{backfill[0]}-{backfill[-1]}...")
+        start = time.perf_counter()
+        counts, failed = backfill_h2h_matches(client, backfill)
+        elapsed = time.perf_counter() - start
+        print(f"\nStored {sum(counts.values())} matches across {len(counts)} gameweeks in {elapsed:.1f}s")
+        if failed:
+            print(f"✗ Failed gameweeks (run --backfill again for these): {', '.join(map(str, failed))}")
+        return
+
     # Fetch GW1 matches to see the structure
     print("\nFetching GW1 H2H matches...")
-    matches = fetch_league_h2h_matches(session, gameweek=1)
+    matches = fetch_league_h2h_matches(client, gameweek=1)
 
     if matches:
         store_h2h_results(matches, gameweek=1)
@@ -250,4 +215,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--backfill":
+        main(backfill=parse_gameweek_range(sys.argv[2]))
+    elif len(sys.argv) > 1:
+        print("Usage: fetch_league_managers.py [--backfill <start>-<end>]")
+        sys.exit(1)
+    else:
+        main()
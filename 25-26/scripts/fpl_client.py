@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Shared FPL API client with an on-disk, revalidating response cache."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from db_utils import get_connection
+from instrument import count, span
+
+FPL_BASE_URL = "https://fantasy.premierleague.com/api"
+CACHE_DIR = Path(__file__).parent.parent / "cache" / "http"
+
+# Cache budget before least-recently-used entries are evicted
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+# Freshness windows (seconds) before a cached response is revalidated.
+# None means the response never changes and is never revalidated.
+TTL_IMMUTABLE = None
+TTL_LIVE = 60                 # Gameweek in progress
+TTL_UNCHECKED = 30 * 60       # Finished, bonus/data not yet confirmed
+TTL_DEFAULT = 10 * 60         # Standings, bootstrap and anything else
+
+# Politeness limits shared by every thread talking to the same host
+MAX_REQUESTS_PER_SECOND = 10
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 16
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+    "Accept": "application/json",
+    "Referer": "https://fantasy.premierleague.com/",
+}
+
+
+class FPLClient:
+    """
+    Fetch JSON from the FPL API through a cache keyed by URL.
+
+    Responses for finished gameweeks are kept forever; everything else is
+    revalidated with If-None-Match/If-Modified-Since once its TTL expires.
+    Within a process each URL is fetched at most once.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_cache_bytes=MAX_CACHE_BYTES, session=None,
+                 requests_per_second=MAX_REQUESTS_PER_SECOND):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        if session is None:
+            import requests     # Deferred: ~75 ms, and text-only commands never make a request
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+        self.session = session
+        self.session.headers.update(HEADERS)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self._memo = {}
+        self._gameweek_state = None
+        self._lock = threading.Lock()
+        self._cache_bytes = None    # Running size of cache_dir, known after the first write
+
+    # ---------- Public API ----------
+
+    def get_json(self, path, params=None, ttl="auto"):
+        """
+        Return the decoded JSON body for an API path.
+
+        `ttl` overrides the gameweek-aware freshness policy; pass None to
+        treat the response as immutable.
+        """
+        url = build_url(path, params)
+        if url in self._memo:
+            count("http.memo_hits")
+            return self._memo[url]
+
+        if ttl == "auto":
+            ttl = self.ttl_for(params)
+
+        entry = self._read_entry(url)
+        if entry and is_fresh(entry, ttl):
+            count("http.cache_hits")
+            self._touch(url)
+            return self._remember(url, entry["body"])
+
+        body, _ = self._revalidate(url, entry)
+        return self._remember(url, body)
+
+    def poll(self, path, params=None):
+        """
+        Revalidate a URL with the server now, ignoring TTLs and the in-process
+        memo. Returns (body, changed); an unchanged resource costs a 304.
+        """
+        url = build_url(path, params)
+        body, changed = self._revalidate(url, self._read_entry(url))
+        return self._remember(url, body), changed
+
+    def ttl_for(self, params=None):
+        """Pick a freshness window from the state of the gameweek a request targets."""
+        gameweek = (params or {}).get("event")
+        if gameweek is None:
+            return TTL_DEFAULT
+        return self.ttl_for_gameweek(int(gameweek))
+
+    def ttl_for_gameweek(self, gameweek):
+        """Finished, data-checked gameweeks are immutable; live ones expire quickly."""
+        state = self.gameweek_state().get(gameweek)
+        if state is None:
+            return TTL_DEFAULT
+        finished, data_checked = state
+        if finished and data_checked:
+            return TTL_IMMUTABLE
+        if finished:
+            return TTL_UNCHECKED
+        return TTL_LIVE
+
+    def gameweek_state(self):
+        """Map gameweek id -> (finished, data_checked) from the local database."""
+        if self._gameweek_state is None:
+            self._gameweek_state = load_gameweek_state()
+        return self._gameweek_state
+
+    def reload_gameweek_state(self):
+        """Re-read the gameweek flags on next use (after the gameweeks table changes)."""
+        self._gameweek_state = None
+
+    def clear(self):
+        """Drop every cached response."""
+        self._memo.clear()
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink()
+        self._cache_bytes = 0
+
+    # ---------- Transport ----------
+
+    def _revalidate(self, url, entry):
+        """Conditional GET against a cached entry. Returns (body, changed)."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with span("http.get"):
+            response = self._request(url, headers)
+        count("http.requests")
+        count("http.bytes", len(response.content))
+
+        if response.status_code == 304 and entry:
+            count("http.not_modified")
+            entry["fetched_at"] = time.time()
+            self._write_entry(url, entry)
+            return entry["body"], False
+
+        response.raise_for_status()
+        body = response.json()
+        self._write_entry(url, {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": body,
+        })
+        return body, entry is None or entry["body"] != body
+
+    def _request(self, url, headers):
+        """GET with per-host rate limiting and exponential backoff on transient errors."""
+        import requests
+        host = urlsplit(url).netloc
+        for attempt in range(MAX_RETRIES + 1):
+            self.rate_limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=headers)
+            except requests.ConnectionError:
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            count("http.retries")
+
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = int(retry_after)
+            else:
+                delay = BACKOFF_SECONDS * 2 ** attempt
+            time.sleep(delay)
+
+        return response
+
+    # ---------- Cache storage ----------
+
+    def _remember(self, url, body):
+        self._memo[url] = body
+        return body
+
+    def _entry_path(self, url):
+        return self.cache_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+    def _read_entry(self, url):
+        path = self._entry_path(url)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_entry(self, url, entry):
+        path = self._entry_path(url)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        # Only rescan the directory (in _evict) on the first write and when over budget
+        with self._lock:
+            if self._cache_bytes is not None:
+                self._cache_bytes += size - replaced
+            rescan = self._cache_bytes is None or self._cache_bytes > self.max_cache_bytes
+        if rescan:
+            self._evict()
+
+    def _touch(self, url):
+        try:
+            os.utime(self._entry_path(url))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Remove least-recently-used entries until the cache is back under budget."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            self._cache_bytes = total
+            if total <= self.max_cache_bytes:
+                return
+
+            entries.sort()
+            target = self.max_cache_bytes * 0.8
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            self._cache_bytes = total
+
+
+class RateLimiter:
+    """Space out requests to each host so threads share one request budget."""
+
+    def __init__(self, per_second):
+        # None: no limit (local replays)
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        """Block until the next request slot for `host` is available."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def build_url(path, params=None):
+    """Build a canonical URL (sorted query string) used as the cache key."""
+    url = f"{FPL_BASE_URL}/{path.strip('/')}/"
+    if params:
+        url += "?" + urlencode(sorted(params.items()))
+    return url
+
+
+def is_fresh(entry, ttl):
+    """Check whether a cached entry is still within its TTL."""
+    if ttl is TTL_IMMUTABLE:
+        return True
+    return time.time() - entry.get("fetched_at", 0) < ttl
+
+
+def load_gameweek_state():
+    """Read finished/data_checked flags for every gameweek, if the table exists."""
+    try:
+        rows = get_connection().execute("SELECT id, finished, data_checked FROM gameweeks").fetchall()
+    except sqlite3.Error:
+        return {}
+    return {gw: (bool(finished), bool(checked)) for gw, finished, checked in rows}
+
+
+_client = None
+
+
+def get_client():
+    """Return the process-wide FPL client."""
+    global _client
+    if _client is None:
+        _client = FPLClient()
+    return _client
+
+
+# ============ LEAGUE ENDPOINTS ============
+
+def fetch_h2h_matches(league_id, gameweek, client=None):
+    """Fetch every page of head-to-head matches for a gameweek."""
+    client = client or get_client()
+    all_matches = []
+    page = 1
+
+    while True:
+        data = client.get_json(f"leagues-h2h-matches/league/{league_id}",
+                               {"event": gameweek, "page": page})
+        matches = data.get("results", [])
+
+        if not matches:
+            break
+
+        all_matches.extend(matches)
+
+        if not data.get("has_next"):
+            break
+
+        page += 1
+
+    return all_matches
+
+
+def fetch_h2h_standings(league_id, client=None):
+    """Fetch every page of the H2H league table. Returns (entries, league_info)."""
+    client = client or get_client()
+    all_entries = []
+    page = 1
+    data = {}
+
+    while True:
+        data = client.get_json(f"leagues-h2h/{league_id}/standings",
+                               {"page_standings": page})
+        standings = data.get("standings", {})
+        entries = standings.get("results", [])
+
+        if not entries:
+            break
+
+        all_entries.extend(entries)
+
+        if not standings.get("has_next"):
+            break
+
+        page += 1
+
+    return all_entries, data.get("league", {})
+
+
+def fetch_entry_history(entry_id, client=None):
+    """Fetch a manager's season history (per-gameweek points, transfer hits, chips)."""
+    client = client or get_client()
+    return client.get_json(f"entry/{entry_id}/history")
+
+
+def fetch_entry_picks(entry_id, gameweek, client=None):
+    """Fetch a manager's picks (players, multipliers, transfer hits) for a gameweek."""
+    client = client or get_client()
+    return client.get_json(f"entry/{entry_id}/event/{gameweek}/picks")
+
+
+def poll_live_event(gameweek, client=None):
+    """
+    Poll live player points for a gameweek.
+
+    Returns ({element_id: total_points}, changed); `changed` is False when
+    the server answered 304.
+    """
+    client = client or get_client()
+    data, changed = client.poll(f"event/{gameweek}/live")
+    points = {e["id"]: e["stats"]["total_points"] for e in data.get("elements", [])}
+    return points, changed
+
+
+def fetch_bootstrap(client=None):
+    """Fetch the bootstrap-static payload (gameweeks, teams, players)."""
+    client = client or get_client()
+    return client.get_json("bootstrap-static")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        get_client().clear()
+        print(f"Cleared {CACHE_DIR}")
+    else:
+        files = list(CACHE_DIR.glob("*.json")) if CACHE_DIR.exists() else []
+        size = sum(f.stat().st_size for f in files)
+        print(f"Cache: {CACHE_DIR}")
+        print(f"Entries: {len(files)} ({size / 1024:.1f} KB)")
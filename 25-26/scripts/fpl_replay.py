@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Offline record/replay of the FPL API.
+
+`record` fetches the league standings, bootstrap, H2H matches and every
+manager's history through a recording transport and saves the responses to
+a gzipped JSON corpus. Paged endpoints are stored merged (one list per
+resource), so a replay can serve them at any page size.
+
+`replay_client` returns an FPLClient whose transport answers from a corpus
+or from a SyntheticLeague instead of the network, with optional per-request
+latency and no rate limit. Everything built on fpl_client (fetch_h2h_*,
+fetch_entry_history, the fetch scripts' helpers) runs unchanged against it.
+
+SyntheticLeague generates a consistent FPL-shaped league of any size on
+demand: standings, H2H matches per gameweek (scores net of hits, matching
+the entry histories), bootstrap gameweeks and entry histories, all derived
+from a seed. `synth` writes one out as a corpus.
+
+Usage: fpl_replay.py record <corpus> [--gameweeks A-B] | synth <entries> <corpus> [--seed N] | show <corpus>
+"""
+
+import gzip
+import hashlib
+import json
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from fpl_client import (
+    POOL_SIZE, FPLClient, fetch_bootstrap, fetch_h2h_matches, fetch_h2h_standings,
+)
+
+# FPL serves 50 standings entries or H2H matches per page
+PAGE_SIZE = 50
+
+# Paged endpoints: path pattern -> (page parameter, path to the item list in the body)
+PAGED = [
+    (re.compile(r"leagues-h2h-matches/league/\d+"), "page", ("results",)),
+    (re.compile(r"leagues-(h2h|classic)/\d+/standings"), "page_standings", ("standings", "results")),
+]
+
+CORPUS_VERSION = 1
+
+
+def paging(path):
+    """(page parameter, item path) for a paged endpoint, or None."""
+    for pattern, param, items in PAGED:
+        if pattern.fullmatch(path):
+            return param, items
+    return None
+
+
+def split_url(url):
+    """API path (no slashes at either end) and query parameters of a request URL."""
+    parts = urlsplit(url)
+    path = parts.path.split("/api/", 1)[-1].strip("/")
+    return path, dict(parse_qsl(parts.query))
+
+
+def resource_key(path, params):
+    """Corpus key for a resource: path plus sorted query, without the page parameter."""
+    query = urlencode(sorted((key, str(value)) for key, value in params.items()))
+    return f"{path}?{query}" if query else path
+
+
+def _get_items(body, items_path):
+    for key in items_path:
+        body = body.get(key, {})
+    return body or []
+
+
+def _with_items(body, items_path, items, page, has_next):
+    """Copy of a paged body with its item list, `page` and `has_next` replaced."""
+    body = dict(body)
+    container = body
+    for key in items_path[:-1]:
+        container[key] = dict(container.get(key, {}))
+        container = container[key]
+    container[items_path[-1]] = items
+    container["page"] = page
+    container["has_next"] = has_next
+    return body
+
+
+def page_of(body, items_path, page, page_size):
+    """One page of a merged body: its slice of the item list, `page` and `has_next`."""
+    items = _get_items(body, items_path)
+    start = (page - 1) * page_size
+    return _with_items(body, items_path, items[start:start + page_size], page, start + page_size < len(items))
+
+
+# ============ SOURCES ============
+
+class Corpus:
+    """Recorded API responses keyed by resource, with paged responses merged."""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self._pages = {}    # key -> {page: (item path, body)}, merged into responses on flush
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt") as f:
+            data = json.load(f)
+        if data.get("version") != CORPUS_VERSION:
+            raise ValueError(f"{path}: unsupported corpus version {data.get('version')}")
+        return cls(data["responses"])
+
+    def save(self, path):
+        self.flush()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "wt") as f:
+            json.dump({"version": CORPUS_VERSION, "responses": self.responses}, f, separators=(",", ":"))
+        return path
+
+    def add(self, url, body):
+        """Record a response body for a request URL."""
+        path, params = split_url(url)
+        paged = paging(path)
+        with self._lock:
+            if paged:
+                page = int(params.pop(paged[0], 1))
+                self._pages.setdefault(resource_key(path, params), {})[page] = (paged[1], body)
+            else:
+                self.responses[resource_key(path, params)] = body
+
+    def flush(self):
+        """Merge recorded pages into one body per resource."""
+        with self._lock:
+            for key, pages in self._pages.items():
+                items_path, first = pages[min(pages)]
+                items = [item for page in sorted(pages) for item in _get_items(pages[page][1], items_path)]
+                self.responses[key] = _with_items(first, items_path, items, 1, False)
+            self._pages.clear()
+
+    def lookup(self, path, params):
+        """Merged body for a resource (page parameter already removed), or None."""
+        if self._pages:
+            self.flush()
+        return self.responses.get(resource_key(path, params))
+
+
+def _mix(n):
+    """splitmix64 finaliser: a cheap, well-spread hash of an integer."""
+    n = (n * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    n = ((n ^ (n >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    n = ((n ^ (n >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return n ^ (n >> 31)
+
+
+class SyntheticLeague:
+    """
+    A seeded H2H league of `entries` managers, generated on demand.
+
+    Gameweeks up to `finished_through` are played (and data-checked); later
+    ones have fixtures but no points. Each manager's score in a gameweek is
+    a pure function of (seed, manager, gameweek), so matches, standings and
+    histories always agree.
+    """
+
+    def __init__(self, entries, seed=0, finished_through=20, league_id=None, gameweeks=38):
+        self.entries = entries
+        self.seed = seed
+        self.finished_through = finished_through
+        self.league_id = league_id
+        self.gameweeks = range(1, gameweeks + 1)
+        self.ids = [1_000_000 + i for i in range(entries)]
+        self.matches = lru_cache(maxsize=None)(self._matches)
+        self.standings = lru_cache(maxsize=1)(self._standings)
+
+    def lookup(self, path, params):
+        parts = path.split("/")
+        if path == "bootstrap-static":
+            return self.bootstrap()
+        league = re.match(r"leagues-h2h(?:-matches/league)?/(\d+)", path)
+        if league and self.league_id is not None and league.group(1) != str(self.league_id):
+            return None
+        if re.fullmatch(r"leagues-h2h/\d+/standings", path):
+            return self.standings()
+        if re.fullmatch(r"leagues-h2h-matches/league/\d+", path) and params.get("event", "").isdigit():
+            gameweek = int(params["event"])
+            return {"results": self.matches(gameweek)} if gameweek in self.gameweeks else None
+        if re.fullmatch(r"entry/\d+/history", path):
+            return self.history(int(parts[1]))
+        return None
+
+    def score(self, entry, gameweek):
+        """(points, transfers_cost) for a manager in a played gameweek."""
+        x = _mix(self.seed * 1_000_003 + entry * 64 + gameweek)
+        return 20 + x % 81, (0, 0, 0, 4, 8)[(x >> 16) % 5]
+
+    def prepare(self):
+        """Generate the standings (and every played gameweek's matches) up front."""
+        self.standings()
+        return self
+
+    def name(self, entry):
+        return f"Manager {entry - 1_000_000}", f"Team {entry - 1_000_000}"
+
+    def _matches(self, gameweek):
+        ids = list(self.ids)
+        random.Random(self.seed * 100 + gameweek).shuffle(ids)
+        played = gameweek <= self.finished_through
+        matches = []
+        for i in range(0, len(ids) - 1, 2):
+            a, b = ids[i], ids[i + 1]
+            (a_player, a_team), (b_player, b_team) = self.name(a), self.name(b)
+            a_points = b_points = 0
+            if played:
+                a_points, b_points = (points - cost for points, cost in (self.score(a, gameweek),
+                                                                         self.score(b, gameweek)))
+            matches.append({
+                "id": gameweek * 1_000_000 + i // 2,
+                "event": gameweek,
+                "entry_1_entry": a, "entry_1_name": a_team, "entry_1_player_name": a_player,
+                "entry_1_points": a_points,
+                "entry_2_entry": b, "entry_2_name": b_team, "entry_2_player_name": b_player,
+                "entry_2_points": b_points,
+                "is_knockout": False,
+                "winner": (a if a_points > b_points else b) if played and a_points != b_points else None,
+            })
+        return matches
+
+    def _standings(self):
+        table = {entry: {"matches_played": 0, "matches_won": 0, "matches_drawn": 0, "matches_lost": 0,
+                         "points_for": 0, "total": 0} for entry in self.ids}
+        for gameweek in range(1, self.finished_through + 1):
+            for match in self.matches(gameweek):
+                for us, ours, theirs in (("entry_1_entry", "entry_1_points", "entry_2_points"),
+                                         ("entry_2_entry", "entry_2_points", "entry_1_points")):
+                    row = table[match[us]]
+                    row["matches_played"] += 1
+                    row["points_for"] += match[ours]
+                    if match[ours] > match[theirs]:
+                        row["matches_won"] += 1
+                        row["total"] += 3
+                    elif match[ours] < match[theirs]:
+                        row["matches_lost"] += 1
+                    else:
+                        row["matches_drawn"] += 1
+                        row["total"] += 1
+
+        ranked = sorted(table.items(), key=lambda item: (-item[1]["total"], -item[1]["points_for"], item[0]))
+        results = []
+        for rank, (entry, row) in enumerate(ranked, 1):
+            player_name, entry_name = self.name(entry)
+            results.append({"id": entry, "entry": entry, "player_name": player_name, "entry_name": entry_name,
+                            "rank": rank, "last_rank": rank, "rank_sort": rank, **row})
+        return {
+            "league": {"id": self.league_id or 0, "name": f"Synthetic League ({self.entries:,})",
+                       "scoring": "h"},
+            "standings": {"has_next": False, "page": 1, "results": results},
+        }
+
+    def bootstrap(self):
+        events = []
+        for gameweek in self.gameweeks:
+            finished = gameweek <= self.finished_through
+            events.append({
+                "id": gameweek, "name": f"Gameweek {gameweek}",
+                "deadline_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1754650800 + gameweek * 604800)),
+                "deadline_time_epoch": 1754650800 + gameweek * 604800,
+                "is_previous": gameweek == self.finished_through - 1,
+                "is_current": gameweek == self.finished_through,
+                "is_next": gameweek == self.finished_through + 1,
+                "finished": finished, "data_checked": finished,
+                "highest_score": 120 if finished else None,
+                "average_entry_score": 55 if finished else 0,
+                "chip_plays": [],
+            })
+        return {"events": events, "teams": [], "elements": []}
+
+    def history(self, entry):
+        if entry not in range(self.ids[0], self.ids[0] + self.entries):
+            return None
+        current, total = [], 0
+        for gameweek in range(1, self.finished_through + 1):
+            points, cost = self.score(entry, gameweek)
+            total += points - cost
+            current.append({"event": gameweek, "points": points, "total_points": total,
+                            "event_transfers": cost // 4, "event_transfers_cost": cost,
+                            "points_on_bench": 0})
+        return {"current": current, "past": [], "chips": []}
+
+    def responses(self, league_id):
+        """Every resource in the league as (path, params, body), for writing a corpus."""
+        league = self.league_id or league_id
+        yield "bootstrap-static", {}, self.bootstrap()
+        yield f"leagues-h2h/{league}/standings", {}, self.standings()
+        for gameweek in self.gameweeks:
+            yield f"leagues-h2h-matches/league/{league}", {"event": gameweek}, {"results": self.matches(gameweek)}
+        for entry in self.ids:
+            yield f"entry/{entry}/history", {}, self.history(entry)
+
+
+def load_source(spec, seed=0):
+    """A replay source: a number of entries (synthetic league) or a corpus path."""
+    if str(spec).isdigit():
+        return SyntheticLeague(int(spec), seed=seed)
+    return Corpus.load(spec)
+
+
+# ============ TRANSPORTS ============
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Requests transport answering from a source (Corpus or SyntheticLeague).
+
+    Sleeps `latency` seconds per request, pages paged endpoints at
+    `page_size`, answers If-None-Match with 304 and unknown resources with
+    404. Counts requests, bytes and statuses in `stats`.
+    """
+
+    def __init__(self, source, latency=0.0, page_size=PAGE_SIZE):
+        super().__init__()
+        self.source = source
+        self.latency = latency
+        self.page_size = page_size
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        path, params = split_url(request.url)
+        paged = paging(path)
+        page = int(params.pop(paged[0], 1)) if paged else 1
+        body = self.source.lookup(path, params)
+
+        if body is None:
+            return self._respond(request, 404, b'{"detail":"Not found."}')
+        if paged:
+            body = page_of(body, paged[1], page, self.page_size)
+
+        content = json.dumps(body, separators=(",", ":")).encode()
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return self._respond(request, 304, b"", etag)
+        return self._respond(request, 200, content, etag)
+
+    def _respond(self, request, status, content, etag=None):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}[status]
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        if etag:
+            response.headers["ETag"] = etag
+        response._content = content
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += len(content)
+            self.stats[status] += 1
+        return response
+
+    def close(self):
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that adds every successful JSON response to a Corpus."""
+
+    def __init__(self, corpus, **kwargs):
+        super().__init__(**kwargs)
+        self.corpus = corpus
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            self.corpus.add(request.url, response.json())
+        return response
+
+
+def replay_client(source, latency=0.0, page_size=PAGE_SIZE, cache_dir=None):
+    """
+    An FPLClient served by `source`, unthrottled, with its own response cache
+    (a fresh temporary directory unless `cache_dir` is given).
+
+    Returns (client, adapter); adapter.stats has the request counts.
+    """
+    adapter = ReplayAdapter(source, latency=latency, page_size=page_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="fpl-replay-")
+    return FPLClient(cache_dir=cache_dir, session=session, requests_per_second=None), adapter
+
+
+def record(path, gameweeks, league_id=None):
+    """Record the league's standings, bootstrap, H2H matches and histories into a corpus."""
+    from fetch_gameweek_scores import fetch_histories
+    from fetch_league_managers import LEAGUE_ID
+
+    league_id = league_id or LEAGUE_ID
+    corpus = Corpus()
+    session = requests.Session()
+    session.mount("https://", RecordingAdapter(corpus, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A private, empty cache so every response really comes off the wire
+        client = FPLClient(cache_dir=tmp, session=session)
+        fetch_bootstrap(client)
+        entries, _ = fetch_h2h_standings(league_id, client)
+        for gameweek in gameweeks:
+            fetch_h2h_matches(league_id, gameweek, client)
+        fetch_histories([entry["entry"] for entry in entries], client=client)
+
+    return corpus.save(path), len(corpus.responses)
+
+
+def show(path):
+    corpus = Corpus.load(path)
+    kinds = Counter(re.sub(r"\d+", "N", key.split("?")[0]) for key in corpus.responses)
+    print(f"=== {path} ({Path(path).stat().st_size / 1024:.1f} KB) ===")
+    for kind, count in sorted(kinds.items()):
+        print(f"  {kind:<40} {count:6,}")
+
+
+def usage():
+    print(__doc__.strip().splitlines()[-1])
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) in (2, 4) and args[0] == "record" and (len(args) == 2 or args[2] == "--gameweeks"):
+        start, _, end = (args[3] if len(args) == 4 else "1-38").partition("-")
+        if not (start.isdigit() and (end or start).isdigit()):
+            usage()
+        path, count = record(args[1], range(int(start), int(end or start) + 1))
+        print(f"✓ Recorded {count} resources to {path}")
+    elif len(args) in (3, 5) and args[0] == "synth" and args[1].isdigit() \
+            and (len(args) == 3 or (args[3] == "--seed" and args[4].isdigit())):
+        from fetch_league_managers import LEAGUE_ID
+
+        league = SyntheticLeague(int(args[1]), seed=int(args[4]) if len(args) == 5 else 0)
+        corpus = Corpus({resource_key(path, params): body for path, params, body in league.responses(LEAGUE_ID)})
+        print(f"✓ Wrote {len(corpus.responses):,} resources to {corpus.save(args[2])}")
+    elif len(args) == 2 and args[0] == "show":
+        show(args[1])
+    else:
+        usage()
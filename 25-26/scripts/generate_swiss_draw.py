@@ -2,15 +2,20 @@
 """
 Generate Swiss-style draw for Rundisliga Cup.
 Each team plays 10 opponents (half the league) with seeded randomization.
+
+With --pots N the seeding is split into N pots and every team meets the same
+number of opponents from each pot (10 rounds, 5 pots = 2 per pot), with the
+schedule chosen to even out opponent strength and home/away games.
+
+Usage: generate_swiss_draw.py [--seed N] [--rounds N] [--pots N]
 """
 
-import sqlite3
 import random
-from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
+from db_utils import get_connection, transaction
+from swiss_pairing import generate_pairings, generate_pot_pairings, make_pots
 
 # Cup schedule: round number -> gameweek
 ROUND_TO_GAMEWEEK = {
@@ -38,12 +43,9 @@ ROUND_TO_GAMEWEEK = {
 
 def get_managers():
     """Get all managers from database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT fpl_id, name, team_name FROM managers ORDER BY fpl_id")
     managers = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return managers
 
 
@@ -53,9 +55,7 @@ def get_seeding_from_fpl_standings():
     For now, we'll use a placeholder - this should be run after GW20.
     Returns list of manager fpl_ids in seeding order (1st = best).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     # Try to get from h2h standings if available
     cursor.execute("""
@@ -69,7 +69,6 @@ def get_seeding_from_fpl_standings():
         ORDER BY total_points DESC
     """)
     standings = cursor.fetchall()
-    conn.close()
 
     if standings:
         # Aggregate by fpl_id
@@ -88,17 +87,27 @@ def get_seeding_from_fpl_standings():
     return fpl_ids
 
 
-def generate_swiss_fixtures(seeding):
-    """
-    Generate 10 rounds of fixtures where each team plays 10 different opponents.
-    Uses backtracking to ensure valid pairings with no rematches.
+def generate_swiss_fixtures(seeding, rounds=10, seed=None, pots=None):
     """
-    n = len(seeding)  # Should be 20
-    if n != 20:
-        raise ValueError(f"Expected 20 managers, got {n}")
+    Generate `rounds` rounds of fixtures where every team meets a different
+    opponent each round. Works for any even number of teams; pass `seed` for
+    a reproducible draw.
 
-    # Track who has played whom (global across all rounds)
-    played = defaultdict(set)
+    Without `pots` the seeding order is ignored and opponents are random. With
+    `pots`, opponents are drawn evenly from each pot of the seeding.
+    """
+    rng = random.Random(seed)
+    if pots:
+        pairings, _ = generate_pot_pairings(seeding, rounds, pots, rng)
+        # Already home/away balanced - pairs are (home, away)
+        return [{
+            'round': round_num,
+            'gameweek': ROUND_TO_GAMEWEEK.get(round_num),
+            'home': home,
+            'away': away
+        } for round_num, pairs in enumerate(pairings, 1) for home, away in pairs]
+
+    pairings = generate_pairings(seeding, rounds, rng)
 
     # Track home/away balance
     home_count = defaultdict(int)
@@ -106,58 +115,9 @@ def generate_swiss_fixtures(seeding):
 
     fixtures = []
 
-    def can_pair(team1, team2):
-        """Check if two teams can be paired (haven't played each other yet)."""
-        return team2 not in played[team1]
-
-    def find_valid_pairing(unpaired_list, current_pairs):
-        """
-        Recursively find a valid pairing for all teams using backtracking.
-        Returns list of pairs or None if no valid pairing exists.
-        """
-        if len(unpaired_list) == 0:
-            return current_pairs
-
-        if len(unpaired_list) == 2:
-            t1, t2 = unpaired_list
-            if can_pair(t1, t2):
-                return current_pairs + [(t1, t2)]
-            return None
-
-        # Take first team and try pairing with each possible opponent
-        team1 = unpaired_list[0]
-        remaining = unpaired_list[1:]
-
-        # Shuffle remaining to add randomness
-        candidates = [t for t in remaining if can_pair(team1, t)]
-        random.shuffle(candidates)
-
-        for team2 in candidates:
-            # Try this pairing
-            new_remaining = [t for t in remaining if t != team2]
-            result = find_valid_pairing(new_remaining, current_pairs + [(team1, team2)])
-            if result is not None:
-                return result
-
-        return None
-
-    for round_num in range(1, 11):
-        # Shuffle teams for this round
-        teams = list(seeding)
-        random.shuffle(teams)
-
-        # Find valid pairing using backtracking
-        pairs = find_valid_pairing(teams, [])
-
-        if pairs is None:
-            raise ValueError(f"Could not find valid pairing for round {round_num}")
-
+    for round_num, pairs in enumerate(pairings, 1):
         round_fixtures = []
         for team1, team2 in pairs:
-            # Record the match
-            played[team1].add(team2)
-            played[team2].add(team1)
-
             # Determine home/away based on balance
             t1_home_deficit = home_count[team1] - away_count[team1]
             t2_home_deficit = home_count[team2] - away_count[team2]
@@ -168,7 +128,7 @@ def generate_swiss_fixtures(seeding):
                 home, away = team2, team1
             else:
                 # Equal balance - randomize
-                if random.random() < 0.5:
+                if rng.random() < 0.5:
                     home, away = team1, team2
                 else:
                     home, away = team2, team1
@@ -178,7 +138,7 @@ def generate_swiss_fixtures(seeding):
 
             round_fixtures.append({
                 'round': round_num,
-                'gameweek': ROUND_TO_GAMEWEEK[round_num],
+                'gameweek': ROUND_TO_GAMEWEEK.get(round_num),
                 'home': home,
                 'away': away
             })
@@ -190,20 +150,15 @@ def generate_swiss_fixtures(seeding):
 
 def save_fixtures_to_db(fixtures):
     """Save fixtures to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with transaction(get_connection()) as conn:
+        # Clear existing group stage fixtures
+        conn.execute("DELETE FROM cup_fixtures WHERE round <= 10")
 
-    # Clear existing group stage fixtures
-    cursor.execute("DELETE FROM cup_fixtures WHERE round <= 10")
-
-    for f in fixtures:
-        cursor.execute("""
+        conn.executemany("""
             INSERT INTO cup_fixtures (round, gameweek, home_manager_id, away_manager_id)
             VALUES (?, ?, ?, ?)
-        """, (f['round'], f['gameweek'], f['home'], f['away']))
+        """, [(f['round'], f['gameweek'], f['home'], f['away']) for f in fixtures])
 
-    conn.commit()
-    conn.close()
     print(f"Saved {len(fixtures)} fixtures to database")
 
 
@@ -227,7 +182,7 @@ def print_fixtures(fixtures, managers_dict):
         print(f"  {home_name:<25} vs {away_name}")
 
 
-def verify_fixtures(fixtures, n_teams=20):
+def verify_fixtures(fixtures, rounds=10):
     """Verify the fixtures are valid."""
     games_per_team = defaultdict(int)
     opponents = defaultdict(set)
@@ -250,16 +205,16 @@ def verify_fixtures(fixtures, n_teams=20):
     print("\n=== FIXTURE VERIFICATION ===")
 
     # Check games per team
-    games_ok = all(g == 10 for g in games_per_team.values())
-    print(f"All teams play 10 games: {'✓' if games_ok else '✗'}")
+    games_ok = all(g == rounds for g in games_per_team.values())
+    print(f"All teams play {rounds} games: {'✓' if games_ok else '✗'}")
     if not games_ok:
         for team, games in games_per_team.items():
-            if games != 10:
+            if games != rounds:
                 print(f"  Team {team}: {games} games")
 
     # Check unique opponents
-    opponents_ok = all(len(opps) == 10 for opps in opponents.values())
-    print(f"All teams face 10 different opponents: {'✓' if opponents_ok else '✗'}")
+    opponents_ok = all(len(opps) == rounds for opps in opponents.values())
+    print(f"All teams face {rounds} different opponents: {'✓' if opponents_ok else '✗'}")
 
     # Check home/away balance
     print("\nHome/Away balance:")
@@ -269,7 +224,28 @@ def verify_fixtures(fixtures, n_teams=20):
         print(f"  Team {team}: {h}H / {a}A")
 
 
-def main():
+def verify_pots(fixtures, seeding, pots, rounds=10):
+    """Check every team met rounds/pots opponents from each pot, and show opponent strength."""
+    pot_of = {team: i for i, pot in enumerate(make_pots(seeding, pots)) for team in pot}
+    seed_of = {team: rank for rank, team in enumerate(seeding, 1)}
+    per_pot = defaultdict(lambda: [0] * pots)
+    strength = defaultdict(int)
+
+    for f in fixtures:
+        for team, opponent in ((f['home'], f['away']), (f['away'], f['home'])):
+            per_pot[team][pot_of[opponent]] += 1
+            strength[team] += seed_of[opponent]
+
+    print(f"\n=== POTS ({pots} pots of {len(seeding) // pots}) ===")
+    quota = rounds // pots
+    pots_ok = all(counts == [quota] * pots for counts in per_pot.values())
+    print(f"All teams face {quota} opponents from each pot: {'✓' if pots_ok else '✗'}")
+
+    averages = [total / rounds for total in strength.values()]
+    print(f"Average opponent seed: {min(averages):.2f} - {max(averages):.2f}")
+
+
+def main(rounds=10, seed=None, pots=None):
     """Main entry point."""
     print("=== RUNDISLIGA CUP 25/26 SWISS DRAW ===")
     print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -289,13 +265,15 @@ def main():
 
     # Generate fixtures
     print("\nGenerating fixtures...")
-    fixtures = generate_swiss_fixtures(seeding)
+    fixtures = generate_swiss_fixtures(seeding, rounds=rounds, seed=seed, pots=pots)
 
     # Print fixtures
     print_fixtures(fixtures, managers_dict)
 
     # Verify
-    verify_fixtures(fixtures)
+    verify_fixtures(fixtures, rounds=rounds)
+    if pots:
+        verify_pots(fixtures, seeding, pots, rounds=rounds)
 
     # Save to database
     save_fixtures_to_db(fixtures)
@@ -304,4 +282,25 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    options = {}
+    args = sys.argv[1:]
+    while args:
+        flag = args.pop(0)
+        if flag not in ("--seed", "--rounds", "--pots") or not args:
+            print(__doc__.strip().splitlines()[-1])
+            sys.exit(1)
+        options[flag[2:]] = int(args.pop(0))
+
+    # Later rounds in cup_fixtures are the knockouts
+    if options.get("rounds", 10) > 10:
+        print("The group stage has at most 10 rounds")
+        sys.exit(1)
+
+    try:
+        main(**options)
+    except ValueError as e:
+        # Impossible pot/round combination for this league size
+        print(f"✗ {e}")
+        sys.exit(1)
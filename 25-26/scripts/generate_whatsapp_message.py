@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """Generate WhatsApp messages for Rundisliga Cup announcements."""
 
-import sqlite3
-import requests
-from pathlib import Path
 from datetime import datetime
 
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
+from build_cache import get_build_cache, table_digest
+from cup_queries import fixtures_by_round
+from cup_standings import get_standings as get_cup_standings
+from db_utils import get_connection
+from fpl_client import fetch_h2h_matches, fetch_h2h_standings
+from knockout_bracket import get_bracket, tie_totals
+from tiebreakers import H2HIndex, rank_standings
+
 LEAGUE_ID = "156772"
 
 # Gameweek to Cup Round mapping
@@ -22,31 +26,23 @@ GAMEWEEK_TO_ROUND = {
 # Non-cup gameweeks
 NON_CUP_WEEKS = [26, 35]
 
-
-def get_db_connection():
-    """Get database connection with row factory."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Tables the knockout odds simulation reads
+ODDS_TABLES = ("managers", "cup_fixtures", "gameweek_scores", "h2h_matches")
 
 
 def get_managers():
     """Get all managers as dict keyed by fpl_id."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT fpl_id, name, team_name FROM managers")
     managers = {row['fpl_id']: dict(row) for row in cursor.fetchall()}
-    conn.close()
     return managers
 
 
 def get_gameweek_info(gw):
     """Get gameweek deadline info."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT deadline_time FROM gameweeks WHERE id = ?", (gw,))
     row = cursor.fetchone()
-    conn.close()
     if row:
         dt = datetime.fromisoformat(row['deadline_time'].replace('Z', '+00:00'))
         return dt.strftime('%a %b %d, %Y').upper()
@@ -55,40 +51,18 @@ def get_gameweek_info(gw):
 
 def get_fixtures_for_round(round_num):
     """Get fixtures for a cup round from database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM cup_fixtures WHERE round = ?
-        ORDER BY id
-    """, (round_num,))
-    fixtures = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return fixtures
+    return fixtures_by_round(round_num)
 
 
 def get_results_for_gameweek(gw):
     """Get H2H results for a gameweek from FPL API."""
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json",
-    })
-    url = f"https://fantasy.premierleague.com/api/leagues-h2h-matches/league/{LEAGUE_ID}/?event={gw}&page=1"
-    response = session.get(url)
-    return response.json().get("results", [])
+    return fetch_h2h_matches(LEAGUE_ID, gw)
 
 
 def get_standings():
     """Get current H2H standings from FPL API."""
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json",
-    })
-    url = f"https://fantasy.premierleague.com/api/leagues-h2h/{LEAGUE_ID}/standings/"
-    response = session.get(url)
-    data = response.json()
-    return data.get('standings', {}).get('results', [])
+    entries, _ = fetch_h2h_standings(LEAGUE_ID)
+    return entries
 
 
 def format_fixture_list(fixtures, managers):
@@ -120,6 +94,18 @@ def format_results_list(results):
     return "\n".join(lines)
 
 
+def format_probability(p):
+    """Percentage for messages; never shows 0%/100% for outcomes still possible."""
+    if p in (0, 1):
+        return f"{p:.0%}"
+    pct = round(p * 100)
+    if pct < 1:
+        return "<1%"
+    if pct > 99:
+        return ">99%"
+    return f"{pct}%"
+
+
 def format_standings_top_n(standings, n=10):
     """Format top N standings."""
     lines = []
@@ -131,6 +117,16 @@ def format_standings_top_n(standings, n=10):
     return "\n".join(lines)
 
 
+def format_cup_table_top_n(ranked, odds, n=10):
+    """Format the top N of the ranked cup table, each with its {fpl_id: probability} of reaching the knockouts."""
+    lines = []
+    for team in ranked[:n]:
+        name = (team['name'] or '???').upper()
+        ko = format_probability(odds.get(team['fpl_id'], 0))
+        lines.append(f"{team['position']}. {name} - {team['points']} PTS ({team['fpl_total']} FPL) - {ko} KO")
+    return "\n".join(lines)
+
+
 # ============ MESSAGE GENERATORS ============
 
 def generate_announcement_message():
@@ -205,8 +201,21 @@ DEADLINE: {deadline}
 GOOD LUCK TO ALL MANAGERS 🍀"""
 
 
-def generate_post_gameweek_message(gw):
-    """Generate post-gameweek results message."""
+def generate_post_gameweek_message(gw, odds=False, results=None, standings=None, cup_standings=None,
+                                   force=False):
+    """
+    Generate post-gameweek results message.
+
+    With `odds`, the H2H table gives way to the cup table, ranked on the
+    group-stage tiebreakers, with each line's simulated chance of reaching
+    the knockouts. `results` (H2H matches), `standings` (H2H table entries)
+    and `cup_standings` (cup_standings.get_standings rows) are fetched when
+    not passed in.
+
+    Group-stage messages are cached on their inputs (with `odds`, the
+    simulation's tables too), so an unchanged gameweek reuses the previous
+    text without re-running the simulation; `force` rebuilds it.
+    """
     round_num = GAMEWEEK_TO_ROUND.get(gw)
 
     if round_num is None or gw in NON_CUP_WEEKS:
@@ -214,13 +223,38 @@ def generate_post_gameweek_message(gw):
 
     if isinstance(round_num, str):
         # Knockout round
-        return generate_knockout_results(gw, round_num)
-
-    results = get_results_for_gameweek(gw)
-    standings = get_standings()
-
+        return generate_knockout_results(gw, round_num, results)
+
+    if results is None:
+        results = get_results_for_gameweek(gw)
+    if standings is None:
+        standings = get_standings()
+
+    cup_table = odds_inputs = None
+    if odds:
+        if cup_standings is None:
+            cup_standings = get_cup_standings()
+        cup_table = rank_standings([dict(row) for row in cup_standings], H2HIndex.from_db())
+        odds_inputs = table_digest(get_connection(), *ODDS_TABLES)
+    return get_build_cache().value(
+        f"gw{gw}_message", [round_num, results, standings, cup_table, odds_inputs],
+        lambda: format_post_gameweek_message(gw, round_num, results, standings, cup_table), force=force)
+
+
+def format_post_gameweek_message(gw, round_num, results, standings, cup_table=None):
+    """Build the group-stage post-gameweek text; a ranked `cup_table` is shown with knockout odds."""
     results_list = format_results_list(results)
-    standings_text = format_standings_top_n(standings, 10)
+    odds_note = ""
+    if cup_table is not None:
+        # numpy is only needed for the odds
+        from simulate_cup import simulate
+        knockout_odds = {fpl_id: p['qf'] for fpl_id, p in simulate().items()}
+        standings_title = "CUP TABLE (TOP 10)"
+        standings_text = format_cup_table_top_n(cup_table, knockout_odds)
+        odds_note = "\n(KO = CHANCE OF REACHING THE KNOCKOUTS)\n"
+    else:
+        standings_title = "CURRENT STANDINGS (TOP 10)"
+        standings_text = format_standings_top_n(standings, 10)
     remaining = 10 - round_num
 
     return f"""🚨 RUNDISLIGA CUPDATE INCOMING 🚨
@@ -229,9 +263,9 @@ GAMEWEEK {gw} RESULTS (ROUND {round_num})
 
 {results_list}
 
-CURRENT STANDINGS (TOP 10):
+{standings_title}:
 {standings_text}
-
+{odds_note}
 {remaining} ROUNDS REMAINING"""
 
 
@@ -283,11 +317,44 @@ DEADLINE: {deadline}
 🚨 GOOD LUCK 🍀 🚨"""
 
 
-def generate_knockout_results(gw, round_code):
-    """Generate knockout round results."""
-    results = get_results_for_gameweek(gw)
-    results_list = format_results_list(results)
+def format_knockout_tie(tie, gw):
+    """One tie's legs up to `gw`, its aggregate and, once decided, who goes through."""
+    names = {tie['high_seed']: (tie['high_name'] or '???').upper(),
+             tie['low_seed']: (tie['low_name'] or '???').upper()}
+    legs = [leg for leg in tie['legs'] if leg['gameweek'] <= gw]
+    two_legs = len(tie['legs']) > 1
+
+    lines = [f"{tie['tie']}: ({tie['high_rank']}) {names[tie['high_seed']]} VS "
+             f"{names[tie['low_seed']]} ({tie['low_rank']})"]
+    for n, leg in enumerate(legs, 1):
+        home, away = names[leg['home_manager_id']], names[leg['away_manager_id']]
+        label = f"{'1ST' if n == 1 else '2ND'} LEG: " if two_legs else ""
+        if leg['home_score'] is None:
+            lines.append(f"{label}{home} VS {away}")
+        else:
+            lines.append(f"{label}{home} {leg['home_score']} - {leg['away_score']} {away}")
+
+    high_total, low_total = tie_totals(tie)
+    if two_legs and len(legs) == len(tie['legs']) and high_total is not None:
+        lines.append(f"AGGREGATE: {names[tie['high_seed']]} {high_total} - {low_total} {names[tie['low_seed']]}")
 
+    if tie['winner']:
+        verb = "WINS THE CUP" if tie['stage'] == "FINAL" else "GOES THROUGH"
+        lines.append(f"🏆 {names[tie['winner']]} {verb} ({tie['decided_by'].upper()})")
+    elif tie['decided_by'] == 'level':
+        lines.append("LEVEL ON EVERY TIEBREAKER")
+    return "\n".join(lines)
+
+
+def generate_knockout_results(gw, round_code, results=None):
+    """
+    Generate knockout round results.
+
+    Ties come from the bracket as it stood after `gw`: each tie with a leg
+    that gameweek shows its legs so far and, after the 2nd leg or the final,
+    the aggregate and who goes through. The GW32 playoff is not a bracket
+    tie, so it lists the H2H `results` (fetched when not passed in).
+    """
     round_names = {
         "QF1": "QUARTER-FINAL 1ST LEG",
         "QF2": "QUARTER-FINALS",
@@ -299,6 +366,14 @@ def generate_knockout_results(gw, round_code):
 
     round_name = round_names.get(round_code, round_code)
 
+    if round_code == "PLAYOFF":
+        if results is None:
+            results = get_results_for_gameweek(gw)
+        results_list = format_results_list(results)
+    else:
+        ties = [tie for tie in get_bracket(gw) if any(leg['gameweek'] == gw for leg in tie['legs'])]
+        results_list = "\n\n".join(format_knockout_tie(tie, gw) for tie in ties) or "NOT DRAWN YET"
+
     return f"""🚨 RUNDISLIGA CUP {round_name} RESULTS 🚨
 
 {results_list}
@@ -380,7 +455,7 @@ if __name__ == "__main__":
         print("  announcement       - Cup announcement message")
         print("  draw              - Draw complete message")
         print("  pre <gw>          - Pre-gameweek reminder")
-        print("  post <gw>         - Post-gameweek results")
+        print("  post <gw> [--odds] [--force] - Post-gameweek results (--odds adds knockout chances)")
         print("  notcup <gw>       - Not a cup week message")
         sys.exit(1)
 
@@ -401,10 +476,10 @@ if __name__ == "__main__":
 
     elif command == "post":
         if len(sys.argv) < 3:
-            print("Usage: generate_whatsapp_message.py post <gameweek>")
+            print("Usage: generate_whatsapp_message.py post <gameweek> [--odds] [--force]")
             sys.exit(1)
         gw = int(sys.argv[2])
-        msg = generate_post_gameweek_message(gw)
+        msg = generate_post_gameweek_message(gw, odds="--odds" in sys.argv[3:], force="--force" in sys.argv[3:])
         if msg:
             print(msg)
         else:
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Timing, counters and optional profiling for every script.
+
+Stages are timed with `span(name)` (a context manager) or `@timed(name)`;
+each name gets a call count, total and max, and the first MAX_SPANS calls
+are kept individually with their parent span and thread. Counters
+(`count(name, n)`) track HTTP requests and bytes, response and build cache
+hits, and rows written. fpl_client, db_utils, the ingest scripts,
+cup_queries, rendering, layouts and build_cache report into the
+process-wide trace.
+
+`write_trace(command)` saves it all as logs/trace_<command>_<time>.json.
+cup.py post writes one per run; any other script writes one on exit when
+CUP_TRACE=1 is set. CUP_PROFILE=cpu, memory or cpu,memory (or cup.py post
+--profile) also captures cProfile (the main thread only; the .prof file is
+saved next to the trace) and tracemalloc (top allocation sites and peak).
+
+`diff` compares two traces stage by stage and counter by counter, e.g. one
+gameweek's post run against the last.
+
+Usage: instrument.py show <trace> | diff <base trace> <head trace>
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+LOGS_DIR = Path(__file__).parent.parent / "logs"
+
+TRACE_ENV = "CUP_TRACE"
+PROFILE_ENV = "CUP_PROFILE"
+PROFILE_KINDS = ("cpu", "memory")
+
+# Individual span records kept per run (stage totals are always complete)
+MAX_SPANS = 5000
+# Functions / allocation sites listed in a trace's profile summary
+PROFILE_TOP = 25
+
+
+class Trace:
+    """Spans, stage totals and counters for one run. Safe to share between threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.stages = {}        # name -> [calls, total seconds, max seconds]
+        self.spans = []
+        self.dropped_spans = 0
+        self.counters = Counter()
+        self.profile = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name):
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                stage = self.stages.setdefault(name, [0, 0.0, 0.0])
+                stage[0] += 1
+                stage[1] += elapsed
+                stage[2] = max(stage[2], elapsed)
+                if len(self.spans) < MAX_SPANS:
+                    self.spans.append({
+                        'name': name,
+                        'parent': parent,
+                        'start': round(start - self.started, 6),
+                        'seconds': round(elapsed, 6),
+                        'thread': threading.current_thread().name,
+                    })
+                else:
+                    self.dropped_spans += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stage_totals(self):
+        """{name: seconds} summed over every call, in first-seen order."""
+        with self._lock:
+            return {name: total for name, (_, total, _) in self.stages.items()}
+
+    def to_dict(self, command, **meta):
+        with self._lock:
+            return {
+                'command': command,
+                'argv': sys.argv,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_seconds': round(time.perf_counter() - self.started, 4),
+                'meta': meta,
+                'stages': {name: {'calls': calls, 'seconds': round(total, 6), 'max': round(longest, 6)}
+                           for name, (calls, total, longest) in sorted(self.stages.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'profile': self.profile,
+                'spans': list(self.spans),
+                'dropped_spans': self.dropped_spans,
+            }
+
+
+_trace = Trace()
+_written = False
+_profiling = None       # (kinds, profiler or None) while a capture is running
+
+
+def get_trace():
+    """Return the process-wide trace."""
+    return _trace
+
+
+def reset():
+    """Start a fresh trace (e.g. between runs in one process)."""
+    global _trace, _written
+    _trace = Trace()
+    _written = False
+
+
+def span(name):
+    """Context manager timing a block as stage `name`."""
+    return _trace.span(name)
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _trace.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add `n` to counter `name`."""
+    _trace.count(name, n)
+
+
+# ============ PROFILING ============
+
+def parse_kinds(text):
+    """'cpu', 'memory', 'cpu,memory', or '1'/'all' for both."""
+    if text.strip().lower() in ("1", "all", "true", "yes"):
+        return set(PROFILE_KINDS)
+    return {kind.strip() for kind in text.lower().split(",") if kind.strip() in PROFILE_KINDS}
+
+
+def profiling_active():
+    return _profiling is not None
+
+
+def start_profiling(kinds):
+    """Begin cProfile and/or tracemalloc capture. A no-op if a capture is already running."""
+    global _profiling
+    kinds = set(kinds)
+    if _profiling is not None or not kinds:
+        return
+    # Imported here so every script that reports timings doesn't pay for the profilers
+    import cProfile
+    import tracemalloc
+    if "memory" in kinds:
+        tracemalloc.start()
+    profiler = None
+    if "cpu" in kinds:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    _profiling = (kinds, profiler)
+
+
+def stop_profiling(prof_path=None):
+    """End the capture and add its summary to the trace's `profile`."""
+    global _profiling
+    if _profiling is None:
+        return
+    kinds, profiler = _profiling
+    _profiling = None
+
+    if profiler is not None:
+        profiler.disable()
+        if prof_path:
+            Path(prof_path).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(prof_path)
+        _trace.profile['cpu'] = {'file': str(prof_path) if prof_path else None,
+                                 'top': cpu_summary(profiler)}
+
+    if "memory" in kinds:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _trace.profile['memory'] = {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [{'where': f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+                     'bytes': stat.size, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:PROFILE_TOP]],
+        }
+
+
+def cpu_summary(profiler):
+    """The PROFILE_TOP functions by cumulative time."""
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: -item[1][3])[:PROFILE_TOP]
+    return [{
+        'function': f"{Path(filename).name}:{line}({func})",
+        'calls': calls,
+        'own_seconds': round(own, 6),
+        'cumulative_seconds': round(cumulative, 6),
+    } for (filename, line, func), (_, calls, own, cumulative, _) in ranked]
+
+
+@contextmanager
+def profiling(kinds):
+    """Profile a block (see start_profiling); the summary lands in the trace."""
+    start_profiling(kinds)
+    try:
+        yield
+    finally:
+        stop_profiling(trace_path("profile", ".prof") if "cpu" in set(kinds) else None)
+
+
+# ============ OUTPUT ============
+
+def trace_path(command, suffix=".json"):
+    return LOGS_DIR / f"trace_{command}_{_trace.started_at:%Y%m%d-%H%M%S}{suffix}"
+
+
+def write_trace(command, **meta):
+    """Stop any profiling, then save the trace as logs/trace_<command>_<time>.json. Returns the path."""
+    global _written
+    if _profiling is not None:
+        stop_profiling(trace_path(command, ".prof") if "cpu" in _profiling[0] else None)
+    path = trace_path(command)
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(_trace.to_dict(command, **meta), indent=2))
+    _written = True
+    return path
+
+
+def _write_on_exit():
+    if not _written:
+        path = write_trace(Path(sys.argv[0]).stem or "python")
+        print(f"Trace saved: {path}", file=sys.stderr)
+
+
+if os.getenv(TRACE_ENV) or os.getenv(PROFILE_ENV):
+    start_profiling(parse_kinds(os.getenv(PROFILE_ENV, "")))
+    atexit.register(_write_on_exit)
+
+
+# ============ CLI ============
+
+def show(path):
+    trace = json.loads(Path(path).read_text())
+    print(f"=== {trace['command']} {trace['meta']} ({trace['wall_seconds'] * 1000:.1f} ms wall) ===")
+    print("\nStages:")
+    for name, stage in sorted(trace['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"  {name:<36} {stage['seconds'] * 1000:10.1f} ms  {stage['calls']:6,} calls  "
+              f"max {stage['max'] * 1000:.1f} ms")
+    print("\nCounters:")
+    for name, value in trace['counters'].items():
+        print(f"  {name:<36} {value:12,}")
+    cpu = trace['profile'].get('cpu')
+    if cpu:
+        print("\nCPU profile (top by cumulative time):")
+        for entry in cpu['top'][:10]:
+            print(f"  {entry['cumulative_seconds'] * 1000:9.1f} ms  {entry['function']}")
+    memory = trace['profile'].get('memory')
+    if memory:
+        print(f"\nPeak traced memory: {memory['peak_bytes'] / 1024 / 1024:.1f} MB")
+
+
+def diff(base_path, head_path):
+    base, head = (json.loads(Path(p).read_text()) for p in (base_path, head_path))
+    print(f"=== {Path(head_path).name} vs {Path(base_path).name} ===")
+    print(f"  {'wall':<36} {base['wall_seconds'] * 1000:10.1f} -> {head['wall_seconds'] * 1000:10.1f} ms")
+
+    print("\nStages (total ms):")
+    for name in sorted(set(base['stages']) | set(head['stages'])):
+        before = base['stages'].get(name, {}).get('seconds', 0) * 1000
+        after = head['stages'].get(name, {}).get('seconds', 0) * 1000
+        ratio = f"{after / before:6.2f}x" if before else "   new"
+        print(f"  {name:<36} {before:10.1f} -> {after:10.1f}  {ratio}")
+
+    print("\nCounters:")
+    for name in sorted(set(base['counters']) | set(head['counters'])):
+        before, after = base['counters'].get(name, 0), head['counters'].get(name, 0)
+        print(f"  {name:<36} {before:12,} -> {after:12,}  {after - before:+,}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] == "show":
+        show(args[1])
+    elif len(args) == 3 and args[0] == "diff":
+        diff(args[1], args[2])
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
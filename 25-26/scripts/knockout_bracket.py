@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Rundisliga Cup knockout bracket.
+
+`seed` draws the quarter-finals from the final group table (1v8, 4v5, 2v7,
+3v6, with the GW32 playoff settled on GW32 scores) and stores both legs in
+cup_fixtures, tagged with their tie. Each tie's seeds live in knockout_ties.
+
+Whenever scores change, `update_bracket` resolves each stage with a single
+UPDATE (aggregate, then away score, then 2nd-leg score; the final on score,
+then gross FPL points) and creates or corrects the next stage's ties and
+legs. fetch_gameweek_scores.py calls it after recording results.
+
+These UPDATEs are the one implementation of the knockout rules that decides
+real ties; simulate_cup.py mirrors them with array operations for the odds.
+
+The bracket as it stood at any gameweek is one indexed read (`show`).
+
+In two-leg ties the lower seed is at home in the 1st leg and the higher
+seed in the 2nd; the higher seed is the home side in the final.
+
+Usage: knockout_bracket.py seed | update | show [gameweek]
+"""
+
+import sys
+
+from cup_standings import get_standings
+from db_utils import get_connection, transaction
+from generate_swiss_draw import ROUND_TO_GAMEWEEK
+from migrations import GROUP_STAGE_ROUNDS
+from tiebreakers import QUALIFY_SPOTS, H2HIndex, playoff_contenders, rank_standings
+
+PLAYOFF_GAMEWEEK = 32
+
+# Stage -> its rounds in cup_fixtures (1st leg, 2nd leg)
+STAGE_ROUNDS = {"QF": (11, 12), "SF": (13, 14), "FINAL": (15,)}
+
+# Quarter-final ties by group position (1-based)
+QF_DRAW = [("QF-1", 1, 8), ("QF-2", 4, 5), ("QF-3", 2, 7), ("QF-4", 3, 6)]
+
+# Stage -> (next stage, [(tie, fed by tie, fed by tie)])
+NEXT_STAGE = {
+    "QF": ("SF", [("SF-1", "QF-1", "QF-2"), ("SF-2", "QF-3", "QF-4")]),
+    "SF": ("FINAL", [("FINAL", "SF-1", "SF-2")]),
+}
+
+# A re-seeded tie keeps its result only if its participants are unchanged
+SAME_SEEDS = "knockout_ties.high_seed = excluded.high_seed AND knockout_ties.low_seed = excluded.low_seed"
+
+UPSERT_TIE = f"""
+    INSERT INTO knockout_ties (tie, stage, high_seed, low_seed, high_rank, low_rank, seeded_gameweek)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(tie) DO UPDATE SET
+        high_seed = excluded.high_seed,
+        low_seed = excluded.low_seed,
+        high_rank = excluded.high_rank,
+        low_rank = excluded.low_rank,
+        seeded_gameweek = excluded.seeded_gameweek,
+        winner = CASE WHEN {SAME_SEEDS} THEN knockout_ties.winner END,
+        decided_by = CASE WHEN {SAME_SEEDS} THEN knockout_ties.decided_by END,
+        decided_gameweek = CASE WHEN {SAME_SEEDS} THEN knockout_ties.decided_gameweek END
+"""
+
+UPSERT_LEG = """
+    INSERT INTO cup_fixtures (round, gameweek, tie, home_manager_id, away_manager_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(tie, round) DO UPDATE SET
+        home_manager_id = excluded.home_manager_id,
+        away_manager_id = excluded.away_manager_id,
+        home_score = NULL,
+        away_score = NULL,
+        home_cup_result = NULL,
+        away_cup_result = NULL
+    WHERE cup_fixtures.home_manager_id IS NOT excluded.home_manager_id
+       OR cup_fixtures.away_manager_id IS NOT excluded.away_manager_id
+"""
+
+# Both legs of every tie in a two-leg stage (?1 = 1st leg round, ?2 = 2nd).
+# The high seed is away in the 1st leg and at home in the 2nd.
+RESOLVE_TWO_LEG = """
+    UPDATE knockout_ties
+    SET winner = CASE
+            WHEN legs.high_total != legs.low_total THEN
+                CASE WHEN legs.high_total > legs.low_total THEN high_seed ELSE low_seed END
+            WHEN legs.high_away != legs.low_away THEN
+                CASE WHEN legs.high_away > legs.low_away THEN high_seed ELSE low_seed END
+            WHEN legs.high_second != legs.low_second THEN
+                CASE WHEN legs.high_second > legs.low_second THEN high_seed ELSE low_seed END
+        END,
+        decided_by = CASE
+            WHEN legs.high_total != legs.low_total THEN 'aggregate'
+            WHEN legs.high_away != legs.low_away THEN 'away score'
+            WHEN legs.high_second != legs.low_second THEN '2nd leg'
+            ELSE 'level'
+        END,
+        decided_gameweek = legs.gameweek
+    FROM (
+        SELECT k.tie,
+               first.away_score + second.home_score AS high_total,
+               first.home_score + second.away_score AS low_total,
+               first.away_score AS high_away,
+               second.away_score AS low_away,
+               second.home_score AS high_second,
+               second.away_score AS low_second,
+               second.gameweek
+        FROM knockout_ties k
+        JOIN cup_fixtures first ON first.tie = k.tie AND first.round = ?1
+        JOIN cup_fixtures second ON second.tie = k.tie AND second.round = ?2
+        WHERE first.home_score IS NOT NULL AND first.away_score IS NOT NULL
+          AND second.home_score IS NOT NULL AND second.away_score IS NOT NULL
+    ) AS legs
+    WHERE knockout_ties.tie = legs.tie
+"""
+
+# The final (?1 = its round): net score, then gross FPL points that gameweek
+RESOLVE_FINAL = """
+    UPDATE knockout_ties
+    SET winner = CASE
+            WHEN final.high_score != final.low_score THEN
+                CASE WHEN final.high_score > final.low_score THEN high_seed ELSE low_seed END
+            WHEN final.high_points != final.low_points THEN
+                CASE WHEN final.high_points > final.low_points THEN high_seed ELSE low_seed END
+        END,
+        decided_by = CASE
+            WHEN final.high_score != final.low_score THEN 'score'
+            WHEN final.high_points != final.low_points THEN 'gross FPL'
+            ELSE 'level'
+        END,
+        decided_gameweek = final.gameweek
+    FROM (
+        SELECT k.tie, f.home_score AS high_score, f.away_score AS low_score,
+               hs.points AS high_points, ls.points AS low_points, f.gameweek
+        FROM knockout_ties k
+        JOIN cup_fixtures f ON f.tie = k.tie AND f.round = ?1
+        LEFT JOIN managers hm ON hm.fpl_id = k.high_seed
+        LEFT JOIN gameweek_scores hs ON hs.manager_id = hm.id AND hs.gameweek = f.gameweek
+        LEFT JOIN managers lm ON lm.fpl_id = k.low_seed
+        LEFT JOIN gameweek_scores ls ON ls.manager_id = lm.id AND ls.gameweek = f.gameweek
+        WHERE f.home_score IS NOT NULL AND f.away_score IS NOT NULL
+    ) AS final
+    WHERE knockout_ties.tie = final.tie
+"""
+
+# Ties known by a gameweek (?1), with their legs and results as of then
+BRACKET_AT = """
+    SELECT k.tie, k.stage, k.high_seed, k.low_seed, k.high_rank, k.low_rank,
+           hm.name AS high_name, lm.name AS low_name,
+           CASE WHEN k.decided_gameweek <= ?1 THEN k.winner END AS winner,
+           CASE WHEN k.decided_gameweek <= ?1 THEN k.decided_by END AS decided_by,
+           f.round, f.gameweek, f.home_manager_id, f.away_manager_id,
+           CASE WHEN f.gameweek <= ?1 THEN f.home_score END AS home_score,
+           CASE WHEN f.gameweek <= ?1 THEN f.away_score END AS away_score
+    FROM knockout_ties k
+    LEFT JOIN managers hm ON hm.fpl_id = k.high_seed
+    LEFT JOIN managers lm ON lm.fpl_id = k.low_seed
+    LEFT JOIN cup_fixtures f ON f.tie = k.tie
+    WHERE k.seeded_gameweek <= ?1
+    ORDER BY k.rowid, f.round
+"""
+
+
+def qualifiers(conn=None):
+    """
+    The eight qualifiers in seed order, as (fpl_id, group position) pairs.
+
+    Raises ValueError if the group stage isn't finished, or a GW32 playoff
+    is needed and its scores aren't recorded.
+    """
+    conn = conn or get_connection()
+    unplayed = conn.execute(
+        "SELECT COUNT(*) FROM cup_fixtures WHERE round <= ? AND (home_score IS NULL OR away_score IS NULL)",
+        (GROUP_STAGE_ROUNDS,)).fetchone()[0]
+    if unplayed:
+        raise ValueError(f"{unplayed} group-stage fixtures have no result yet")
+
+    ranked = rank_standings(get_standings(), H2HIndex.from_db(conn=conn))
+    playoff = playoff_contenders(ranked)
+    if playoff:
+        contenders, _ = playoff
+        ids = [row['fpl_id'] for row in contenders]
+        scores = dict(conn.execute(f"""
+            SELECT m.fpl_id, gs.net_points FROM gameweek_scores gs JOIN managers m ON m.id = gs.manager_id
+            WHERE gs.gameweek = ? AND m.fpl_id IN ({', '.join('?' * len(ids))})
+        """, (PLAYOFF_GAMEWEEK, *ids)).fetchall())
+        missing = [fpl_id for fpl_id in ids if fpl_id not in scores]
+        if missing:
+            raise ValueError(f"GW{PLAYOFF_GAMEWEEK} playoff scores missing for {len(missing)} managers")
+        # The playoff group is re-ordered on its GW32 scores, in place
+        start = ranked.index(contenders[0])
+        ranked[start:start + len(contenders)] = sorted(contenders, key=lambda row: -scores[row['fpl_id']])
+
+    return [(row['fpl_id'], position) for position, row in enumerate(ranked[:QUALIFY_SPOTS], 1)]
+
+
+def write_tie(conn, tie, stage, seeds, seeded_gameweek):
+    """Upsert a tie and its legs. `seeds` is two (fpl_id, group position) pairs in any order."""
+    (high, high_rank), (low, low_rank) = sorted(seeds, key=lambda seed: seed[1])
+    conn.execute(UPSERT_TIE, (tie, stage, high, low, high_rank, low_rank, seeded_gameweek))
+
+    rounds = STAGE_ROUNDS[stage]
+    if len(rounds) == 1:
+        legs = [(rounds[0], high, low)]
+    else:
+        legs = [(rounds[0], low, high), (rounds[1], high, low)]
+    for round_num, home, away in legs:
+        conn.execute(UPSERT_LEG, (round_num, ROUND_TO_GAMEWEEK[round_num], tie, home, away))
+
+
+def seed_quarter_finals(conn=None):
+    """Draw the quarter-finals from the final group table. Returns the ties written."""
+    conn = conn or get_connection()
+    seeds = dict((position, (fpl_id, position)) for fpl_id, position in qualifiers(conn))
+    seeded_gameweek = ROUND_TO_GAMEWEEK[GROUP_STAGE_ROUNDS]
+    if conn.execute("SELECT 1 FROM gameweek_scores WHERE gameweek = ? LIMIT 1", (PLAYOFF_GAMEWEEK,)).fetchone():
+        seeded_gameweek = PLAYOFF_GAMEWEEK
+
+    with transaction(conn):
+        for tie, high, low in QF_DRAW:
+            write_tie(conn, tie, "QF", (seeds[high], seeds[low]), seeded_gameweek)
+    return [tie for tie, _, _ in QF_DRAW]
+
+
+def resolve_stage(stage, conn=None):
+    """Decide every tie of a stage whose legs are all scored (one UPDATE). Returns ties updated."""
+    rounds = STAGE_ROUNDS[stage]
+    sql = RESOLVE_FINAL if len(rounds) == 1 else RESOLVE_TWO_LEG
+    with transaction(conn or get_connection()) as conn:
+        return conn.execute(sql, rounds).rowcount
+
+
+def advance(stage, conn=None):
+    """
+    Create or correct the next stage's ties from this stage's winners, and
+    withdraw any whose feeders are no longer decided. Returns ties written.
+    """
+    next_stage, pairs = NEXT_STAGE[stage]
+    written = []
+    with transaction(conn or get_connection()) as conn:
+        ties = {row['tie']: row for row in conn.execute("SELECT * FROM knockout_ties WHERE stage = ?", (stage,))}
+        for tie, feeder_a, feeder_b in pairs:
+            feeders = [ties.get(feeder_a), ties.get(feeder_b)]
+            if not all(feeder and feeder['winner'] for feeder in feeders):
+                # A corrected result can undecide a feeder; withdraw any tie drawn from it
+                conn.execute("DELETE FROM cup_fixtures WHERE tie = ?", (tie,))
+                conn.execute("DELETE FROM knockout_ties WHERE tie = ?", (tie,))
+                continue
+            seeds = [(f['winner'], f['high_rank'] if f['winner'] == f['high_seed'] else f['low_rank'])
+                     for f in feeders]
+            write_tie(conn, tie, next_stage, seeds, max(f['decided_gameweek'] for f in feeders))
+            written.append(tie)
+    return written
+
+
+def update_bracket(conn=None):
+    """Resolve every stage in order and advance winners. Returns {tie: winner} for decided ties."""
+    conn = conn or get_connection()
+    with transaction(conn):
+        for stage in STAGE_ROUNDS:
+            resolve_stage(stage, conn)
+            if stage in NEXT_STAGE:
+                advance(stage, conn)
+        return dict(conn.execute("SELECT tie, winner FROM knockout_ties WHERE winner IS NOT NULL").fetchall())
+
+
+def get_bracket(gameweek=None, conn=None):
+    """
+    The bracket as it stood after `gameweek` (default: now).
+
+    Returns a list of ties in draw order, each a dict with its seeds,
+    winner, decided_by and `legs` (round, gameweek, home/away ids and
+    scores known by then).
+    """
+    conn = conn or get_connection()
+    ties = {}
+    for row in conn.execute(BRACKET_AT, (gameweek or max(ROUND_TO_GAMEWEEK.values()),)):
+        tie = ties.setdefault(row['tie'], {
+            key: row[key] for key in ('tie', 'stage', 'high_seed', 'low_seed', 'high_rank', 'low_rank',
+                                      'high_name', 'low_name', 'winner', 'decided_by')
+        } | {'legs': []})
+        if row['round'] is not None:
+            tie['legs'].append({key: row[key] for key in ('round', 'gameweek', 'home_manager_id',
+                                                          'away_manager_id', 'home_score', 'away_score')})
+    return list(ties.values())
+
+
+def tie_totals(tie):
+    """(high seed, low seed) totals over the legs scored so far; (None, None) before any."""
+    high_total = low_total = None
+    for leg in tie['legs']:
+        if leg['home_score'] is None:
+            continue
+        scores = {leg['home_manager_id']: leg['home_score'], leg['away_manager_id']: leg['away_score']}
+        high_total = (high_total or 0) + scores[tie['high_seed']]
+        low_total = (low_total or 0) + scores[tie['low_seed']]
+    return high_total, low_total
+
+
+def show(gameweek=None):
+    bracket = get_bracket(gameweek)
+    label = f"AFTER GW{gameweek}" if gameweek else "NOW"
+    print(f"=== KNOCKOUT BRACKET ({label}) ===")
+    if not bracket:
+        print("Not drawn yet")
+        return
+
+    for tie in bracket:
+        high, low = tie['high_seed'], tie['low_seed']
+        names = {high: tie['high_name'] or high, low: tie['low_name'] or low}
+        high_total, low_total = tie_totals(tie)
+        score = f"{high_total} - {low_total}" if high_total is not None else "vs"
+        line = f"{tie['tie']:<6} ({tie['high_rank']}) {names[high]:<22} {score:^9} {names[low]} ({tie['low_rank']})"
+        if tie['winner']:
+            line += f"  ✓ {names[tie['winner']]} ({tie['decided_by']})"
+        elif tie['decided_by'] == 'level':
+            line += "  ✗ level on every tiebreaker"
+        print(line)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ["seed"]:
+        try:
+            ties = seed_quarter_finals()
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"✓ Drew {len(ties)} quarter-finals")
+        show()
+    elif args == ["update"]:
+        winners = update_bracket()
+        print(f"✓ {len(winners)} ties decided")
+        show()
+    elif args and args[0] == "show" and (len(args) == 1 or (len(args) == 2 and args[1].isdigit())):
+        show(int(args[1]) if len(args) == 2 else None)
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Image layouts split into a cached static base and per-render dynamic cells.
+
+A layout is declared once with two functions: `build_base(*key)` draws
+everything that only depends on the key (size, row count, titles, column
+headers, stripes...), and `draw_cells(img, cells)` draws the data. Bases are
+cached per key, so a render is a copy of the base plus the dynamic text.
+
+Bump a layout's `version` whenever its drawing changes, so cached outputs
+(see build_cache.py) are rebuilt.
+"""
+
+from functools import lru_cache
+
+from instrument import count, span
+from rendering import font_fingerprint
+
+# Bases kept per layout (row count x title variants)
+BASE_CACHE_SIZE = 64
+
+
+class Layout:
+    """A static base image cached per key, plus a function drawing the dynamic cells."""
+
+    def __init__(self, name, build_base, draw_cells, version=1, cache_size=BASE_CACHE_SIZE):
+        self.name = name
+        self.version = version
+        self.base = lru_cache(maxsize=cache_size)(self._counted(build_base))
+        self.draw_cells = draw_cells
+
+    def _counted(self, build_base):
+        def build(*key):
+            count("render.base_builds")
+            with span(f"render.{self.name}.base"):
+                return build_base(*key)
+        return build
+
+    def render(self, key, cells):
+        """Copy the base for `key` and draw `cells` on it. Returns a new image."""
+        with span(f"render.{self.name}"):
+            img = self.base(*key).copy()
+            self.draw_cells(img, cells)
+        return img
+
+    def fingerprint(self):
+        """What besides the data decides the output: layout name, version and fonts."""
+        return [self.name, self.version, font_fingerprint()]
+
+    def cache_info(self):
+        return self.base.cache_info()
+
+    def cache_clear(self):
+        self.base.cache_clear()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Live cup scoreboard for a gameweek in progress.
+
+Picks are fetched once at start-up; after that only `event/{gw}/live/` is
+polled, with a conditional GET so an unchanged feed costs a 304. Each poll is
+diffed against the previous one by player, and only managers owning a player
+whose points moved - and their cup fixtures - are recomputed. The polling
+interval doubles while nothing changes and resets when something does.
+
+Every change rewrites a snapshot (provisional scores and table) under
+cache/live/, which `show` serves without touching the API.
+
+Scores are provisional: picks x live points minus transfer hits, without
+auto-subs.
+
+Usage: live_scoreboard.py <gameweek> [--once] | show <gameweek>
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from cup_queries import fixtures_by_gameweek
+from cup_standings import get_standings
+from db_utils import get_connection
+from fpl_client import fetch_entry_picks, get_client, poll_live_event
+from migrations import GROUP_STAGE_ROUNDS
+
+LIVE_DIR = Path(__file__).parent.parent / "cache" / "live"
+
+# Polling interval bounds (seconds); doubles on every unchanged poll
+MIN_INTERVAL = 60
+MAX_INTERVAL = 600
+
+# Polls between checks of bootstrap-static for the gameweek finishing
+STATE_CHECK_EVERY = 10
+
+PICK_WORKERS = 8
+
+STANDINGS_FIELDS = ('played', 'won', 'drawn', 'lost', 'points', 'fpl_total')
+
+
+def result_row(us, them):
+    """Standings increment for one side of a result."""
+    won, drawn = us > them, us == them
+    return (1, int(won), int(drawn), int(us < them), 3 if won else int(drawn), us)
+
+
+class LiveScoreboard:
+    """Provisional scores, fixtures and table for one gameweek, updated by deltas."""
+
+    def __init__(self, gameweek, fixtures, picks, base_table, names):
+        """
+        `fixtures` are cup_fixtures rows for the gameweek; `picks` maps
+        fpl_id -> picks payload; `base_table` maps fpl_id -> standings row
+        before this round; `names` maps fpl_id -> manager name.
+        """
+        self.gameweek = gameweek
+        self.fixtures = fixtures
+        self.names = names
+        self.player_points = {}
+        self.scores = {}
+        self.owners = {}
+        self.strength = {}
+
+        for fpl_id, data in picks.items():
+            history = data.get('entry_history', {})
+            self.scores[fpl_id] = -(history.get('event_transfers_cost') or 0)
+            for pick in data.get('picks', []):
+                if pick['multiplier']:
+                    self.owners.setdefault(pick['element'], []).append((fpl_id, pick['multiplier']))
+            # Pre-round cup standing, then season total, decides who the underdog is
+            row = base_table.get(fpl_id, {})
+            self.strength[fpl_id] = (row.get('points', 0), row.get('fpl_total', 0),
+                                     history.get('total_points', 0))
+
+        self.fixtures_of = {}
+        for f in fixtures:
+            self.fixtures_of.setdefault(f['home_manager_id'], []).append(f)
+            self.fixtures_of.setdefault(f['away_manager_id'], []).append(f)
+
+        self.table = {fpl_id: [row.get(k, 0) for k in STANDINGS_FIELDS] for fpl_id, row in base_table.items()}
+        self.leaders = {}
+        self.contributions = {}
+        self._standings = None
+        for fixture in fixtures:
+            self._refresh(fixture)
+
+    def update(self, player_points):
+        """
+        Apply a fresh live feed ({element: total_points}). Returns change events.
+
+        Only players whose points moved are touched; their owners' scores are
+        adjusted by the delta and just those owners' fixtures are re-resolved.
+        """
+        first_feed = not self.player_points
+        affected = set()
+        for element, points in player_points.items():
+            delta = points - self.player_points.get(element, 0)
+            if not delta:
+                continue
+            self.player_points[element] = points
+            for fpl_id, multiplier in self.owners.get(element, ()):
+                self.scores[fpl_id] += multiplier * delta
+                affected.add(fpl_id)
+
+        fixtures = {f['id']: f for fpl_id in affected for f in self.fixtures_of.get(fpl_id, ())}
+        events = []
+        for fixture in fixtures.values():
+            events.extend(self._refresh(fixture))
+        # The first feed only establishes who is ahead
+        return [] if first_feed else events
+
+    def _refresh(self, fixture):
+        home, away = fixture['home_manager_id'], fixture['away_manager_id']
+        home_score, away_score = self.scores.get(home, 0), self.scores.get(away, 0)
+
+        if fixture['round'] <= GROUP_STAGE_ROUNDS:
+            for fpl_id, row in self.contributions.get(fixture['id'], ()):
+                self.table[fpl_id] = [a - b for a, b in zip(self.table[fpl_id], row)]
+            contribution = [(home, result_row(home_score, away_score)),
+                            (away, result_row(away_score, home_score))]
+            for fpl_id, row in contribution:
+                current = self.table.get(fpl_id, [0] * len(STANDINGS_FIELDS))
+                self.table[fpl_id] = [a + b for a, b in zip(current, row)]
+            self.contributions[fixture['id']] = contribution
+            self._standings = None
+
+        leader = home if home_score > away_score else away if away_score > home_score else None
+        previous = self.leaders.get(fixture['id'], leader)
+        self.leaders[fixture['id']] = leader
+        if leader == previous or leader is None:
+            return []
+
+        trailer = away if leader == home else home
+        # Without both strengths (e.g. picks failed to load) it is a plain lead change
+        leader_strength, trailer_strength = self.strength.get(leader), self.strength.get(trailer)
+        upset = None not in (leader_strength, trailer_strength) and leader_strength < trailer_strength
+        event = {
+            'type': 'upset' if upset else 'lead_change',
+            'fixture_id': fixture['id'],
+            'leader': leader,
+            'trailer': trailer,
+            'score': (max(home_score, away_score), min(home_score, away_score)),
+        }
+        return [event]
+
+    def standings(self):
+        """Provisional table, sorted once per change rather than per request."""
+        if self._standings is None:
+            rows = [
+                {'fpl_id': fpl_id, 'name': self.names.get(fpl_id), **dict(zip(STANDINGS_FIELDS, row))}
+                for fpl_id, row in self.table.items()
+            ]
+            self._standings = sorted(rows, key=lambda r: (-r['points'], -r['fpl_total']))
+        return self._standings
+
+    def snapshot(self):
+        """JSON-serializable provisional state."""
+        return {
+            'gameweek': self.gameweek,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'fixtures': [{
+                'id': f['id'],
+                'round': f['round'],
+                'home': self.names.get(f['home_manager_id']),
+                'away': self.names.get(f['away_manager_id']),
+                'home_score': self.scores.get(f['home_manager_id'], 0),
+                'away_score': self.scores.get(f['away_manager_id'], 0),
+            } for f in self.fixtures],
+            'standings': self.standings(),
+        }
+
+
+def snapshot_path(gameweek):
+    return LIVE_DIR / f"gw{gameweek}.json"
+
+
+def write_snapshot(board):
+    """Atomically replace the gameweek's snapshot file."""
+    LIVE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=LIVE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(board.snapshot(), f)
+    os.replace(tmp_path, snapshot_path(board.gameweek))
+
+
+def load_snapshot(gameweek):
+    """Last provisional snapshot for a gameweek, or None."""
+    try:
+        return json.loads(snapshot_path(gameweek).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def load_picks(fpl_id, gameweek, client):
+    """One manager's picks for the gameweek, or None if they can't be fetched (e.g. a 404 for a late joiner)."""
+    try:
+        return fetch_entry_picks(fpl_id, gameweek, client)
+    except requests.RequestException as e:
+        status = e.response.status_code if e.response is not None else type(e).__name__
+        print(f"Error fetching GW{gameweek} picks for {fpl_id}: {status}")
+        return None
+
+
+def build_scoreboard(gameweek, client=None):
+    """Load the gameweek's fixtures and pre-round table, and fetch every manager's picks once."""
+    client = client or get_client()
+    conn = get_connection()
+    fixtures = fixtures_by_gameweek(gameweek, conn)
+    names = {row['fpl_id']: row['name'] for row in conn.execute("SELECT fpl_id, name FROM managers")}
+
+    round_num = fixtures[0]['round'] if fixtures else None
+    base_table = {}
+    if round_num and 1 < round_num <= GROUP_STAGE_ROUNDS:
+        base_table = {row['fpl_id']: row for row in get_standings(through_round=round_num - 1)}
+
+    fpl_ids = sorted({f[side] for f in fixtures for side in ('home_manager_id', 'away_manager_id')})
+    with ThreadPoolExecutor(max_workers=PICK_WORKERS) as pool:
+        loaded = pool.map(lambda fpl_id: load_picks(fpl_id, gameweek, client), fpl_ids)
+        # Managers without picks score 0 and are never flagged as the underdog
+        picks = {fpl_id: data for fpl_id, data in zip(fpl_ids, loaded) if data is not None}
+
+    return LiveScoreboard(gameweek, fixtures, picks, base_table, names)
+
+
+def format_event(board, event):
+    leader, trailer = board.names.get(event['leader']), board.names.get(event['trailer'])
+    high, low = event['score']
+    if event['type'] == 'upset':
+        return f"🚨 UPSET ALERT: {leader.upper()} LEADS {trailer.upper()} {high}-{low}"
+    return f"🔄 {leader.upper()} TAKES THE LEAD AGAINST {trailer.upper()} {high}-{low}"
+
+
+def gameweek_finished(gameweek, client):
+    data, _ = client.poll("bootstrap-static")
+    return any(e['id'] == gameweek and e.get('finished') for e in data.get('events', []))
+
+
+def run(gameweek, once=False, client=None):
+    """Poll until the gameweek finishes (or once), printing change events."""
+    client = client or get_client()
+    board = build_scoreboard(gameweek, client)
+    if not board.fixtures:
+        print(f"No cup fixtures in GW{gameweek}")
+        return
+
+    print(f"=== LIVE GW{gameweek}: {len(board.fixtures)} fixtures, {len(board.owners)} players owned ===")
+    interval = MIN_INTERVAL
+    polls = 0
+    while True:
+        points, changed = poll_live_event(gameweek, client)
+        polls += 1
+        # The first poll may revalidate to a 304 against the disk cache (a restart,
+        # or a second --once run) but the fresh board has no scores yet
+        fresh = changed or polls == 1
+        events = board.update(points) if fresh else []
+        if fresh:
+            write_snapshot(board)
+        for event in events:
+            print(format_event(board, event))
+
+        if once or (polls % STATE_CHECK_EVERY == 0 and gameweek_finished(gameweek, client)):
+            break
+
+        interval = MIN_INTERVAL if changed else min(interval * 2, MAX_INTERVAL)
+        print(f"[{datetime.now():%H:%M:%S}] {'updated' if changed else 'no change'}, next poll in {interval}s")
+        time.sleep(interval)
+
+    show(gameweek)
+
+
+def show(gameweek):
+    """Print the last snapshot."""
+    snapshot = load_snapshot(gameweek)
+    if snapshot is None:
+        print(f"No live snapshot for GW{gameweek}")
+        return
+
+    print(f"\n=== PROVISIONAL GW{gameweek} (as of {snapshot['updated_at']}) ===")
+    for f in snapshot['fixtures']:
+        print(f"  {f['home']:<25} {f['home_score']:3d} - {f['away_score']:<3d} {f['away']}")
+    if snapshot['standings']:
+        print("\nProvisional table:")
+        for i, row in enumerate(snapshot['standings'], 1):
+            print(f"{i:2d}. {row['name']:<25} {row['points']:3d} PTS ({row['fpl_total']} FPL)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] == "show" and args[1].isdigit():
+        show(int(args[1]))
+    elif args and args[0].isdigit() and set(args[1:]) <= {"--once"}:
+        run(int(args[0]), once="--once" in args)
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
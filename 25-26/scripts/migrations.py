@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the Fantasy Cup database.
+
+Each migration is numbered and applied once, in order, inside its own
+transaction. Applied versions are recorded in the schema_version table.
+"""
+
+import sys
+
+import db_utils
+from db_utils import get_connection, transaction
+
+
+def _base_managers(conn):
+    """Bring managers created by the original init_db up to the FPL layout."""
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(managers)")}
+    if 'fpl_entry_name' not in columns:
+        conn.execute("ALTER TABLE managers ADD COLUMN fpl_entry_name TEXT")
+
+    unique_on_fpl_id = False
+    for index in conn.execute("PRAGMA index_list(managers)"):
+        if not index['unique']:
+            continue
+        cols = [c['name'] for c in conn.execute(f"PRAGMA index_info({index['name']})")]
+        if cols == ['fpl_id']:
+            unique_on_fpl_id = True
+    if not unique_on_fpl_id:
+        conn.execute("CREATE UNIQUE INDEX idx_managers_fpl_id ON managers(fpl_id)")
+
+
+# Group-stage rounds whose results feed the materialized standings
+GROUP_STAGE_ROUNDS = 10
+
+STANDINGS_COLUMNS = "played, wins, draws, losses, points, fpl_total"
+STANDINGS_INCREMENT = """
+        played = played + excluded.played,
+        wins = wins + excluded.wins,
+        draws = draws + excluded.draws,
+        losses = losses + excluded.losses,
+        points = points + excluded.points,
+        fpl_total = fpl_total + excluded.fpl_total"""
+
+
+def _side_values(ref, side, sign):
+    """SELECT list applying one side of a fixture (OLD/NEW) with sign +1/-1."""
+    us, them = (f"{ref}.home_score", f"{ref}.away_score") if side == "home" else \
+               (f"{ref}.away_score", f"{ref}.home_score")
+    return (
+        f"{ref}.{side}_manager_id, {sign}, {sign} * ({us} > {them}), "
+        f"{sign} * ({us} = {them}), {sign} * ({us} < {them}), "
+        f"{sign} * (3 * ({us} > {them}) + ({us} = {them})), {sign} * {us}"
+    )
+
+
+def _apply_fixture_sql(ref, sign):
+    """Statements adding (or removing) one fixture's result to the standings tables."""
+    counted = (f"{ref}.round <= {GROUP_STAGE_ROUNDS} AND {ref}.home_score IS NOT NULL "
+               f"AND {ref}.away_score IS NOT NULL")
+    rounds = " UNION ALL ".join(f"SELECT {r} AS round" for r in range(1, GROUP_STAGE_ROUNDS + 1))
+    statements = []
+    for side in ("home", "away"):
+        values = _side_values(ref, side, sign)
+        statements.append(f"""
+            INSERT INTO cup_standings (manager_id, {STANDINGS_COLUMNS})
+            SELECT {values} WHERE {counted}
+            ON CONFLICT(manager_id) DO UPDATE SET {STANDINGS_INCREMENT};""")
+        statements.append(f"""
+            INSERT INTO cup_standings_rounds (round, manager_id, {STANDINGS_COLUMNS})
+            SELECT r.round, {values} FROM ({rounds}) r
+            WHERE r.round >= {ref}.round AND {counted}
+            ON CONFLICT(round, manager_id) DO UPDATE SET {STANDINGS_INCREMENT};""")
+    return "".join(statements)
+
+
+def _standings_triggers():
+    """Triggers keeping cup_standings and its per-round snapshots in step with cup_fixtures."""
+    return [
+        f"""
+        CREATE TRIGGER cup_fixtures_standings_insert AFTER INSERT ON cup_fixtures
+        BEGIN{_apply_fixture_sql("NEW", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER cup_fixtures_standings_update
+        AFTER UPDATE OF round, home_manager_id, away_manager_id, home_score, away_score
+        ON cup_fixtures
+        BEGIN{_apply_fixture_sql("OLD", -1)}{_apply_fixture_sql("NEW", 1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER cup_fixtures_standings_delete AFTER DELETE ON cup_fixtures
+        BEGIN{_apply_fixture_sql("OLD", -1)}
+        END
+        """,
+    ]
+
+
+def rebuild_standings(conn):
+    """Recompute the materialized standings tables from scratch in SQL."""
+    conn.execute("DELETE FROM cup_standings")
+    conn.execute("DELETE FROM cup_standings_rounds")
+    results = f"""
+        SELECT round, home_manager_id AS manager_id, home_score AS us, away_score AS them
+        FROM cup_fixtures
+        WHERE round <= {GROUP_STAGE_ROUNDS} AND home_score IS NOT NULL AND away_score IS NOT NULL
+        UNION ALL
+        SELECT round, away_manager_id, away_score, home_score
+        FROM cup_fixtures
+        WHERE round <= {GROUP_STAGE_ROUNDS} AND home_score IS NOT NULL AND away_score IS NOT NULL
+    """
+    totals = """
+        COUNT(*), SUM(us > them), SUM(us = them), SUM(us < them),
+        SUM(3 * (us > them) + (us = them)), SUM(us)
+    """
+    rounds = " UNION ALL ".join(f"SELECT {r} AS round" for r in range(1, GROUP_STAGE_ROUNDS + 1))
+    conn.execute(f"""
+        INSERT INTO cup_standings (manager_id, {STANDINGS_COLUMNS})
+        SELECT manager_id, {totals} FROM ({results}) GROUP BY manager_id
+    """)
+    conn.execute(f"""
+        INSERT INTO cup_standings_rounds (round, manager_id, {STANDINGS_COLUMNS})
+        SELECT r.round, res.manager_id, {totals.replace('us', 'res.us').replace('them', 'res.them')}
+        FROM ({rounds}) r JOIN ({results}) res ON res.round <= r.round
+        GROUP BY r.round, res.manager_id
+    """)
+
+
+# (version, description, steps). A step is SQL text or a callable(conn).
+MIGRATIONS = [
+    (1, "base schema", [
+        """
+        CREATE TABLE IF NOT EXISTS managers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            team_name TEXT,
+            fpl_id INTEGER UNIQUE,
+            fpl_entry_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        _base_managers,
+        """
+        CREATE TABLE IF NOT EXISTS rounds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            gameweek_start INTEGER,
+            gameweek_end INTEGER,
+            status TEXT DEFAULT 'pending'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS fixtures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            round_id INTEGER,
+            home_manager_id INTEGER,
+            away_manager_id INTEGER,
+            home_score REAL,
+            away_score REAL,
+            winner_id INTEGER,
+            gameweek INTEGER,
+            status TEXT DEFAULT 'pending',
+            FOREIGN KEY (round_id) REFERENCES rounds(id),
+            FOREIGN KEY (home_manager_id) REFERENCES managers(id),
+            FOREIGN KEY (away_manager_id) REFERENCES managers(id),
+            FOREIGN KEY (winner_id) REFERENCES managers(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS gameweek_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            manager_id INTEGER,
+            gameweek INTEGER,
+            points INTEGER,
+            transfers_cost INTEGER DEFAULT 0,
+            net_points INTEGER,
+            FOREIGN KEY (manager_id) REFERENCES managers(id),
+            UNIQUE(manager_id, gameweek)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            category TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS gameweeks (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            deadline_time DATETIME,
+            deadline_time_epoch INTEGER,
+            is_previous BOOLEAN,
+            is_current BOOLEAN,
+            is_next BOOLEAN,
+            finished BOOLEAN,
+            data_checked BOOLEAN,
+            highest_score INTEGER,
+            average_score INTEGER,
+            most_selected INTEGER,
+            most_transferred_in INTEGER,
+            most_captained INTEGER,
+            most_vice_captained INTEGER,
+            chip_plays TEXT,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS league_info (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            created DATETIME,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS h2h_matches (
+            id INTEGER PRIMARY KEY,
+            gameweek INTEGER,
+            entry_1_id INTEGER,
+            entry_1_name TEXT,
+            entry_1_player_name TEXT,
+            entry_1_points INTEGER,
+            entry_2_id INTEGER,
+            entry_2_name TEXT,
+            entry_2_player_name TEXT,
+            entry_2_points INTEGER,
+            is_knockout BOOLEAN,
+            winner INTEGER,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(gameweek, entry_1_id, entry_2_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cup_fixtures (
+            id INTEGER PRIMARY KEY,
+            round INTEGER,
+            gameweek INTEGER,
+            home_manager_id INTEGER,
+            away_manager_id INTEGER,
+            home_score INTEGER,
+            away_score INTEGER,
+            home_cup_result TEXT,
+            away_cup_result TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (home_manager_id) REFERENCES managers(fpl_id),
+            FOREIGN KEY (away_manager_id) REFERENCES managers(fpl_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cup_standings (
+            manager_id INTEGER PRIMARY KEY,
+            played INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            draws INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            points INTEGER DEFAULT 0,
+            fpl_total INTEGER DEFAULT 0,
+            FOREIGN KEY (manager_id) REFERENCES managers(fpl_id)
+        )
+        """,
+    ]),
+    # h2h_matches(gameweek) is already served by its UNIQUE(gameweek, ...) index
+    (2, "hot query indexes", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_cup_fixtures_round
+        ON cup_fixtures(round, home_manager_id, away_manager_id, home_score, away_score)
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_cup_fixtures_gameweek ON cup_fixtures(gameweek)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_gameweek_scores_gameweek
+        ON gameweek_scores(gameweek, manager_id, net_points)
+        """,
+    ]),
+    (3, "materialized cup standings", [
+        """
+        CREATE TABLE IF NOT EXISTS cup_standings_rounds (
+            round INTEGER,
+            manager_id INTEGER,
+            played INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            draws INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            points INTEGER DEFAULT 0,
+            fpl_total INTEGER DEFAULT 0,
+            PRIMARY KEY (round, manager_id),
+            FOREIGN KEY (manager_id) REFERENCES managers(fpl_id)
+        )
+        """,
+        *_standings_triggers(),
+        rebuild_standings,
+    ]),
+    # Per-manager fixture lookups; covering for the standings aggregate
+    (4, "per-manager fixture indexes", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_cup_fixtures_home
+        ON cup_fixtures(home_manager_id, round, home_score, away_score)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_cup_fixtures_away
+        ON cup_fixtures(away_manager_id, round, away_score, home_score)
+        """,
+    ]),
+    # Knockout legs are cup_fixtures rows tagged with their tie; knockout_ties
+    # holds each tie's seeds and, once resolved, its winner
+    (5, "knockout bracket", [
+        "ALTER TABLE cup_fixtures ADD COLUMN tie TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_cup_fixtures_tie ON cup_fixtures(tie, round)",
+        """
+        CREATE TABLE IF NOT EXISTS knockout_ties (
+            tie TEXT PRIMARY KEY,
+            stage TEXT NOT NULL,
+            high_seed INTEGER NOT NULL,
+            low_seed INTEGER NOT NULL,
+            high_rank INTEGER,
+            low_rank INTEGER,
+            seeded_gameweek INTEGER,
+            winner INTEGER,
+            decided_by TEXT,
+            decided_gameweek INTEGER,
+            FOREIGN KEY (high_seed) REFERENCES managers(fpl_id),
+            FOREIGN KEY (low_seed) REFERENCES managers(fpl_id),
+            FOREIGN KEY (winner) REFERENCES managers(fpl_id)
+        )
+        """,
+    ]),
+    (6, "scheduled jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            id TEXT PRIMARY KEY,
+            gameweek INTEGER NOT NULL,
+            trigger TEXT NOT NULL,
+            run_at TEXT,
+            title TEXT NOT NULL,
+            task_file TEXT NOT NULL,
+            content_hash TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            fired_at TEXT,
+            updated_at TEXT,
+            FOREIGN KEY (gameweek) REFERENCES gameweeks(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_status ON scheduled_jobs(status, run_at)",
+    ]),
+]
+
+
+def current_version(conn):
+    """Return the highest applied migration version (0 for a fresh database)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn=None, verbose=False):
+    """Apply every pending migration. Returns the list of versions applied."""
+    conn = conn or get_connection()
+    version = current_version(conn)
+    applied = []
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        with transaction(conn):
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (number, description)
+            )
+        applied.append(number)
+        if verbose:
+            print(f"Applied migration {number}: {description}")
+
+    return applied
+
+
+# ============ QUERY PLAN CHECKS ============
+
+# (description, SQL, params, index the plan must use)
+HOT_QUERIES = [
+    ("fixtures by round",
+     "SELECT * FROM cup_fixtures WHERE round = ? ORDER BY id", (1,),
+     "idx_cup_fixtures_round"),
+    ("group stage results",
+     """SELECT home_manager_id, away_manager_id, home_score, away_score FROM cup_fixtures
+        WHERE round <= 10 AND home_score IS NOT NULL AND away_score IS NOT NULL""", (),
+     "idx_cup_fixtures_round"),
+    ("fixtures by gameweek",
+     "SELECT * FROM cup_fixtures WHERE gameweek = ?", (21,),
+     "idx_cup_fixtures_gameweek"),
+    ("home totals by manager",
+     """SELECT home_manager_id, COUNT(*), SUM(home_score) FROM cup_fixtures
+        WHERE round <= 10 AND home_score IS NOT NULL AND away_score IS NOT NULL
+        GROUP BY home_manager_id""", (),
+     "idx_cup_fixtures_home"),
+    ("away fixtures by manager",
+     "SELECT * FROM cup_fixtures WHERE away_manager_id = ?", (1,),
+     "idx_cup_fixtures_away"),
+    ("knockout legs by tie",
+     "SELECT * FROM cup_fixtures WHERE tie = ? AND round = ?", ("QF-1", 11),
+     "idx_cup_fixtures_tie"),
+    ("h2h matches by gameweek",
+     "SELECT * FROM h2h_matches WHERE gameweek = ?", (21,),
+     "sqlite_autoindex_h2h_matches_1"),
+    ("standings after round",
+     "SELECT * FROM cup_standings_rounds WHERE round = ?", (5,),
+     "sqlite_autoindex_cup_standings_rounds_1"),
+    ("pending jobs",
+     "SELECT * FROM scheduled_jobs WHERE status = 'pending' ORDER BY run_at", (),
+     "idx_scheduled_jobs_status"),
+    ("gameweek scores",
+     "SELECT manager_id, net_points FROM gameweek_scores WHERE gameweek = ?", (21,),
+     "idx_gameweek_scores_gameweek"),
+]
+
+
+def query_plan(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query."""
+    return [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn=None):
+    """Assert every hot query is served by its index. Returns True if all pass."""
+    conn = conn or get_connection()
+    all_ok = True
+
+    print("=== QUERY PLAN CHECK ===")
+    for description, sql, params, index in HOT_QUERIES:
+        plan = query_plan(conn, sql, params)
+        ok = any(index in line for line in plan)
+        all_ok = all_ok and ok
+        print(f"{description:<26} {'✓' if ok else '✗'}  {' | '.join(plan)}")
+
+    return all_ok
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+
+    if command == "migrate":
+        # A fresh connection, so the automatic migration in get_connection()
+        # doesn't run first and swallow the output
+        applied = migrate(db_utils.connect(), verbose=True)
+        if not applied:
+            print("Schema up to date")
+    elif command == "status":
+        conn = get_connection()
+        print(f"Schema version: {current_version(conn)} (latest {MIGRATIONS[-1][0]})")
+    elif command == "check":
+        migrate()
+        sys.exit(0 if check_query_plans() else 1)
+    else:
+        print("Usage: migrations.py [migrate|status|check]")
+        sys.exit(1)
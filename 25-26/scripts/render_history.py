@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Regenerate historical standings and results images in one batch.
+
+The table after every group-stage round comes from a single cumulative pass
+over cup_fixtures, and each gameweek's results from the stored h2h_matches,
+so nothing is fetched from the API. Images are rendered in a process pool.
+
+Outputs go through the build cache (see build_cache.py), keyed exactly as
+the single-image generators key them: an output whose inputs are unchanged
+is skipped, or restored from its stored artifact. --force renders
+everything. Passing only --rounds or --gameweeks renders just that kind.
+
+Usage: render_history.py [--rounds A-B] [--gameweeks A-B] [--workers N] [--force]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from build_cache import digest, get_build_cache
+from cup_standings import standings_by_round
+from db_utils import get_connection
+from generate_results_image import MATCH_FIELDS, OUTPUT_DIR, render_results_image, results_image_inputs
+from generate_standings_image import render_standings_image, standings_image_inputs
+from migrations import GROUP_STAGE_ROUNDS
+from rendering import png_bytes
+
+# Gameweeks with cup results (GW21 to GW38)
+FIRST_GAMEWEEK = 21
+LAST_GAMEWEEK = 38
+
+
+def standings_jobs(rounds):
+    """(kind, round, rows) for each requested round that has results."""
+    snapshots = standings_by_round(max(rounds), ranked=True)
+    return [('standings', round_num, snapshots[round_num]) for round_num in rounds if round_num in snapshots]
+
+
+def results_jobs(gameweeks):
+    """(kind, gameweek, matches) for each requested gameweek with stored H2H matches."""
+    cursor = get_connection().execute(f"""
+        SELECT gameweek, {', '.join(MATCH_FIELDS)} FROM h2h_matches
+        WHERE gameweek BETWEEN ? AND ?
+        ORDER BY gameweek, id
+    """, (min(gameweeks), max(gameweeks)))
+
+    matches = {}
+    for row in cursor:
+        if row['gameweek'] in gameweeks:
+            matches.setdefault(row['gameweek'], []).append({f: row[f] for f in MATCH_FIELDS})
+    return [('results', gw, rows) for gw, rows in sorted(matches.items())]
+
+
+def output_name(kind, key):
+    return f"standings_round{key}.png" if kind == 'standings' else f"gw{key}_results.png"
+
+
+def job_inputs(kind, key, rows):
+    if kind == 'standings':
+        return standings_image_inputs(rows, round_num=key)
+    return results_image_inputs(key, rows)
+
+
+def render_job(job):
+    """Render one image to PNG bytes (runs in a worker process). Returns (bytes, seconds)."""
+    start = time.perf_counter()
+    kind, key, rows = job
+    if kind == 'standings':
+        img = render_standings_image(rows, round_num=key)
+    else:
+        img = render_results_image(key, rows)
+    return png_bytes(img), time.perf_counter() - start
+
+
+def render_history(rounds=None, gameweeks=None, workers=None, force=False):
+    """
+    Render every changed historical image. With neither `rounds` nor
+    `gameweeks` given, all of both are rendered.
+
+    Returns {output name: path} for what was rendered.
+    """
+    if rounds is None and gameweeks is None:
+        rounds = range(1, GROUP_STAGE_ROUNDS + 1)
+        gameweeks = range(FIRST_GAMEWEEK, LAST_GAMEWEEK + 1)
+    jobs = (standings_jobs(rounds) if rounds else []) + (results_jobs(gameweeks) if gameweeks else [])
+
+    cache = get_build_cache()
+    pending = []
+    for job in jobs:
+        path = OUTPUT_DIR / output_name(*job[:2])
+        key = digest(path.name, job_inputs(*job))
+        if force or not cache.lookup(path, key):
+            pending.append((job, path, key))
+
+    print(f"{len(jobs)} outputs, {len(jobs) - len(pending)} unchanged, {len(pending)} to render")
+    if not pending:
+        return {}
+
+    rendered = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Chunks keep same-shaped images in one worker so its cached layout bases are reused
+        chunksize = max(1, len(pending) // (4 * (workers or os.cpu_count() or 1)))
+        results = pool.map(render_job, [job for job, _, _ in pending], chunksize=chunksize)
+        for (job, path, key), (data, seconds) in zip(pending, results):
+            cache.store(path, key, data)
+            rendered[path.name] = path
+            print(f"✓ {path} ({seconds * 1000:.0f} ms)")
+
+    print(cache.report())
+    return rendered
+
+
+def parse_range(value):
+    start, _, end = value.partition("-")
+    return range(int(start), int(end or start) + 1)
+
+
+if __name__ == "__main__":
+    options = {}
+    args = sys.argv[1:]
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg in ("--rounds", "--gameweeks") and args:
+                options[arg[2:]] = parse_range(args.pop(0))
+            elif arg == "--workers" and args:
+                options["workers"] = int(args.pop(0))
+            elif arg == "--force":
+                options["force"] = True
+            else:
+                raise ValueError(arg)
+    except ValueError:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    start = time.perf_counter()
+    render_history(**options)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Shared Pillow rendering helpers for the Rundisliga Cup image generators.
+
+Fonts are resolved once per process and shared; text is measured and
+rasterized once per (text, font) and reused, so names, digits and headers
+that repeat across images cost a paste rather than a FreeType render.
+"""
+
+import io
+import os
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+from instrument import count, span
+
+# (path, face index) tried in order for each weight; the first that loads wins
+FONT_CANDIDATES = {
+    False: [("/System/Library/Fonts/Helvetica.ttc", 0),
+            ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 0)],
+    True: [("/System/Library/Fonts/Helvetica.ttc", 1),
+           ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 0)],
+}
+
+# Distinct strings kept rasterized (a season of images needs a few thousand)
+TEXT_CACHE_SIZE = 8192
+
+
+def gradient_column(height, color1, color2):
+    """Build the raw RGB bytes for a single-pixel-wide vertical gradient."""
+    column = bytearray()
+    for y in range(height):
+        ratio = y / height
+        column += bytes((
+            int(color1[0] * (1 - ratio) + color2[0] * ratio),
+            int(color1[1] * (1 - ratio) + color2[1] * ratio),
+            int(color1[2] * (1 - ratio) + color2[2] * ratio),
+        ))
+    return bytes(column)
+
+
+@lru_cache(maxsize=32)
+def _cached_gradient(width, height, color1, color2):
+    """Render a gradient once per (size, colors) by stretching a 1px column."""
+    column = Image.frombytes('RGB', (1, height), gradient_column(height, color1, color2))
+    return column.resize((width, height), Image.NEAREST)
+
+
+def create_gradient(width, height, color1, color2):
+    """
+    Create a vertical gradient background.
+
+    Each row is a single colour, so only one column is computed in Python and
+    Pillow stretches it to full width. Results are cached by size and colours;
+    a copy is returned so callers can draw on it freely.
+    """
+    with span("render.gradient"):
+        return _cached_gradient(width, height, tuple(color1), tuple(color2)).copy()
+
+
+# ============ FONTS AND TEXT ============
+
+@lru_cache(maxsize=None)
+def resolve_font(bold=False):
+    """Return the first loadable (path, index) for a weight, or None for Pillow's default."""
+    for path, index in FONT_CANDIDATES[bold]:
+        try:
+            ImageFont.truetype(path, 10, index=index)
+        except OSError:
+            continue
+        return path, index
+    return None
+
+
+@lru_cache(maxsize=None)
+def font_fingerprint():
+    """The resolved font files (path, index, size, mtime) per weight, for output cache keys."""
+    fingerprint = []
+    for bold in (False, True):
+        resolved = resolve_font(bold)
+        if resolved is None:
+            fingerprint.append(None)
+            continue
+        path, index = resolved
+        stat = os.stat(path)
+        fingerprint.append((path, index, stat.st_size, int(stat.st_mtime)))
+    return tuple(fingerprint)
+
+
+@lru_cache(maxsize=None)
+def get_font(size, bold=False):
+    """Get a font, falling back to default if needed. One instance per (size, weight)."""
+    resolved = resolve_font(bold)
+    if resolved is None:
+        return ImageFont.load_default()
+    path, index = resolved
+    return ImageFont.truetype(path, size, index=index)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_bbox(text, font):
+    """Bounding box of `text` drawn at the origin (same as ImageDraw.textbbox)."""
+    return font.getbbox(text)
+
+
+def text_width(text, font):
+    bbox = text_bbox(text, font)
+    return bbox[2] - bbox[0]
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def glyph_run(text, font):
+    """
+    Rasterize `text` once into an antialiased coverage mask.
+
+    Returns (mask, (dx, dy)): the mask is pasted at the draw position plus
+    the offset.
+    """
+    left, top, right, bottom = text_bbox(text, font)
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (left, top)
+
+
+def draw_text(img, xy, text, font, fill):
+    """Draw `text` at `xy` in an RGB `fill` colour from the cached glyph run."""
+    if not text:
+        return
+    mask, (dx, dy) = glyph_run(text, font)
+    img.paste(fill, (int(xy[0]) + dx, int(xy[1]) + dy), mask)
+
+
+def draw_text_centered(img, width, y, text, font, fill):
+    """Draw `text` horizontally centred in an image `width` wide."""
+    draw_text(img, ((width - text_width(text, font)) // 2, y), text, font, fill)
+
+
+def draw_text_right(img, right, y, text, font, fill):
+    """Draw `text` so it ends at x = `right`."""
+    draw_text(img, (right - text_width(text, font), y), text, font, fill)
+
+
+def png_bytes(img):
+    """Encode an image as PNG bytes."""
+    buffer = io.BytesIO()
+    with span("render.png_encode"):
+        img.save(buffer, "PNG")
+    count("render.png_bytes", buffer.tell())
+    return buffer.getvalue()
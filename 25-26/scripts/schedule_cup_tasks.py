@@ -1,18 +1,32 @@
 #!/usr/bin/env python3
-"""Schedule all Rundisliga Cup tasks for the season."""
+"""
+Schedule all Rundisliga Cup tasks for the season.
+
+Each cup gameweek gets a pre-gameweek reminder a day before its deadline and
+(except break weeks) a post-gameweek results job that fires once FPL marks
+the gameweek finished and data_checked. Jobs are kept in the database by
+scheduler.py; the markdown task files are written to tasks/.
+
+`sync` (the default) registers the jobs and rewrites only the task files
+whose content changed, so after a deadline moves only that gameweek's jobs
+and files are touched. `status` lists every job. `run` stays in the
+foreground firing jobs as they come due; --refresh re-fetches the gameweek
+schedule and flags from the FPL API at each poll, --once does a single pass.
+
+Usage: schedule_cup_tasks.py [sync] | status | run [--once] [--refresh]
+"""
 
 import sys
-import sqlite3
-from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import timedelta
 
-# Add scheduler to path
-sys.path.insert(0, str(Path.home() / ".claude" / "scheduler"))
-from db_utils import add_task
+import requests
 
-PROJECT_PATH = str(Path(__file__).parent.parent)
-TASKS_DIR = Path(__file__).parent.parent / "tasks"
-DB_PATH = Path(__file__).parent.parent / "db" / "fantasy_cup.db"
+import scheduler
+from fetch_fpl_gameweeks import store_gameweeks
+from fpl_client import get_client
+
+# Pre-gameweek reminders go out this long before the deadline
+PRE_LEAD = timedelta(days=1)
 
 # Cup schedule
 CUP_SCHEDULE = {
@@ -39,17 +53,6 @@ CUP_SCHEDULE = {
 }
 
 
-def get_gameweek_deadlines():
-    """Get gameweek deadlines from database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, deadline_time FROM gameweeks")
-    deadlines = {row['id']: datetime.fromisoformat(row['deadline_time'].replace('Z', '+00:00')) for row in cursor.fetchall()}
-    conn.close()
-    return deadlines
-
-
 def create_pre_gameweek_task(gw, info, deadline):
     """Create pre-gameweek reminder task file."""
     round_type = info.get("type")
@@ -148,9 +151,6 @@ def create_post_gameweek_task(gw, info, deadline):
     round_type = info.get("type")
     round_num = info.get("round", "")
 
-    # Post-gameweek tasks should run ~2 hours after deadline (when matches finish)
-    post_time = deadline + timedelta(hours=26)  # Next day evening
-
     if round_type == "group":
         title = f"Round {round_num} Results"
         content = f"""# Rundisliga Cup - Round {round_num} (GW{gw}) Results
@@ -159,12 +159,10 @@ def create_post_gameweek_task(gw, info, deadline):
 Generate and send results for Round {round_num}.
 
 ## Steps
-1. Generate results image: `python3 scripts/generate_results_image.py {gw}`
-2. Generate standings image: `python3 scripts/generate_standings_image.py`
-3. Generate message: `python3 scripts/generate_whatsapp_message.py post {gw}`
-4. Send results image to WhatsApp
-5. Send standings image to WhatsApp
-6. Send message to WhatsApp
+1. Generate results image, standings image and message in one pass: `python3 scripts/cup.py post {gw}`
+2. Send results image to WhatsApp
+3. Send standings image to WhatsApp
+4. Send message to WhatsApp
 
 ## Files Generated
 - images/gw{gw}_results.png
@@ -178,11 +176,9 @@ Generate and send results for Round {round_num}.
 Generate and send results for {round_num}.
 
 ## Steps
-1. Generate results image: `python3 scripts/generate_results_image.py {gw}`
-2. Generate message: `python3 scripts/generate_whatsapp_message.py post {gw}`
-3. Send results image to WhatsApp
-4. Send message to WhatsApp
-5. If 2nd leg - include aggregate scores and who advances
+1. Generate results image and message in one pass: `python3 scripts/cup.py post {gw}`
+2. Send results image to WhatsApp
+3. Send message to WhatsApp (2nd legs include the aggregates and who goes through)
 
 ## Files Generated
 - images/gw{gw}_results.png
@@ -229,72 +225,97 @@ If a playoff was held, announce the results and who qualified.
     return title, content
 
 
-def main():
-    """Main entry point."""
-    print("=== SCHEDULING RUNDISLIGA CUP TASKS ===")
-    print()
-
-    deadlines = get_gameweek_deadlines()
-    tasks_created = 0
-    files_created = 0
-
+def season_jobs(deadlines):
+    """Every pre- and post-gameweek job for the cup gameweeks with a known deadline."""
+    jobs = []
     for gw, info in CUP_SCHEDULE.items():
         if gw not in deadlines:
-            print(f"Warning: GW{gw} not in gameweeks database")
             continue
-
         deadline = deadlines[gw]
 
-        # Create pre-gameweek task (1 day before deadline)
-        pre_time = deadline - timedelta(days=1)
         title, content = create_pre_gameweek_task(gw, info, deadline)
-
         if title and content:
-            task_file = f"tasks/gw{gw}_pre.md"
-            file_path = Path(PROJECT_PATH) / task_file
-
-            with open(file_path, 'w') as f:
-                f.write(content)
-            files_created += 1
-
-            task_id = add_task(
-                summary=f"Rundisliga Cup: {title}",
-                project_path=PROJECT_PATH,
-                task_file=task_file,
-                scheduled_at=pre_time,
-                priority=3
-            )
-            tasks_created += 1
-            print(f"Created: GW{gw} pre ({title}) - {pre_time.strftime('%Y-%m-%d %H:%M')}")
-
-        # Create post-gameweek task (day after deadline)
-        if info.get("type") != "break":
-            post_time = deadline + timedelta(hours=26)
-            title, content = create_post_gameweek_task(gw, info, deadline)
-
-            if title and content:
-                task_file = f"tasks/gw{gw}_post.md"
-                file_path = Path(PROJECT_PATH) / task_file
-
-                with open(file_path, 'w') as f:
-                    f.write(content)
-                files_created += 1
-
-                task_id = add_task(
-                    summary=f"Rundisliga Cup: {title}",
-                    project_path=PROJECT_PATH,
-                    task_file=task_file,
-                    scheduled_at=post_time,
-                    priority=3
-                )
-                tasks_created += 1
-                print(f"Created: GW{gw} post ({title}) - {post_time.strftime('%Y-%m-%d %H:%M')}")
+            jobs.append({
+                'id': f"gw{gw}_pre",
+                'gameweek': gw,
+                'trigger': "deadline",
+                'run_at': deadline - PRE_LEAD,
+                'title': title,
+                'task_file': f"tasks/gw{gw}_pre.md",
+                'content': content,
+            })
+
+        title, content = create_post_gameweek_task(gw, info, deadline)
+        if title and content:
+            jobs.append({
+                'id': f"gw{gw}_post",
+                'gameweek': gw,
+                'trigger': "data_checked",
+                'title': title,
+                'task_file': f"tasks/gw{gw}_post.md",
+                'content': content,
+            })
+    return jobs
+
+
+def sync():
+    """Register the season's jobs and write any task files that changed."""
+    print("=== SCHEDULING RUNDISLIGA CUP TASKS ===")
+    print()
+
+    deadlines = scheduler.gameweek_deadlines()
+    for gw in CUP_SCHEDULE:
+        if gw not in deadlines:
+            print(f"Warning: GW{gw} not in gameweeks database")
+
+    result = scheduler.sync(season_jobs(deadlines))
+    for job_id in result['changed']:
+        print(f"Scheduled: {job_id}")
+    for job_id in result['removed']:
+        print(f"Removed: {job_id}")
 
     print()
-    print(f"=== COMPLETE ===")
-    print(f"Task files created: {files_created}")
-    print(f"Scheduled tasks created: {tasks_created}")
+    print("=== COMPLETE ===")
+    print(f"Jobs changed: {len(result['changed'])}")
+    print(f"Task files written: {len(result['files'])}")
+
+
+def status():
+    """List every registered job."""
+    for job in scheduler.get_jobs():
+        when = job['run_at'][:16].replace('T', ' ') if job['run_at'] else f"on {job['trigger']}"
+        print(f"GW{job['gameweek']:<3} {job['status']:<8} {when:<20} {job['title']}")
+
+
+def refresh_gameweeks():
+    """Pull deadlines and finished/data_checked flags from the FPL API; keep the last copy on failure."""
+    client = get_client()
+    try:
+        # poll, not get_json: the runner is long-lived and must bypass the in-process memo
+        data, _ = client.poll("bootstrap-static")
+    except requests.RequestException as e:
+        print(f"✗ Could not refresh gameweeks: {e}")
+        return
+    store_gameweeks(data.get('events', []))
+    client.reload_gameweek_state()
+
+
+def run(once=False, refresh=False):
+    fired = scheduler.run(season_jobs, refresh=refresh_gameweeks if refresh else None, once=once)
+    print(f"Fired {fired} jobs")
 
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    if args in ([], ["sync"]):
+        sync()
+    elif args == ["status"]:
+        status()
+    elif args[:1] == ["run"] and set(args[1:]) <= {"--once", "--refresh"}:
+        try:
+            run(once="--once" in args, refresh="--refresh" in args)
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+In-process job scheduler driven by the gameweeks table.
+
+A job is a dict: `id`, `gameweek`, `trigger`, `title`, `task_file` (relative
+to the project) and `content` (the task file's markdown), plus `run_at` (an
+aware datetime) for 'deadline' jobs. Triggers:
+
+    deadline      fires at `run_at` (e.g. a day before the gameweek deadline)
+    finished      fires once the gameweek's `finished` flag is set
+    data_checked  fires once it is both finished and `data_checked` (final scores)
+
+`sync(jobs)` registers jobs in scheduled_jobs with one upsert each that is a
+no-op when nothing changed, and rewrites a task file only when its content
+differs from what is on disk. A job whose trigger or time changes (e.g. a
+moved deadline) goes back to pending; everything else is left alone.
+
+`run()` keeps 'deadline' jobs in a heap ordered by time and sleeps until the
+earliest one or the next poll, whichever comes first. Each poll re-syncs the
+jobs (picking up deadline changes) and fires flag jobs whose gameweek flags
+are now set. A job is marked done in the same UPDATE that claims it, so it
+fires once even if two runners overlap.
+
+schedule_cup_tasks.py defines the season's jobs and runs this.
+"""
+
+import hashlib
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from db_utils import get_connection, transaction
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+TRIGGERS = ("deadline", "finished", "data_checked")
+
+# Seconds between polls of the gameweeks table (flag jobs and deadline changes)
+POLL_SECONDS = 15 * 60
+
+# A deadline job this late is recorded as missed instead of fired (e.g. the
+# runner was down); so is a flag job once the next gameweek has started
+MISSED_AFTER = timedelta(hours=12)
+
+# Only rows whose definition changed are updated; a new trigger or time resets the job
+CHANGED = """
+    scheduled_jobs.gameweek IS NOT excluded.gameweek OR scheduled_jobs.trigger IS NOT excluded.trigger
+    OR scheduled_jobs.run_at IS NOT excluded.run_at OR scheduled_jobs.title IS NOT excluded.title
+    OR scheduled_jobs.task_file IS NOT excluded.task_file OR scheduled_jobs.content_hash IS NOT excluded.content_hash
+"""
+SAME_TIME = "scheduled_jobs.trigger IS excluded.trigger AND scheduled_jobs.run_at IS excluded.run_at"
+
+UPSERT_JOB = f"""
+    INSERT INTO scheduled_jobs (id, gameweek, trigger, run_at, title, task_file, content_hash, updated_at)
+    VALUES (:id, :gameweek, :trigger, :run_at, :title, :task_file, :content_hash, :updated_at)
+    ON CONFLICT(id) DO UPDATE SET
+        gameweek = excluded.gameweek,
+        trigger = excluded.trigger,
+        run_at = excluded.run_at,
+        title = excluded.title,
+        task_file = excluded.task_file,
+        content_hash = excluded.content_hash,
+        status = CASE WHEN {SAME_TIME} THEN scheduled_jobs.status ELSE 'pending' END,
+        fired_at = CASE WHEN {SAME_TIME} THEN scheduled_jobs.fired_at END,
+        updated_at = excluded.updated_at
+    WHERE {CHANGED}
+"""
+
+PENDING_TIMERS = """
+    SELECT id, run_at FROM scheduled_jobs
+    WHERE status = 'pending' AND trigger = 'deadline'
+    ORDER BY run_at
+"""
+
+DUE_FLAG_JOBS = """
+    SELECT j.id, next.deadline_time <= ? AS missed
+    FROM scheduled_jobs j
+    JOIN gameweeks g ON g.id = j.gameweek
+    LEFT JOIN gameweeks next ON next.id = j.gameweek + 1
+    WHERE j.status = 'pending'
+      AND ((j.trigger = 'finished' AND g.finished)
+           OR (j.trigger = 'data_checked' AND g.finished AND g.data_checked))
+    ORDER BY j.gameweek, j.id
+"""
+
+CLAIM_JOB = """
+    UPDATE scheduled_jobs SET status = ?, fired_at = ?
+    WHERE id = ? AND status = 'pending'
+    RETURNING *
+"""
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def parse_deadline(text):
+    """FPL deadline ('2026-01-06T18:30:00Z') as an aware UTC datetime."""
+    return datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+
+def gameweek_deadlines(conn=None):
+    """{gameweek: deadline} from the gameweeks table."""
+    conn = conn or get_connection()
+    return {row['id']: parse_deadline(row['deadline_time'])
+            for row in conn.execute("SELECT id, deadline_time FROM gameweeks WHERE deadline_time IS NOT NULL")}
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+# ============ REGISTRY ============
+
+def write_task_file(job):
+    """Write the job's task file unless it already has this content. Returns True if written."""
+    path = PROJECT_DIR / job['task_file']
+    if path.exists() and path.read_text() == job['content']:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(job['content'])
+    return True
+
+
+def sync(jobs, conn=None):
+    """
+    Register `jobs`, dropping registered jobs that are no longer defined.
+
+    Returns {'changed': [ids], 'removed': [ids], 'files': [task files written]}.
+    """
+    conn = conn or get_connection()
+    now = utc_now().isoformat(timespec='seconds')
+    changed, files = [], []
+    with transaction(conn):
+        for job in jobs:
+            if job['trigger'] not in TRIGGERS:
+                raise ValueError(f"{job['id']}: unknown trigger {job['trigger']!r}")
+            run_at = job.get('run_at')
+            row = {
+                'id': job['id'],
+                'gameweek': job['gameweek'],
+                'trigger': job['trigger'],
+                'run_at': run_at.astimezone(timezone.utc).isoformat() if run_at else None,
+                'title': job['title'],
+                'task_file': job['task_file'],
+                'content_hash': content_hash(job['content']),
+                'updated_at': now,
+            }
+            if conn.execute(UPSERT_JOB, row).rowcount:
+                changed.append(job['id'])
+            if write_task_file(job):
+                files.append(job['task_file'])
+
+        defined = {job['id'] for job in jobs}
+        removed = [row['id'] for row in conn.execute("SELECT id FROM scheduled_jobs ORDER BY id")
+                   if row['id'] not in defined]
+        conn.executemany("DELETE FROM scheduled_jobs WHERE id = ?", [(job_id,) for job_id in removed])
+
+    return {'changed': changed, 'removed': removed, 'files': files}
+
+
+def get_jobs(conn=None):
+    """Every registered job, in firing order (deadline jobs by time, then flag jobs by gameweek)."""
+    conn = conn or get_connection()
+    return [dict(row) for row in conn.execute("""
+        SELECT * FROM scheduled_jobs ORDER BY gameweek, run_at IS NULL, run_at, id
+    """)]
+
+
+def claim(job_id, status='done', conn=None):
+    """Mark a pending job done (or missed). Returns the job, or None if it was not pending."""
+    conn = conn or get_connection()
+    with transaction(conn):
+        row = conn.execute(CLAIM_JOB, (status, utc_now().isoformat(timespec='seconds'), job_id)).fetchone()
+    return dict(row) if row else None
+
+
+# ============ TIMER QUEUE ============
+
+class TimerQueue:
+    """
+    Min-heap of (time, job id). Rescheduling or cancelling a job leaves its
+    old entry in the heap; entries that no longer match are skipped on pop.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._times = {}
+
+    def __len__(self):
+        return len(self._times)
+
+    def push(self, job_id, at):
+        if self._times.get(job_id) == at:
+            return
+        self._times[job_id] = at
+        heapq.heappush(self._heap, (at, job_id))
+
+    def cancel(self, job_id):
+        self._times.pop(job_id, None)
+
+    def _drop_stale(self):
+        while self._heap and self._times.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_time(self):
+        """The earliest scheduled time, or None when empty."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return (time, job id) for every job due at `now`, earliest first."""
+        due = []
+        while self.next_time() is not None and self._heap[0][0] <= now:
+            at, job_id = heapq.heappop(self._heap)
+            del self._times[job_id]
+            due.append((at, job_id))
+        return due
+
+    def load(self, conn):
+        """Match the queue to the pending deadline jobs in the registry."""
+        pending = {row['id']: datetime.fromisoformat(row['run_at'])
+                   for row in conn.execute(PENDING_TIMERS) if row['run_at']}
+        for job_id in set(self._times) - set(pending):
+            self.cancel(job_id)
+        for job_id, at in pending.items():
+            self.push(job_id, at)
+
+
+# ============ RUNNER ============
+
+def announce(job):
+    """Default action for a fired job: say what to do and where the task file is."""
+    print(f"[{datetime.now():%Y-%m-%d %H:%M}] ✓ GW{job['gameweek']} {job['title']} -> {job['task_file']}")
+
+
+def run(define_jobs, refresh=None, on_fire=announce, poll=POLL_SECONDS, once=False, conn=None):
+    """
+    Fire jobs as they come due until interrupted (or after one pass with `once`).
+
+    `define_jobs(deadlines)` returns the job list for the current deadlines;
+    `refresh()`, if given, updates the gameweeks table at each poll (e.g. from
+    the FPL API). Returns the number of jobs fired.
+    """
+    conn = conn or get_connection()
+    queue = TimerQueue()
+    fired = 0
+    next_poll = None
+
+    while True:
+        now = utc_now()
+        due = [(job_id, now - at > MISSED_AFTER) for at, job_id in queue.pop_due(now)]
+        if next_poll is None or now >= next_poll:
+            if refresh:
+                refresh()
+            result = sync(define_jobs(gameweek_deadlines(conn)), conn)
+            if result['changed'] and next_poll is not None:
+                print(f"Rescheduled {len(result['changed'])} jobs: {', '.join(result['changed'])}")
+            queue.load(conn)
+            due += [(job_id, now - at > MISSED_AFTER) for at, job_id in queue.pop_due(now)]
+            due += [(row['id'], bool(row['missed']))
+                    for row in conn.execute(DUE_FLAG_JOBS, (now.strftime('%Y-%m-%dT%H:%M:%SZ'),))]
+            next_poll = now + timedelta(seconds=poll)
+
+        for job_id, missed in due:
+            job = claim(job_id, 'missed' if missed else 'done', conn)
+            if job and not missed:
+                on_fire(job)
+                fired += 1
+            elif job:
+                print(f"✗ Missed: GW{job['gameweek']} {job['title']}")
+
+        if once:
+            return fired
+
+        wake = min(filter(None, (queue.next_time(), next_poll)))
+        time.sleep(max(0.0, (wake - utc_now()).total_seconds()))
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo odds for the Rundisliga Cup.
+
+Fits a normal score distribution per manager from gameweek_scores (falling
+back to H2H league results), then plays out the rest of the group stage and
+the knockouts many times with NumPy array operations - one row per
+simulated season, no per-match Python loops.
+
+Format being simulated:
+- Group stage: win 3, draw 1, ranked on points then total FPL points. Teams
+  tied on points across 8th place play off on GW32 (highest score goes through)
+- QF (1v8, 4v5, 2v7, 3v6) and SF are two-leg ties, the higher seed away in
+  the 1st leg and at home in the 2nd: aggregate score, then away score, then
+  2nd-leg score, as knockout_bracket.py decides the real ties
+- Final is one gameweek on score
+
+Where the real rules go further the higher seed goes through as a stand-in:
+a two-leg tie level on all three (left undecided by the bracket) and a
+drawn final, which the bracket settles on gross FPL points - the score
+model has no transfer hits, so net and gross can't differ here.
+
+Knockout legs already played are not conditioned on yet; the knockouts are
+always simulated from the group-stage seeding.
+
+Usage: simulate_cup.py [--sims N] [--seed N]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from db_utils import get_connection
+from migrations import GROUP_STAGE_ROUNDS
+
+N_SIMS = 100_000
+# Seasons simulated per array batch (keeps peak memory under ~100MB)
+BATCH_SIZE = 20_000
+
+QUALIFY_SPOTS = 8
+
+# Score model: each manager's mean/variance is shrunk towards the league's by
+# PRIOR_WEIGHT pseudo-gameweeks, so a few weeks of data can't dominate
+PRIOR_WEIGHT = 5
+DEFAULT_MEAN = 50.0
+DEFAULT_SD = 15.0
+
+# Quarter-final pairs by seed index (0 = 1st): 1v8, 4v5, 2v7, 3v6. Adjacent
+# pairs meet in the semi-finals.
+QF_SEEDS = [(0, 7), (3, 4), (1, 6), (2, 5)]
+
+STAGES = ['qualify', 'playoff', 'qf', 'sf', 'final', 'win']
+
+
+def get_managers():
+    """Managers as a list of dicts with fpl_id and name, in fpl_id order."""
+    cursor = get_connection().execute("SELECT id, fpl_id, name FROM managers ORDER BY fpl_id")
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def get_score_history():
+    """
+    Net FPL scores per manager, keyed by fpl_id.
+
+    Uses gameweek_scores; managers without any rows fall back to their
+    points in h2h_matches.
+    """
+    conn = get_connection()
+    history = {}
+    for row in conn.execute("""
+        SELECT m.fpl_id, gs.net_points
+        FROM gameweek_scores gs
+        JOIN managers m ON m.id = gs.manager_id
+        WHERE gs.net_points IS NOT NULL
+    """):
+        history.setdefault(row['fpl_id'], []).append(row['net_points'])
+
+    h2h = {}
+    for row in conn.execute("""
+        SELECT entry_1_id AS fpl_id, entry_1_points AS points FROM h2h_matches
+        WHERE entry_1_points IS NOT NULL
+        UNION ALL
+        SELECT entry_2_id, entry_2_points FROM h2h_matches
+        WHERE entry_2_points IS NOT NULL
+    """):
+        h2h.setdefault(row['fpl_id'], []).append(row['points'])
+
+    for fpl_id, points in h2h.items():
+        history.setdefault(fpl_id, points)
+    return history
+
+
+def fit_score_distributions(fpl_ids, history):
+    """
+    Return (mean, sd) arrays aligned with `fpl_ids`.
+
+    Each manager's estimate is shrunk towards the league-wide mean and
+    variance, so managers with no history get the league average.
+    """
+    all_scores = np.array([s for scores in history.values() for s in scores], dtype=float)
+    if len(all_scores) > 1:
+        league_mean, league_var = all_scores.mean(), all_scores.var()
+    else:
+        league_mean, league_var = DEFAULT_MEAN, DEFAULT_SD ** 2
+
+    mean = np.empty(len(fpl_ids))
+    var = np.empty(len(fpl_ids))
+    for i, fpl_id in enumerate(fpl_ids):
+        scores = np.array(history.get(fpl_id, []), dtype=float)
+        n = len(scores)
+        own_mean = scores.mean() if n else league_mean
+        mean[i] = (n * own_mean + PRIOR_WEIGHT * league_mean) / (n + PRIOR_WEIGHT)
+        deviations = ((scores - own_mean) ** 2).sum() if n else 0.0
+        var[i] = (deviations + PRIOR_WEIGHT * league_var) / (n + PRIOR_WEIGHT)
+    return mean, np.sqrt(var)
+
+
+def get_group_fixtures(index):
+    """
+    Split group-stage fixtures into played and remaining.
+
+    Returns (played, remaining): played is an (F, 4) int array of
+    home index, away index, home score, away score; remaining is (F, 2).
+    """
+    cursor = get_connection().execute("""
+        SELECT home_manager_id, away_manager_id, home_score, away_score
+        FROM cup_fixtures
+        WHERE round <= ?
+        ORDER BY round, id
+    """, (GROUP_STAGE_ROUNDS,))
+
+    played, remaining = [], []
+    for row in cursor.fetchall():
+        home, away = index[row['home_manager_id']], index[row['away_manager_id']]
+        if row['home_score'] is not None and row['away_score'] is not None:
+            played.append((home, away, row['home_score'], row['away_score']))
+        else:
+            remaining.append((home, away))
+    return (np.array(played, dtype=np.int64).reshape(-1, 4),
+            np.array(remaining, dtype=np.int64).reshape(-1, 2))
+
+
+def match_points(home_scores, away_scores):
+    """League points (3/1/0) for both sides of every match."""
+    home = np.where(home_scores > away_scores, 3, np.where(home_scores == away_scores, 1, 0))
+    away = np.where(away_scores > home_scores, 3, np.where(home_scores == away_scores, 1, 0))
+    return home, away
+
+
+class CupSimulator:
+    """Vectorized season simulator; every array has one row per simulated season."""
+
+    def __init__(self, mean, sd, played, remaining, rng):
+        self.mean = mean
+        self.sd = sd
+        self.n = len(mean)
+        self.remaining = remaining
+        self.rng = rng
+
+        # Table so far
+        self.points = np.zeros(self.n, dtype=np.int64)
+        self.fpl_total = np.zeros(self.n, dtype=np.int64)
+        if len(played):
+            home, away, home_score, away_score = played.T
+            home_pts, away_pts = match_points(home_score, away_score)
+            np.add.at(self.points, home, home_pts)
+            np.add.at(self.points, away, away_pts)
+            np.add.at(self.fpl_total, home, home_score)
+            np.add.at(self.fpl_total, away, away_score)
+
+        # One-hot (fixture x manager) incidence, so per-season totals are one matmul
+        self.home_onehot = np.zeros((len(remaining), self.n))
+        self.away_onehot = np.zeros((len(remaining), self.n))
+        if len(remaining):
+            rows = np.arange(len(remaining))
+            self.home_onehot[rows, remaining[:, 0]] = 1
+            self.away_onehot[rows, remaining[:, 1]] = 1
+
+    def sample(self, managers):
+        """Sample one gameweek's score for each manager index in `managers`."""
+        scores = self.mean[managers] + self.sd[managers] * self.rng.standard_normal(managers.shape)
+        return np.maximum(np.rint(scores), 0)
+
+    def group_stage(self, sims):
+        """
+        Play out the remaining group fixtures.
+
+        Returns (seeds, playoff): seeds is (sims, 8) manager indices in seed
+        order, playoff is a (sims, n) bool mask of managers sent to the GW32
+        playoff.
+        """
+        points = np.broadcast_to(self.points, (sims, self.n)).astype(float)
+        fpl_total = np.broadcast_to(self.fpl_total, (sims, self.n)).astype(float)
+
+        if len(self.remaining):
+            home = np.broadcast_to(self.remaining[:, 0], (sims, len(self.remaining)))
+            away = np.broadcast_to(self.remaining[:, 1], (sims, len(self.remaining)))
+            home_scores, away_scores = self.sample(home), self.sample(away)
+            home_pts, away_pts = match_points(home_scores, away_scores)
+            points = points + home_pts @ self.home_onehot + away_pts @ self.away_onehot
+            fpl_total = fpl_total + home_scores @ self.home_onehot + away_scores @ self.away_onehot
+
+        # Managers level on points with the 8th-placed team, when that group
+        # spans the cut, play off on a GW32 score instead of FPL total
+        cut = -np.sort(-points, axis=1)[:, QUALIFY_SPOTS - 1:QUALIFY_SPOTS]
+        level = points == cut
+        above = (points > cut).sum(axis=1, keepdims=True)
+        spans_cut = above + level.sum(axis=1, keepdims=True) > QUALIFY_SPOTS
+        playoff = level & spans_cut
+
+        managers = np.broadcast_to(np.arange(self.n), (sims, self.n))
+        tiebreak = np.where(playoff, self.sample(managers), fpl_total)
+        key = points * 1e7 + tiebreak * 10 + self.rng.random((sims, self.n))
+        seeds = np.argsort(-key, axis=1)[:, :QUALIFY_SPOTS]
+        return seeds, playoff
+
+    @staticmethod
+    def by_seed(seeds, a, b):
+        """Order pairings of managers `a` and `b` as (higher seeds, lower seeds)."""
+        # seeds is best first, so a manager's column in it is their seed
+        rank_a = (seeds[:, :, None] == a[:, None, :]).argmax(axis=1)
+        rank_b = (seeds[:, :, None] == b[:, None, :]).argmax(axis=1)
+        a_higher = rank_a < rank_b
+        return np.where(a_higher, a, b), np.where(a_higher, b, a)
+
+    def two_leg(self, high, low):
+        """
+        Winners of two-leg ties between higher seeds `high` (away in the 1st
+        leg, at home in the 2nd) and lower seeds `low`.
+        """
+        high_first, low_first = self.sample(high), self.sample(low)
+        high_second, low_second = self.sample(high), self.sample(low)
+        high_total, low_total = high_first + high_second, low_first + low_second
+        # Aggregate, then each side's away-leg score, then the 2nd leg
+        low_wins = np.select(
+            [high_total != low_total, high_first != low_second, high_second != low_second],
+            [low_total > high_total, low_second > high_first, low_second > high_second],
+            default=False)
+        return np.where(low_wins, low, high)
+
+    def run(self, sims):
+        """Simulate `sims` seasons; returns a (len(STAGES), n) count array."""
+        counts = np.zeros((len(STAGES), self.n), dtype=np.int64)
+        rows = np.arange(sims)[:, None]
+
+        seeds, playoff = self.group_stage(sims)
+        qualified = np.zeros((sims, self.n), dtype=bool)
+        qualified[rows, seeds] = True
+
+        counts[STAGES.index('qualify')] = (qualified & ~playoff).sum(axis=0)
+        counts[STAGES.index('playoff')] = playoff.sum(axis=0)
+        counts[STAGES.index('qf')] = qualified.sum(axis=0)
+
+        high = seeds[:, [a for a, _ in QF_SEEDS]]
+        low = seeds[:, [b for _, b in QF_SEEDS]]
+        semi_finalists = self.two_leg(high, low)
+        finalists = self.two_leg(*self.by_seed(seeds, semi_finalists[:, [0, 2]], semi_finalists[:, [1, 3]]))
+
+        higher, lower = self.by_seed(seeds, finalists[:, [0]], finalists[:, [1]])
+        higher, lower = higher[:, 0], lower[:, 0]
+        higher_score, lower_score = self.sample(higher), self.sample(lower)
+        champions = np.where(lower_score > higher_score, lower, higher)
+
+        for stage, winners in (('sf', semi_finalists), ('final', finalists), ('win', champions)):
+            counts[STAGES.index(stage)] = np.bincount(winners.ravel(), minlength=self.n)
+        return counts
+
+
+def simulate(n_sims=N_SIMS, seed=None):
+    """
+    Simulate the rest of the cup `n_sims` times.
+
+    Returns {fpl_id: {stage: probability}} for the stages in STAGES:
+    qualify (top 8 outright), playoff (sent to the GW32 playoff), qf (in the
+    quarter-finals either way), sf, final, win.
+    """
+    managers = get_managers()
+    fpl_ids = [m['fpl_id'] for m in managers]
+    index = {fpl_id: i for i, fpl_id in enumerate(fpl_ids)}
+
+    mean, sd = fit_score_distributions(fpl_ids, get_score_history())
+    played, remaining = get_group_fixtures(index)
+    simulator = CupSimulator(mean, sd, played, remaining, np.random.default_rng(seed))
+
+    counts = np.zeros((len(STAGES), len(fpl_ids)), dtype=np.int64)
+    for start in range(0, n_sims, BATCH_SIZE):
+        counts += simulator.run(min(BATCH_SIZE, n_sims - start))
+
+    probabilities = counts / n_sims
+    return {
+        fpl_id: {stage: float(probabilities[s, i]) for s, stage in enumerate(STAGES)}
+        for i, fpl_id in enumerate(fpl_ids)
+    }
+
+
+def main(sims=N_SIMS, seed=None):
+    """Print the odds table."""
+    start = time.perf_counter()
+    odds = simulate(sims, seed)
+    elapsed = time.perf_counter() - start
+
+    names = {m['fpl_id']: m['name'] for m in get_managers()}
+    print(f"=== RUNDISLIGA CUP ODDS ({sims:,} simulations, {elapsed:.1f}s) ===\n")
+    print(f"{'':<25} {'TOP 8':>6} {'P/OFF':>6} {'QF':>6} {'SF':>6} {'FINAL':>6} {'WIN':>6}")
+    for fpl_id, p in sorted(odds.items(), key=lambda x: (-x[1]['win'], -x[1]['qf'])):
+        print(f"{names[fpl_id]:<25} " + " ".join(f"{p[s]:>6.1%}" for s in STAGES))
+
+
+if __name__ == "__main__":
+    options = {}
+    args = sys.argv[1:]
+    while args:
+        flag = args.pop(0)
+        if flag not in ("--sims", "--seed") or not args:
+            print(__doc__.strip().splitlines()[-1])
+            sys.exit(1)
+        options[flag[2:]] = int(args.pop(0))
+
+    main(**options)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Rematch-free round pairings for the Swiss group stage.
+
+Uses the round-robin circle construction: for N teams (N even) it yields
+N-1 disjoint perfect matchings, so any R <= N-1 of them form R rounds in
+which nobody meets the same opponent twice. Teams are randomly relabelled
+and the rounds randomly chosen, so draws vary with the seed while staying
+valid by construction in O(N * R) time - no search, no backtracking.
+"""
+
+import random
+
+
+def circle_round(order, k):
+    """Return the k-th circle-method round (0 <= k < N-1) for a team order."""
+    n = len(order)
+    m = n - 1
+    pairs = [(order[k], order[m])]
+    for i in range(1, n // 2):
+        pairs.append((order[(k + i) % m], order[(k - i) % m]))
+    return pairs
+
+
+def generate_pairings(teams, rounds, rng=None):
+    """
+    Pair `teams` for `rounds` rounds with no repeated opponents.
+
+    Returns a list of rounds, each a list of (team1, team2) tuples.
+    Raises ValueError if the team count is odd or too many rounds are asked for.
+    """
+    n = len(teams)
+    if n < 2 or n % 2:
+        raise ValueError(f"Swiss pairing needs an even number of teams, got {n}")
+    if not 1 <= rounds <= n - 1:
+        raise ValueError(f"Can play at most {n - 1} rematch-free rounds with {n} teams, asked for {rounds}")
+
+    rng = rng or random.Random()
+    order = list(teams)
+    rng.shuffle(order)
+    chosen = rng.sample(range(n - 1), rounds)
+
+    pairings = []
+    for k in chosen:
+        pairs = circle_round(order, k)
+        rng.shuffle(pairs)
+        pairings.append([(a, b) if rng.random() < 0.5 else (b, a) for a, b in pairs])
+    return pairings
+
+
+# ============ SEEDED POT DRAW ============
+
+# Candidate schedules evaluated by the local search. A fixed budget (not a
+# time limit) so a seed always reproduces the same draw.
+DEFAULT_EVALUATIONS = 20000
+RESTART_EVERY = 2000
+
+
+def make_pots(seeding, n_pots):
+    """Split a seeding order (best first) into equal pots."""
+    n = len(seeding)
+    if n_pots < 1 or n % n_pots:
+        raise ValueError(f"{n} teams cannot be split into {n_pots} equal pots")
+    size = n // n_pots
+    return [list(seeding[i * size:(i + 1) * size]) for i in range(n_pots)]
+
+
+def partner_position(n, k, p):
+    """Position paired with position p in circle round k (inverse of circle_round)."""
+    m = n - 1
+    if p == m:
+        return k
+    if p == k:
+        return m
+    return (2 * k - p) % m
+
+
+def pot_rounds(n_pots):
+    """
+    Pot-level schedule: every pot meets every other pot once and plays
+    itself once. Returns a list of rounds, each a list of (pot, pot) pairs.
+    """
+    if n_pots % 2:
+        # Circle method with a bye; the pot on the bye plays internally
+        rounds = []
+        for k in range(n_pots):
+            pairs = circle_round(list(range(n_pots)) + [None], k)
+            rounds.append([(a, a) if b is None else (b, b) if a is None else (a, b) for a, b in pairs])
+        return rounds
+    rounds = [circle_round(list(range(n_pots)), k) for k in range(n_pots - 1)]
+    rounds.append([(a, a) for a in range(n_pots)])
+    return rounds
+
+
+class PotSchedule:
+    """
+    A pots draw: each team meets `quota` opponents from every pot (its own
+    included), so every team plays quota * n_pots rounds.
+
+    Pots A and B meet through `quota` cyclic shifts (slot i of A plays slot
+    i + t of B), and a pot plays itself through `quota` circle rounds. Any
+    choice of distinct shifts and circle rounds is rematch-free, so the search
+    only moves between valid schedules: it swaps two teams within a pot,
+    changes a shift, or changes a circle round.
+
+    Pots hold seed ranks (0 = top seed), which double as team strength.
+    `sums[a][i]` is the opponent-strength total of slot i in pot a and is
+    updated incrementally by each move.
+    """
+
+    def __init__(self, pots, quota, rng):
+        self.pots = [list(p) for p in pots]
+        self.n_pots = len(pots)
+        self.size = len(pots[0])
+        self.quota = quota
+        for pot in self.pots:
+            rng.shuffle(pot)
+        self.shifts = {
+            (a, b): rng.sample(range(self.size), quota)
+            for a in range(self.n_pots) for b in range(a + 1, self.n_pots)
+        }
+        self.internal = [rng.sample(range(self.size - 1), quota) for _ in range(self.n_pots)]
+        self._partners = [[partner_position(self.size, k, i) for i in range(self.size)]
+                          for k in range(self.size - 1)]
+        self.sums = [
+            [sum(self.pots[b][j] for b, j in self.opponent_slots(a, i)) for i in range(self.size)]
+            for a in range(self.n_pots)
+        ]
+
+    def opponent_slots(self, a, i):
+        """(pot, slot) of every opponent of slot i in pot a."""
+        size = self.size
+        slots = []
+        for b in range(self.n_pots):
+            if b > a:
+                slots.extend((b, (i + t) % size) for t in self.shifts[(a, b)])
+            elif b < a:
+                slots.extend((b, (i - t) % size) for t in self.shifts[(b, a)])
+            else:
+                slots.extend((a, self._partners[k][i]) for k in self.internal[a])
+        return slots
+
+    def strength_spread(self):
+        """Standard deviation of the teams' summed opponent strength."""
+        sums = [s for pot_sums in self.sums for s in pot_sums]
+        mean = sum(sums) / len(sums)
+        return (sum((s - mean) ** 2 for s in sums) / len(sums)) ** 0.5
+
+    def swap_teams(self, a, i, j):
+        """Swap the teams in slots i and j of pot a."""
+        pot = self.pots[a]
+        delta = pot[j] - pot[i]
+        for b, k in self.opponent_slots(a, i):
+            self.sums[b][k] += delta
+        for b, k in self.opponent_slots(a, j):
+            self.sums[b][k] -= delta
+        pot[i], pot[j] = pot[j], pot[i]
+
+    def set_shift(self, key, slot, shift):
+        """Replace one of the cyclic shifts pairing pots key[0] and key[1]."""
+        a, b = key
+        old = self.shifts[key][slot]
+        pot_a, pot_b = self.pots[a], self.pots[b]
+        sums_a, sums_b = self.sums[a], self.sums[b]
+        size = self.size
+        for i in range(size):
+            sums_a[i] += pot_b[(i + shift) % size] - pot_b[(i + old) % size]
+            sums_b[i] += pot_a[(i - shift) % size] - pot_a[(i - old) % size]
+        self.shifts[key][slot] = shift
+
+    def set_internal(self, a, slot, k):
+        """Replace one of the circle rounds pot a plays against itself."""
+        new, old = self._partners[k], self._partners[self.internal[a][slot]]
+        pot, sums = self.pots[a], self.sums[a]
+        for i in range(self.size):
+            sums[i] += pot[new[i]] - pot[old[i]]
+        self.internal[a][slot] = k
+
+    def random_move(self, rng):
+        """Apply a random move; returns a callable that undoes it."""
+        kind = rng.random()
+        if kind < 0.2 and self.quota < self.size and self.shifts:
+            key = rng.choice(list(self.shifts))
+            slot = rng.randrange(self.quota)
+            old = self.shifts[key][slot]
+            self.set_shift(key, slot, rng.choice([t for t in range(self.size) if t not in self.shifts[key]]))
+            return lambda: self.set_shift(key, slot, old)
+        if kind < 0.3 and self.quota < self.size - 1:
+            a = rng.randrange(self.n_pots)
+            slot = rng.randrange(self.quota)
+            old = self.internal[a][slot]
+            self.set_internal(a, slot, rng.choice([k for k in range(self.size - 1) if k not in self.internal[a]]))
+            return lambda: self.set_internal(a, slot, old)
+        a = rng.randrange(self.n_pots)
+        i, j = rng.sample(range(self.size), 2)
+        self.swap_teams(a, i, j)
+        return lambda: self.swap_teams(a, i, j)
+
+    def rounds(self):
+        """Expand to a list of rounds of (team, team) pairs."""
+        size = self.size
+        result = []
+        for rep in range(self.quota):
+            for pot_round in pot_rounds(self.n_pots):
+                pairs = []
+                for a, b in pot_round:
+                    if a == b:
+                        pairs.extend(circle_round(self.pots[a], self.internal[a][rep]))
+                    else:
+                        a, b = min(a, b), max(a, b)
+                        t = self.shifts[(a, b)][rep]
+                        pairs.extend((self.pots[a][i], self.pots[b][(i + t) % size]) for i in range(size))
+                result.append(pairs)
+        return result
+
+
+def orient_balanced(pairings):
+    """
+    Choose home/away for every pairing so each team's home and away counts
+    differ by at most one (exactly equal for an even number of rounds).
+
+    Orients the opponent graph along Euler circuits: every visit to a team
+    enters it once (away) and leaves once (home). Odd-degree teams are first
+    joined to a dummy vertex so circuits exist.
+    """
+    adjacency = {}
+    edges = []
+    for pairs in pairings:
+        for a, b in pairs:
+            adjacency.setdefault(a, []).append(len(edges))
+            adjacency.setdefault(b, []).append(len(edges))
+            edges.append((a, b))
+    n_real = len(edges)
+
+    dummy = object()
+    for team in [t for t, e in adjacency.items() if len(e) % 2]:
+        adjacency.setdefault(dummy, []).append(len(edges))
+        adjacency[team].append(len(edges))
+        edges.append((team, dummy))
+
+    used = [False] * len(edges)
+    home = {}
+    cursor = {team: 0 for team in adjacency}
+    for start in adjacency:
+        stack = [start]
+        while stack:
+            team = stack[-1]
+            incident = adjacency[team]
+            while cursor[team] < len(incident) and used[incident[cursor[team]]]:
+                cursor[team] += 1
+            if cursor[team] == len(incident):
+                stack.pop()
+                continue
+            e = incident[cursor[team]]
+            used[e] = True
+            a, b = edges[e]
+            other = b if a == team else a
+            if e < n_real:
+                home[e] = team
+            stack.append(other)
+
+    oriented = []
+    e = 0
+    for pairs in pairings:
+        round_pairs = []
+        for a, b in pairs:
+            round_pairs.append((a, b) if home[e] == a else (b, a))
+            e += 1
+        oriented.append(round_pairs)
+    return oriented
+
+
+def generate_pot_pairings(seeding, rounds, n_pots, rng=None, evaluations=DEFAULT_EVALUATIONS):
+    """
+    Pair a seeded league UEFA-style: teams are split into `n_pots` pots by
+    seeding and each meets rounds / n_pots opponents from every pot.
+
+    Local search picks the schedule with the most even opponent strength
+    (seed rank), then home/away is balanced exactly. Returns
+    (pairings, stats); pairings are (home, away) tuples.
+    """
+    n = len(seeding)
+    if n < 2 or n % 2:
+        raise ValueError(f"Swiss pairing needs an even number of teams, got {n}")
+    size = len(make_pots(seeding, n_pots)[0])
+    if rounds % n_pots:
+        raise ValueError(f"{rounds} rounds cannot be split evenly across {n_pots} pots")
+    quota = rounds // n_pots
+    if size % 2 or quota > size - 1:
+        raise ValueError(f"Pots of {size} teams cannot each give {quota} distinct internal opponents")
+
+    rng = rng or random.Random()
+    rank_pots = make_pots(range(n), n_pots)
+
+    best = None
+    evaluated = 0
+    while evaluated < evaluations and not (best and best[0] == 0):
+        schedule = PotSchedule(rank_pots, quota, rng)
+        current = schedule.strength_spread()
+        evaluated += 1
+
+        for _ in range(min(RESTART_EVERY, evaluations - evaluated)):
+            if current == 0:
+                break
+            undo = schedule.random_move(rng)
+            candidate = schedule.strength_spread()
+            evaluated += 1
+            if candidate <= current:
+                current = candidate
+            else:
+                undo()
+
+        if best is None or current < best[0]:
+            best = (current, schedule.rounds())
+
+    spread, rank_pairings = best
+    pairings = [[(seeding[a], seeding[b]) for a, b in pairs] for pairs in rank_pairings]
+    rng.shuffle(pairings)
+    for pairs in pairings:
+        rng.shuffle(pairs)
+    pairings = orient_balanced(pairings)
+
+    stats = {
+        'evaluations': evaluated,
+        'pots': n_pots,
+        'per_pot': quota,
+        'strength_spread': spread,
+    }
+    return pairings, stats
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Rundisliga Cup tiebreakers.
+
+Group stage (context/cup-format.md):
+  1. Points
+  2. Total FPL points scored across the group stage
+  3. Head-to-head result
+
+Head-to-head results are indexed once from the fixtures (O(fixtures)). Teams
+still level after 1 and 2 are ranked on a mini-league of just their games
+against each other: points, then FPL difference. If that separates some but
+not all of them, it is re-applied to the teams still level. Teams level on
+everything keep their incoming order and are flagged as tied.
+
+Teams level on points with 8th place, where that group spans the cut, go to
+the GW32 playoff.
+
+Knockout ties are decided in knockout_bracket.py (aggregate, then away
+score, then 2nd-leg score; a drawn final on gross FPL points).
+"""
+
+from collections import defaultdict
+
+from cup_queries import scored_group_fixtures
+
+QUALIFY_SPOTS = 8
+
+
+class H2HIndex:
+    """Points and FPL scored by each manager against each opponent."""
+
+    def __init__(self, fixtures=()):
+        # points[a][b]: league points a took off b; scored[a][b]: FPL points a scored against b
+        self.points = defaultdict(dict)
+        self.scored = defaultdict(dict)
+        for f in fixtures:
+            self.add(f['home_manager_id'], f['away_manager_id'], f['home_score'], f['away_score'])
+
+    @classmethod
+    def from_db(cls, through_round=None, conn=None):
+        """Index every scored group-stage fixture through a round (default: all)."""
+        return cls(scored_group_fixtures(through_round, conn))
+
+    def add(self, home, away, home_score, away_score):
+        for us, them, our_score, their_score in ((home, away, home_score, away_score),
+                                                 (away, home, away_score, home_score)):
+            points = 3 if our_score > their_score else int(our_score == their_score)
+            self.points[us][them] = self.points[us].get(them, 0) + points
+            self.scored[us][them] = self.scored[us].get(them, 0) + our_score
+
+    def mini_table(self, group):
+        """{manager: (points, FPL difference)} over the games among `group` only."""
+        members = set(group)
+        table = {}
+        for manager in group:
+            points = difference = 0
+            for opponent, earned in self.points.get(manager, {}).items():
+                if opponent in members:
+                    points += earned
+                    difference += self.scored[manager][opponent] - self.scored[opponent][manager]
+            table[manager] = (points, difference)
+        return table
+
+
+def _split(rows, key):
+    """Consecutive runs of `rows` with equal key(row)."""
+    groups = []
+    for row in rows:
+        if groups and key(groups[-1][0]) == key(row):
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+    return groups
+
+
+def _resolve_mini_league(group, index):
+    """Order a tied group by mini-league, re-applying it to any subgroup still level."""
+    table = index.mini_table([row['fpl_id'] for row in group])
+    ordered = sorted(group, key=lambda row: (-table[row['fpl_id']][0], -table[row['fpl_id']][1]))
+    subgroups = _split(ordered, lambda row: table[row['fpl_id']])
+
+    if len(subgroups) == 1:
+        # Nothing separates them
+        for row in group:
+            row['tied'] = True
+        return group
+
+    resolved = []
+    for subgroup in subgroups:
+        resolved.extend(_resolve_mini_league(subgroup, index) if len(subgroup) > 1 else subgroup)
+    return resolved
+
+
+def rank_standings(standings, index=None):
+    """
+    Sort standings rows (dicts with fpl_id, points, fpl_total) by the full
+    group-stage tiebreakers. Returns a new list; each row gains `position`
+    and `tied` (level with a neighbour on every criterion).
+
+    `index` defaults to every scored group-stage fixture in the database.
+    """
+    if index is None:
+        index = H2HIndex.from_db()
+
+    ranked = []
+    ordered = sorted(standings, key=lambda row: (-row['points'], -row['fpl_total']))
+    for group in _split(ordered, lambda row: (row['points'], row['fpl_total'])):
+        for row in group:
+            row['tied'] = False
+        ranked.extend(_resolve_mini_league(group, index) if len(group) > 1 else group)
+
+    for position, row in enumerate(ranked, 1):
+        row['position'] = position
+    return ranked
+
+
+def playoff_contenders(ranked, spots=QUALIFY_SPOTS):
+    """
+    Teams level on points with the last qualifying place, when that group
+    spans the cut. Returns (rows, spots_needed), or None if no playoff is
+    needed.
+    """
+    if len(ranked) <= spots:
+        return None
+    cut = ranked[spots - 1]['points']
+    level = [row for row in ranked if row['points'] == cut]
+    above = sum(1 for row in ranked if row['points'] > cut)
+    if above + len(level) <= spots:
+        return None
+    return level, spots - above